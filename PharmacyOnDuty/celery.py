@@ -6,8 +6,10 @@ and auto-discovers tasks.
 """
 
 import os
+from typing import Any
 
 from celery import Celery
+from celery.signals import task_postrun, worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "PharmacyOnDuty.settings")
@@ -20,3 +22,21 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_http_connections(**kwargs: Any) -> None:
+    """Open keep-alive connections to the scraped sites in each pool process."""
+    from django.conf import settings
+
+    from pharmacies import http_client
+
+    http_client.warm_up(settings.HTTP_CLIENT_WARM_ORIGINS["worker"])
+
+
+@task_postrun.connect
+def report_database_pool(**kwargs: Any) -> None:
+    """Periodically log database pool wait times of each pool process."""
+    from pharmacies.db_pool import report_pool_stats
+
+    report_pool_stats()
@@ -1,7 +1,9 @@
 import os
-from typing import Final
+from typing import Any, Final
 from urllib.parse import unquote, urlparse
 
+from PharmacyOnDuty.env import env_bool, env_int
+
 DEFAULT_DATABASE_SETTINGS: Final[dict[str, str]] = {
     "NAME": "postgres",
     "USER": "postgres",
@@ -19,6 +21,12 @@ DATABASE_ENV_ALIASES: Final[dict[str, tuple[str, ...]]] = {
 }
 
 
+# Processes that share the database, each with its own pool size.
+DATABASE_ROLES: Final[tuple[str, ...]] = ("web", "worker")
+
+DEFAULT_POOL_MAX_SIZES: Final[dict[str, int]] = {"web": 4, "worker": 5}
+
+
 def _get_first_env_value(*names: str) -> str | None:
     """Return the first non-empty value found among the given env vars."""
 
@@ -79,3 +87,46 @@ def get_database_connection_kwargs() -> dict[str, str]:
         "host": settings["HOST"],
         "port": settings["PORT"],
     }
+
+
+def get_database_connection_settings() -> dict[str, Any]:
+    """
+    Resolve connection reuse settings for the ``default`` database.
+
+    Connections persist for ``DB_CONN_MAX_AGE`` seconds and are health-checked
+    before reuse. With ``DB_POOL_ENABLED`` each process keeps a psycopg pool
+    instead, sized for its ``DB_ROLE`` (``web`` or ``worker``). ``DB_PGBOUNCER``
+    turns off server-side cursors and prepared statements, which PgBouncer
+    cannot route in transaction pooling mode.
+    """
+
+    role = os.environ.get("DB_ROLE") or "web"
+    if role not in DATABASE_ROLES:
+        raise ValueError(f"DB_ROLE must be one of {', '.join(DATABASE_ROLES)}.")
+
+    pgbouncer = env_bool("DB_PGBOUNCER", default=False)
+    options: dict[str, Any] = {}
+    if pgbouncer:
+        options["prepare_threshold"] = None
+
+    connection_settings: dict[str, Any] = {
+        "CONN_MAX_AGE": env_int("DB_CONN_MAX_AGE", 60),
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": pgbouncer,
+        "OPTIONS": options,
+    }
+
+    if env_bool("DB_POOL_ENABLED", default=False):
+        # Django returns pooled connections after each request; persistent
+        # connections cannot be combined with a pool.
+        connection_settings["CONN_MAX_AGE"] = 0
+        options["pool"] = {
+            "name": f"pharmacyonduty-{role}",
+            "min_size": env_int("DB_POOL_MIN_SIZE", 1),
+            "max_size": env_int(
+                f"DB_POOL_MAX_SIZE_{role.upper()}", DEFAULT_POOL_MAX_SIZES[role]
+            ),
+            "timeout": env_int("DB_POOL_TIMEOUT", 10),
+        }
+
+    return connection_settings
@@ -0,0 +1,19 @@
+"""Parsing of typed environment variables shared by the settings modules."""
+
+import os
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Parse a boolean environment variable, defaulting to ``default`` when unset."""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def env_int(name: str, default: int) -> int:
+    """Parse an integer environment variable, defaulting to ``default`` when unset."""
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    return int(raw)
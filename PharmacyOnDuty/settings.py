@@ -16,7 +16,11 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
-from PharmacyOnDuty.database_config import get_database_settings
+from PharmacyOnDuty.database_config import (
+    get_database_connection_settings,
+    get_database_settings,
+)
+from PharmacyOnDuty.env import env_bool, env_int
 
 load_dotenv(os.getenv("DOTENV_PATH"))
 
@@ -91,34 +95,26 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 
-def _env_bool(name: str, default: bool) -> bool:
-    """Parse a boolean environment variable, defaulting to ``default`` when unset."""
-    raw = os.environ.get(name)
-    if raw is None:
-        return default
-    return raw.strip().lower() in {"1", "true", "yes", "on"}
-
-
 SECURE_PROXY_SSL_HEADER: tuple[str, str] | None = None
-if _env_bool("DJANGO_ENABLE_SECURE_PROXY_SSL_HEADER", default=False):
+if env_bool("DJANGO_ENABLE_SECURE_PROXY_SSL_HEADER", default=False):
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 # HTTPS / transport security. Defaults are safe for production (DEBUG=False).
 # When DEBUG is enabled the secure-cookie / HSTS / redirect knobs are
 # automatically disabled so local development over plain HTTP keeps working.
-SECURE_SSL_REDIRECT = _env_bool("DJANGO_SECURE_SSL_REDIRECT", default=not DEBUG)
-SESSION_COOKIE_SECURE = _env_bool("DJANGO_SESSION_COOKIE_SECURE", default=not DEBUG)
-CSRF_COOKIE_SECURE = _env_bool("DJANGO_CSRF_COOKIE_SECURE", default=not DEBUG)
+SECURE_SSL_REDIRECT = env_bool("DJANGO_SECURE_SSL_REDIRECT", default=not DEBUG)
+SESSION_COOKIE_SECURE = env_bool("DJANGO_SESSION_COOKIE_SECURE", default=not DEBUG)
+CSRF_COOKIE_SECURE = env_bool("DJANGO_CSRF_COOKIE_SECURE", default=not DEBUG)
 
 # HSTS: opt-in via env var so operators can ramp up the max-age safely.
 # Defaults to one year in production and 0 (disabled) in DEBUG.
 SECURE_HSTS_SECONDS = int(
     os.environ.get("DJANGO_SECURE_HSTS_SECONDS", "0" if DEBUG else "31536000")
 )
-SECURE_HSTS_INCLUDE_SUBDOMAINS = _env_bool(
+SECURE_HSTS_INCLUDE_SUBDOMAINS = env_bool(
     "DJANGO_SECURE_HSTS_INCLUDE_SUBDOMAINS", default=not DEBUG
 )
-SECURE_HSTS_PRELOAD = _env_bool("DJANGO_SECURE_HSTS_PRELOAD", default=False)
+SECURE_HSTS_PRELOAD = env_bool("DJANGO_SECURE_HSTS_PRELOAD", default=False)
 
 # Application definition
 
@@ -186,8 +182,250 @@ DATABASES = {
     "default": {
         "ENGINE": "django.contrib.gis.db.backends.postgis",
         **get_database_settings(),
+        **get_database_connection_settings(),
+    }
+}
+# Seconds between pool usage reports (wait times, queued requests) in the logs.
+DB_POOL_STATS_INTERVAL = env_int("DB_POOL_STATS_INTERVAL", 300)
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+#
+# CACHE_REDIS_URL points the shared cache at Redis so every gunicorn worker
+# reuses the same entries. Without it each process gets its own LocMem cache.
+
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+            "KEY_PREFIX": "pharmacyonduty",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                # A Redis outage degrades to cache misses instead of 500s.
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
     }
+
+# Resolve coordinates outside every stored City.boundary through the Google
+# Geocoding API. Disable once all supported cities have boundaries loaded.
+CITY_RESOLVER_GOOGLE_FALLBACK = env_bool("CITY_RESOLVER_GOOGLE_FALLBACK", default=True)
+
+# Coalesce concurrent identical Google lookups: one caller fetches while the
+# others wait, in-process and across workers through a short cache lock. The
+# lock TTL should exceed the slowest upstream call including retries.
+SINGLE_FLIGHT_ENABLED = env_bool("SINGLE_FLIGHT_ENABLED", default=True)
+SINGLE_FLIGHT_LOCK_TTL = env_int("SINGLE_FLIGHT_LOCK_TTL", 15)
+SINGLE_FLIGHT_WAIT_TIMEOUT = env_int("SINGLE_FLIGHT_WAIT_TIMEOUT", 15)
+SINGLE_FLIGHT_HANDOFF_TTL = 10
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# Reject coordinates outside every supported city before any upstream call.
+# The service area is a bitmap of SERVICE_AREA_CELL_SIZE-degree cells touching
+# a city boundary or, for cities without one, the extent of its pharmacies
+# padded by SERVICE_AREA_ENVELOPE_MARGIN meters (by default the duty search
+# radius, beyond which no duty pharmacy would be found anyway).
+SERVICE_AREA_PREFILTER_ENABLED = env_bool(
+    "SERVICE_AREA_PREFILTER_ENABLED", default=True
+)
+SERVICE_AREA_CELL_SIZE = 0.02
+SERVICE_AREA_ENVELOPE_MARGIN = env_int("SERVICE_AREA_ENVELOPE_MARGIN", 100_000)
+# Seconds after which each worker rebuilds its service-area and boundary
+# indexes, picking up cities and boundaries loaded by other processes.
+SERVICE_AREA_REFRESH_INTERVAL = env_int("SERVICE_AREA_REFRESH_INTERVAL", 300)
+
+# Durable (origin cell, pharmacy) travel-time cache. Origins are rounded to
+# TRAVEL_TIME_CELL_PRECISION decimals; rows older than the TTL are refetched.
+TRAVEL_TIME_CELL_PRECISION = env_int("TRAVEL_TIME_CELL_PRECISION", 3)
+TRAVEL_TIME_CACHE_TTL = env_int("TRAVEL_TIME_CACHE_TTL", 60 * 60 * 24 * 7)
+
+# Travel metrics source: "google" uses the Distance Matrix API and falls back
+# to the calibrated local estimator on failures; "local" never calls Google.
+TRAVEL_TIME_MODE = os.environ.get("TRAVEL_TIME_MODE", "google")
+# Estimator parameters used until calibrate_travel_times has fitted a city.
+TRAVEL_ESTIMATOR_DEFAULT_DETOUR_FACTOR = float(
+    os.environ.get("TRAVEL_ESTIMATOR_DEFAULT_DETOUR_FACTOR", "1.4")
+)
+# Meters per second (~25 km/h urban driving).
+TRAVEL_ESTIMATOR_DEFAULT_SPEED = float(
+    os.environ.get("TRAVEL_ESTIMATOR_DEFAULT_SPEED", "7.0")
+)
+
+# Cities and working schedules are kept in memory by every worker. Workers
+# check the shared cache token and the cities' roster versions for changes
+# made elsewhere at most this often (seconds).
+CITY_REGISTRY_CHECK_INTERVAL = env_int("CITY_REGISTRY_CHECK_INTERVAL", 5)
+
+# Serve nearest duty pharmacies from an in-memory per-city roster snapshot.
+# Each worker re-reads City.roster_version at most this often (seconds).
+ROSTER_SNAPSHOT_ENABLED = env_bool("ROSTER_SNAPSHOT_ENABLED", default=True)
+ROSTER_SNAPSHOT_VERSION_CHECK_INTERVAL = env_int(
+    "ROSTER_SNAPSHOT_VERSION_CHECK_INTERVAL", 5
+)
+
+# Cache serialized get_pharmacy_points responses per coordinate cell. Entries
+# are keyed by City.roster_version and the city status, so a new scrape or an
+# opening/closing transition switches to fresh keys instead of waiting on a TTL.
+PHARMACY_POINTS_CACHE_ENABLED = env_bool("PHARMACY_POINTS_CACHE_ENABLED", default=True)
+PHARMACY_POINTS_CACHE_PRECISION = env_int("PHARMACY_POINTS_CACHE_PRECISION", 3)
+# Seconds browsers and proxies may reuse a duty roster GeoJSON before
+# revalidating it with its ETag.
+DUTY_GEOJSON_MAX_AGE = env_int("DUTY_GEOJSON_MAX_AGE", 300)
+# Upper bound in seconds on how long GET pharmacy_points responses may be
+# reused; they never outlive the city's next opening or closing time or its
+# next interval scrape.
+PHARMACY_POINTS_GET_MAX_AGE = env_int("PHARMACY_POINTS_GET_MAX_AGE", 3600)
+# Maximum number of locations accepted by get_pharmacy_points_batch.
+PHARMACY_POINTS_BATCH_MAX_LOCATIONS = env_int("PHARMACY_POINTS_BATCH_MAX_LOCATIONS", 50)
+
+# Count request origin cells per city in a count-min sketch (width x depth
+# counters) with a top-k table, and add each window's top-k counts to the
+# OriginCellTraffic table every HOT_CELLS_FLUSH_INTERVAL seconds.
+HOT_CELLS_ENABLED = env_bool("HOT_CELLS_ENABLED", default=True)
+HOT_CELLS_SKETCH_WIDTH = env_int("HOT_CELLS_SKETCH_WIDTH", 2048)
+HOT_CELLS_SKETCH_DEPTH = env_int("HOT_CELLS_SKETCH_DEPTH", 4)
+HOT_CELLS_TOP_K = env_int("HOT_CELLS_TOP_K", 100)
+HOT_CELLS_FLUSH_INTERVAL = env_int("HOT_CELLS_FLUSH_INTERVAL", 60)
+
+# After each persisted scrape, precompute duty responses and travel times for
+# the city's CACHE_WARMING_TOP_CELLS hottest origin cells using up to
+# CACHE_WARMING_CONCURRENCY threads and CACHE_WARMING_MAX_ELEMENTS Distance
+# Matrix elements per run.
+CACHE_WARMING_ENABLED = env_bool("CACHE_WARMING_ENABLED", default=True)
+CACHE_WARMING_TOP_CELLS = env_int("CACHE_WARMING_TOP_CELLS", 50)
+CACHE_WARMING_CONCURRENCY = env_int("CACHE_WARMING_CONCURRENCY", 4)
+CACHE_WARMING_MAX_ELEMENTS = env_int("CACHE_WARMING_MAX_ELEMENTS", 500)
+
+# Serve get_pharmacy_points with the async view. Only useful under an ASGI
+# server (uvicorn); under WSGI every request would get its own event loop.
+PHARMACY_POINTS_ASYNC = env_bool("PHARMACY_POINTS_ASYNC", default=False)
+# Connection pool of the per-event-loop httpx.AsyncClient behind
+# http_client.arequest (used by the async view).
+ASYNC_HTTP_MAX_CONNECTIONS = env_int("ASYNC_HTTP_MAX_CONNECTIONS", 200)
+ASYNC_HTTP_MAX_KEEPALIVE = env_int("ASYNC_HTTP_MAX_KEEPALIVE", 50)
+
+# Shared outbound HTTP client (pharmacies.http_client).
+HTTP_CLIENT_RETRIES = env_int("HTTP_CLIENT_RETRIES", 2)
+HTTP_CLIENT_BACKOFF_FACTOR = float(os.environ.get("HTTP_CLIENT_BACKOFF_FACTOR", "0.3"))
+# Number of per-host pools kept, and connections kept per host.
+HTTP_CLIENT_POOL_CONNECTIONS = env_int("HTTP_CLIENT_POOL_CONNECTIONS", 10)
+HTTP_CLIENT_POOL_MAXSIZE = env_int("HTTP_CLIENT_POOL_MAXSIZE", 10)
+# (connect, read) timeouts in seconds per logical endpoint.
+HTTP_CLIENT_TIMEOUTS = {
+    "default": (3.05, 10),
+    "google_geocode": (3.05, 10),
+    "google_places": (3.05, 10),
+    "google_distance_matrix": (3.05, 10),
+    "google_maps_js": (3.05, 10),
+    "ankara_scraper": (5, 10),
+    "eskisehir_scraper": (5, 60),
+    "istanbul_scraper": (5, 10),
+}
+# Send conditional requests for scraper sources and skip runs whose sources
+# have not changed (see pharmacies.utils.conditional_fetch).
+SCRAPER_CONDITIONAL_FETCH = env_bool("SCRAPER_CONDITIONAL_FETCH", default=True)
+# Scraped records written per bulk create/update; bounds the memory a scrape
+# needs while it is streamed into the database.
+SCRAPER_PERSIST_CHUNK_SIZE = env_int("SCRAPER_PERSIST_CHUNK_SIZE", 500)
+# Backend the scrapers parse HTML with: "html.parser", "lxml" or "selectolax"
+# (see pharmacies.utils.html_parser).
+SCRAPER_HTML_PARSER = os.environ.get("SCRAPER_HTML_PARSER", "html.parser")
+# Istanbul districts fetched at once, and the minimum delay in seconds between
+# request starts to the Istanbul host. Keep the concurrency at or below
+# HTTP_CLIENT_POOL_MAXSIZE so connections are reused.
+ISTANBUL_SCRAPER_CONCURRENCY = env_int("ISTANBUL_SCRAPER_CONCURRENCY", 6)
+ISTANBUL_SCRAPER_REQUEST_INTERVAL = float(
+    os.environ.get("ISTANBUL_SCRAPER_REQUEST_INTERVAL", "0.1")
+)
+# City scrapers, merged over the "pharmacies.scrapers" entry points (see
+# pharmacies.utils.scraper_registry). Modules are imported on first use.
+PHARMACY_SCRAPERS = {
+    "ankara": {
+        "scraper": "pharmacies.utils.ankaraeo_scraper.get_ankara_data",
+        "endpoint": "ankara_scraper",
+        "source": "https://mvc.aeo.org.tr",
+    },
+    "eskisehir": {
+        "scraper": "pharmacies.utils.eskisehireo_scraper.get_eskisehir_data",
+        "endpoint": "eskisehir_scraper",
+        "source": "https://www.eskisehireo.org.tr",
+    },
+    "istanbul": {
+        "scraper": "pharmacies.utils.istanbul_saglik_scraper.get_istanbul_data",
+        "endpoint": "istanbul_scraper",
+        "source": "https://nobetcieczane.istanbulsaglik.gov.tr:88",
+        "concurrency": ISTANBUL_SCRAPER_CONCURRENCY,
+    },
+}
+# Origins whose connections are opened when a web or Celery worker starts.
+HTTP_CLIENT_WARM_ORIGINS = {
+    "web": ["https://maps.googleapis.com"],
+    "worker": [scraper["source"] for scraper in PHARMACY_SCRAPERS.values()],
+}
+
+# Per-namespace settings for pharmacies.cache.TwoTierCache. TTL applies to the
+# shared (L2) cache, L1_TTL/L1_MAXSIZE/L1_MAX_BYTES to the in-process store in
+# each worker. Values pickling to COMPRESS_MIN_BYTES or more are compressed in
+# L2. Entries older than SOFT_TTL are served stale and refreshed in the
+# background; only entries past TTL block. Unset keys use
+# pharmacies.cache.DEFAULT_NAMESPACE_CONFIG.
+PHARMACY_CACHE_NAMESPACES = {
+    "geocode": {
+        "TTL": env_int("GEOCODE_CACHE_TTL", 60 * 60 * 24 * 30),
+        "L1_TTL": env_int("GEOCODE_CACHE_L1_TTL", 60 * 60),
+        "L1_MAXSIZE": env_int("GEOCODE_CACHE_L1_MAXSIZE", 4096),
+    },
+    # Keys are versioned; the TTL only bounds storage of superseded entries.
+    "pharmacy_points": {
+        "TTL": env_int("PHARMACY_POINTS_CACHE_TTL", 60 * 60 * 24),
+        "L1_TTL": 60 * 60,
+        "L1_MAXSIZE": 2048,
+    },
+    "places": {
+        "TTL": env_int("PLACES_CACHE_TTL", 60 * 60),
+        "SOFT_TTL": env_int("PLACES_CACHE_SOFT_TTL", 30 * 60),
+        "L1_TTL": 10 * 60,
+        "L1_MAXSIZE": 1024,
+    },
+    "distance_matrix": {
+        "TTL": env_int("DISTANCE_MATRIX_CACHE_TTL", 60 * 60 * 24),
+        "SOFT_TTL": env_int("DISTANCE_MATRIX_CACHE_SOFT_TTL", 60 * 60 * 12),
+        "L1_TTL": 10 * 60,
+        "L1_MAXSIZE": 1024,
+    },
+    # Roster snapshots are keyed by city and roster version. Each worker keeps
+    # its own copy in memory, so L1 only needs to hold the latest builds.
+    "roster": {
+        "TTL": 60 * 60 * 24,
+        "L1_TTL": 60,
+        "L1_MAXSIZE": 16,
+        "L1_MAX_BYTES": 64 * 1024 * 1024,
+    },
+    # Gzipped GeoJSON keyed by city and roster version; stored as-is.
+    "duty_geojson": {
+        "TTL": 60 * 60 * 24,
+        "L1_TTL": 60 * 60,
+        "L1_MAXSIZE": 16,
+        "COMPRESS_MIN_BYTES": None,
+    },
+    "travel_estimator": {
+        "TTL": 60 * 60 * 24,
+        "L1_TTL": 5 * 60,
+        "L1_MAXSIZE": 1,
+    },
 }
+# Threads per process that refresh stale cache entries in the background.
+CACHE_REFRESH_WORKERS = env_int("CACHE_REFRESH_WORKERS", 2)
 
 
 # Password validation
@@ -0,0 +1,25 @@
+from collections.abc import Iterator
+
+import pytest
+
+from pharmacies.cache import clear_all_caches
+from pharmacies.utils.city_registry import reset_city_registry
+from pharmacies.utils.city_resolver import reset_city_boundary_index
+from pharmacies.utils.hot_cells import reset_hot_cells
+from pharmacies.utils.roster_snapshot import reset_roster_snapshots
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    """Keep cached upstream lookups from leaking between tests."""
+    clear_all_caches()
+    reset_city_boundary_index()
+    reset_city_registry()
+    reset_roster_snapshots()
+    reset_hot_cells()
+    yield
+    clear_all_caches()
+    reset_city_boundary_index()
+    reset_city_registry()
+    reset_roster_snapshots()
+    reset_hot_cells()
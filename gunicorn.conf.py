@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration.
+
+Gunicorn loads this file automatically when started from the project root.
+"""
+
+from typing import Any
+
+
+def post_worker_init(worker: Any) -> None:
+    """
+    Open keep-alive connections to Google and load the city registry before
+    the first request.
+    """
+    from django.conf import settings
+
+    from pharmacies import http_client
+    from pharmacies.utils.city_registry import preload_city_registry
+
+    http_client.warm_up(settings.HTTP_CLIENT_WARM_ORIGINS["web"])
+    preload_city_registry()
+
+
+def post_request(worker: Any, req: Any, environ: Any, resp: Any) -> None:
+    """Periodically log database pool wait times."""
+    from pharmacies.db_pool import report_pool_stats
+
+    report_pool_stats()
@@ -2,7 +2,13 @@ from django.contrib import admin
 from django.db.models import QuerySet
 from django.http import HttpRequest
 
-from pharmacies.models import City, Pharmacy, ScraperConfig, WorkingSchedule
+from pharmacies.models import (
+    City,
+    Pharmacy,
+    ScraperConfig,
+    ScrapeSource,
+    WorkingSchedule,
+)
 from pharmacies.tasks import run_scraper
 
 
@@ -27,6 +33,12 @@ class WorkingScheduleAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
     )
 
 
+@admin.register(ScrapeSource)
+class ScrapeSourceAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ("city", "key", "checked_at", "changed_at", "unchanged_runs")
+    list_filter = ("city",)
+
+
 @admin.register(ScraperConfig)
 class ScraperConfigAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
     list_display = ("city", "interval", "last_run")
@@ -15,3 +15,7 @@ class PharmaciesConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "pharmacies"
+
+    def ready(self) -> None:
+        """Register signal handlers."""
+        from pharmacies import signals  # noqa: F401
@@ -0,0 +1,359 @@
+"""
+Two-tier caching for upstream lookups in the Pharmacies application.
+
+Each namespace keeps a small process-local L1 store in front of the shared
+Django cache (L2, Redis in production). Gunicorn workers therefore reuse each
+other's results, while hot keys are answered without a network round trip.
+Namespaces are configured through ``settings.PHARMACY_CACHE_NAMESPACES``.
+
+L1 is bounded both by entry count and by the pickled size of its values, so a
+few large payloads (Distance Matrix responses, roster snapshots) cannot crowd
+out the process. The size is measured once, when a value is set, and stored
+alongside it in L2. Values whose pickled size reaches ``COMPRESS_MIN_BYTES``
+are zlib-compressed before they are written to L2.
+
+Namespaces with a ``SOFT_TTL`` serve stale values: once an entry is older
+than ``SOFT_TTL`` but younger than ``TTL``, ``get_or_set`` returns it right
+away and refreshes it on a background thread. Until the refresh has had
+``REFRESH_LOCK_TTL`` seconds to land, the stale L1 copy is served without
+asking L2 again. Only entries past ``TTL`` make the caller wait for the loader.
+"""
+
+import logging
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Final, TypeVar, cast
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_NAMESPACE_CONFIG: Final[dict[str, Any]] = {
+    "TTL": 60 * 60,
+    "L1_TTL": 5 * 60,
+    "L1_MAXSIZE": 1024,
+    "L1_MAX_BYTES": 4 * 1024 * 1024,
+    # None disables compression.
+    "COMPRESS_MIN_BYTES": 4 * 1024,
+    # Age in seconds after which entries are served stale and refreshed in
+    # the background; None disables stale-while-revalidate.
+    "SOFT_TTL": None,
+    # Upper bound on how long one worker owns a background refresh.
+    "REFRESH_LOCK_TTL": 30,
+    "ALIAS": "default",
+}
+
+_MISSING: Final = object()
+
+
+@dataclass(frozen=True)
+class _Compressed:
+    """Marker for a zlib-compressed pickle stored in L2."""
+
+    data: bytes
+
+
+@dataclass(frozen=True)
+class _Sized:
+    """Uncompressed value stored in L2 with its pickled size."""
+
+    value: Any
+    size: int
+
+
+@dataclass(frozen=True)
+class _Entry:
+    """Value of a namespace with a ``SOFT_TTL`` and its wall-clock freshness."""
+
+    value: Any
+    fresh_until: float
+
+    @property
+    def is_stale(self) -> bool:
+        return self.fresh_until <= time.time()
+
+
+def _unwrap(stored: Any) -> Any:
+    return stored.value if isinstance(stored, _Entry) else stored
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss/eviction counters for a single cache namespace (per process)."""
+
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    stale_hits: int = 0
+    refreshes: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dictionary."""
+        return asdict(self)
+
+
+class TwoTierCache:
+    """
+    Process-local L1 cache backed by a shared Django cache (L2).
+
+    Lookups try L1 first, then L2; only a miss on both tiers calls the loader.
+    Values written to L2 use the namespace TTL, while L1 entries expire after
+    the (shorter) L1 TTL so workers pick up changes made by other processes.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self.stats = CacheStats()
+        # key -> (expires_at, size in bytes, value)
+        self._l1: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._l1_bytes = 0
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> dict[str, Any]:
+        """Return the effective configuration for this namespace."""
+        configured = getattr(settings, "PHARMACY_CACHE_NAMESPACES", {})
+        return {**DEFAULT_NAMESPACE_CONFIG, **configured.get(self.namespace, {})}
+
+    @property
+    def l1_bytes(self) -> int:
+        """Pickled size of the values currently held in L1."""
+        return self._l1_bytes
+
+    def _make_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _l1_get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._l1[key]
+                self._l1_bytes -= size
+                return _MISSING
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_set(self, key: str, value: Any, size: int) -> None:
+        config = self.config
+        l1_ttl = min(config["L1_TTL"], config["TTL"])
+        with self._lock:
+            previous = self._l1.pop(key, None)
+            if previous is not None:
+                self._l1_bytes -= previous[1]
+            if size > config["L1_MAX_BYTES"]:
+                return
+            self._l1[key] = (time.monotonic() + l1_ttl, size, value)
+            self._l1_bytes += size
+            while (
+                len(self._l1) > config["L1_MAXSIZE"]
+                or self._l1_bytes > config["L1_MAX_BYTES"]
+            ):
+                _, (_, evicted_size, _) = self._l1.popitem(last=False)
+                self._l1_bytes -= evicted_size
+                self.stats.evictions += 1
+
+    def _l1_retime(self, cache_key: str, entry: _Entry, fresh_until: float) -> _Entry:
+        """Replace ``entry`` in L1 by a copy fresh until ``fresh_until``."""
+        retimed = _Entry(entry.value, fresh_until)
+        with self._lock:
+            held = self._l1.get(cache_key)
+            if held is not None and held[2] is entry:
+                self._l1[cache_key] = (held[0], held[1], retimed)
+        return retimed
+
+    def _l2_get(self, cache_key: str) -> Any:
+        stored = caches[self.config["ALIAS"]].get(cache_key, _MISSING)
+        if stored is _MISSING:
+            return _MISSING
+        if isinstance(stored, _Compressed):
+            payload = zlib.decompress(stored.data)
+            stored = pickle.loads(payload)
+            size = len(payload)
+        elif isinstance(stored, _Sized):
+            stored, size = stored.value, stored.size
+        else:
+            # Written before sizes were stored with the value.
+            size = len(pickle.dumps(stored, pickle.HIGHEST_PROTOCOL))
+        self._l1_set(cache_key, stored, size)
+        return stored
+
+    def _lookup(self, cache_key: str) -> Any:
+        stored = self._l1_get(cache_key)
+        if stored is not _MISSING:
+            self.stats.l1_hits += 1
+            if not (isinstance(stored, _Entry) and stored.is_stale):
+                return stored
+            # Another worker may already have refreshed the shared copy.
+            fresher = self._l2_get(cache_key)
+            return stored if fresher is _MISSING else fresher
+
+        stored = self._l2_get(cache_key)
+        if stored is not _MISSING:
+            self.stats.l2_hits += 1
+        else:
+            self.stats.misses += 1
+        return stored
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return the cached value for ``key`` or ``default`` on a miss.
+
+        Stale values are returned as-is; only ``get_or_set`` refreshes them.
+        """
+        stored = self._lookup(self._make_key(key))
+        return default if stored is _MISSING else _unwrap(stored)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` in both tiers, compressing large values in L2."""
+        cache_key = self._make_key(key)
+        config = self.config
+
+        stored: Any = value
+        if config["SOFT_TTL"] is not None:
+            stored = _Entry(value, time.time() + config["SOFT_TTL"])
+        payload = pickle.dumps(stored, pickle.HIGHEST_PROTOCOL)
+
+        shared: Any = _Sized(stored, len(payload))
+        compress_min_bytes = config["COMPRESS_MIN_BYTES"]
+        if compress_min_bytes is not None and len(payload) >= compress_min_bytes:
+            shared = _Compressed(zlib.compress(payload))
+
+        caches[config["ALIAS"]].set(cache_key, shared, timeout=config["TTL"])
+        self._l1_set(cache_key, stored, len(payload))
+
+    def get_or_set(self, key: str, loader: Callable[[], T]) -> T:
+        """
+        Return the cached value for ``key``, calling ``loader`` on a true miss.
+
+        A stale value is returned immediately while ``loader`` refreshes it in
+        the background. Exceptions raised by ``loader`` propagate on a miss and
+        are logged during a refresh; nothing is cached either way.
+        """
+        cache_key = self._make_key(key)
+        stored = self._lookup(cache_key)
+        if stored is _MISSING:
+            value = loader()
+            self.set(key, value)
+            return value
+
+        if isinstance(stored, _Entry) and stored.is_stale:
+            self.stats.stale_hits += 1
+            self._refresh(key, loader, stored)
+        return cast(T, _unwrap(stored))
+
+    def _refresh(self, key: str, loader: Callable[[], Any], stale: _Entry) -> None:
+        """Reload ``key`` on the refresh pool unless a refresh is under way."""
+        cache_key = self._make_key(key)
+        config = self.config
+        # Keep serving the stale copy from L1 while the refresh is in flight,
+        # here or on another worker, instead of re-reading L2 on every hit.
+        pending = self._l1_retime(
+            cache_key, stale, time.time() + config["REFRESH_LOCK_TTL"]
+        )
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        shared = caches[config["ALIAS"]]
+        lock_key = f"{cache_key}:refreshing"
+        if not shared.add(lock_key, True, timeout=config["REFRESH_LOCK_TTL"]):
+            # Another worker is refreshing this key.
+            with self._lock:
+                self._refreshing.discard(cache_key)
+            return
+
+        def refresh() -> None:
+            try:
+                self.set(key, loader())
+                self.stats.refreshes += 1
+            except Exception:
+                logger.warning(
+                    "Could not refresh %s; serving the stale value.",
+                    cache_key,
+                    exc_info=True,
+                )
+                # Let the next request retry.
+                self._l1_retime(cache_key, pending, stale.fresh_until)
+            finally:
+                shared.delete(lock_key)
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+                # Loaders may query the database from the pool thread.
+                connections.close_all()
+
+        _submit_refresh(refresh)
+
+    def clear_local(self) -> None:
+        """Drop every L1 entry held by this process."""
+        with self._lock:
+            self._l1.clear()
+            self._l1_bytes = 0
+
+
+_registry: dict[str, TwoTierCache] = {}
+_registry_lock = threading.Lock()
+_refresh_pool: ThreadPoolExecutor | None = None
+
+
+def _submit_refresh(refresh: Callable[[], None]) -> None:
+    global _refresh_pool
+
+    with _registry_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(
+                max_workers=settings.CACHE_REFRESH_WORKERS,
+                thread_name_prefix="cache-refresh",
+            )
+    _refresh_pool.submit(refresh)
+
+
+def get_cache(namespace: str) -> TwoTierCache:
+    """Return the process-wide ``TwoTierCache`` for ``namespace``."""
+    with _registry_lock:
+        cache = _registry.get(namespace)
+        if cache is None:
+            cache = _registry[namespace] = TwoTierCache(namespace)
+        return cache
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """
+    Return the counters and L1 occupancy of every namespace used by this
+    process.
+    """
+    with _registry_lock:
+        return {
+            name: {
+                **cache.stats.as_dict(),
+                "l1_entries": len(cache._l1),
+                "l1_bytes": cache.l1_bytes,
+            }
+            for name, cache in _registry.items()
+        }
+
+
+def clear_all_caches() -> None:
+    """Clear every L1 store and the configured Django caches (used by tests)."""
+    with _registry_lock:
+        namespaces = list(_registry.values())
+    for cache in namespaces:
+        cache.clear_local()
+        cache.stats = CacheStats()
+    for alias in settings.CACHES:
+        caches[alias].clear()
@@ -0,0 +1,71 @@
+"""
+Usage metrics for the database connection pool.
+
+With ``DB_POOL_ENABLED`` every process holds a psycopg pool. Its counters show
+whether the pool is sized for the load: ``requests_wait_ms`` and
+``requests_queued`` grow when requests wait for a free connection. Web and
+Celery workers log and reset them at most every ``DB_POOL_STATS_INTERVAL``
+seconds.
+"""
+
+import logging
+import threading
+import time
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_next_report = 0.0
+_report_lock = threading.Lock()
+
+
+def _get_pool(alias: str) -> Any:
+    # Only the PostgreSQL backend has a pool, and only with OPTIONS["pool"].
+    return getattr(connections[alias], "pool", None)
+
+
+def get_pool_stats(alias: str = DEFAULT_DB_ALIAS) -> dict[str, int]:
+    """Return the pool counters of this process, or ``{}`` without a pool."""
+    pool = _get_pool(alias)
+    return dict(pool.get_stats()) if pool is not None else {}
+
+
+def report_pool_stats(alias: str = DEFAULT_DB_ALIAS) -> None:
+    """Log and reset the pool counters once the report interval has elapsed."""
+    global _next_report
+
+    now = time.monotonic()
+    with _report_lock:
+        if now < _next_report:
+            return
+        _next_report = now + settings.DB_POOL_STATS_INTERVAL
+
+    pool = _get_pool(alias)
+    if pool is None:
+        return
+
+    stats = pool.pop_stats()
+    requests = stats.get("requests_num", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    logger.info(
+        "Database pool %s: %d requests, %d queued, %.1f ms average wait, "
+        "%d timeouts, %d/%d connections idle.",
+        alias,
+        requests,
+        stats.get("requests_queued", 0),
+        wait_ms / requests if requests else 0.0,
+        stats.get("requests_errors", 0),
+        stats.get("pool_available", 0),
+        stats.get("pool_size", 0),
+    )
+
+
+def reset_pool_stats_report() -> None:
+    """Report on the next call again; used by tests."""
+    global _next_report
+
+    with _report_lock:
+        _next_report = 0.0
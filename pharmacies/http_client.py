@@ -0,0 +1,290 @@
+"""
+Shared HTTP client for every outbound request.
+
+All Google API calls and scraper fetches go through one ``requests.Session``
+per process. Its adapter keeps a keep-alive connection pool per host, retries
+connection errors and throttling/5xx responses with exponential backoff, and
+applies a ``(connect, read)`` timeout chosen by the logical endpoint name.
+Pools can be warmed when a web or Celery worker starts, and request counts,
+errors, latency and connection reuse are exposed by ``get_http_client_stats``.
+
+``arequest``/``aget``/``apost`` are the async counterparts for the ASGI view.
+They send through one ``httpx.AsyncClient`` per event loop, with the same
+endpoint timeouts, retry settings and statistics.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class EndpointStats:
+    """Counters for requests made to one logical endpoint."""
+
+    requests: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters with the average latency in milliseconds."""
+        data = asdict(self)
+        data["avg_ms"] = (
+            round(self.total_seconds / self.requests * 1000, 1) if self.requests else 0
+        )
+        return data
+
+
+_session: requests.Session | None = None
+_session_pid: int | None = None
+_session_lock = threading.Lock()
+_stats: defaultdict[str, EndpointStats] = defaultdict(EndpointStats)
+_stats_lock = threading.Lock()
+# One async client per event loop: connections cannot be shared between loops.
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=settings.HTTP_CLIENT_RETRIES,
+        backoff_factor=settings.HTTP_CLIENT_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        # The Istanbul scraper POSTs a read-only query, so POST is safe to retry.
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_CLIENT_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_CLIENT_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return this process's pooled session.
+
+    Sessions are rebuilt after a fork so that worker processes never share
+    sockets inherited from their parent.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    session = _session
+    if session is not None and _session_pid == pid:
+        return session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _session = _build_session()
+            _session_pid = pid
+        return _session
+
+
+def get_timeout(endpoint: str) -> tuple[float, float]:
+    """Return the ``(connect, read)`` timeout configured for an endpoint."""
+    timeouts = settings.HTTP_CLIENT_TIMEOUTS
+    return tuple(timeouts.get(endpoint, timeouts["default"]))  # type: ignore[return-value]
+
+
+def _record(endpoint: str, elapsed: float, failed: bool) -> None:
+    with _stats_lock:
+        stats = _stats[endpoint]
+        stats.requests += 1
+        stats.total_seconds += elapsed
+        if failed:
+            stats.errors += 1
+
+
+def request(
+    method: str, url: str, *, endpoint: str, **kwargs: Any
+) -> requests.Response:
+    """
+    Send a request through the shared session.
+
+    ``endpoint`` names the upstream API for timeouts and statistics; an
+    explicit ``timeout`` keyword overrides the configured one.
+    """
+    kwargs.setdefault("timeout", get_timeout(endpoint))
+    started = time.perf_counter()
+    failed = False
+    try:
+        return get_session().request(method, url, **kwargs)
+    except requests.RequestException:
+        failed = True
+        raise
+    finally:
+        _record(endpoint, time.perf_counter() - started, failed)
+
+
+def get(url: str, *, endpoint: str, **kwargs: Any) -> requests.Response:
+    """Send a GET request through the shared session."""
+    return request("GET", url, endpoint=endpoint, **kwargs)
+
+
+def post(url: str, *, endpoint: str, **kwargs: Any) -> requests.Response:
+    """Send a POST request through the shared session."""
+    return request("POST", url, endpoint=endpoint, **kwargs)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ASYNC_HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _backoff(retry: int) -> float:
+    # Same schedule as urllib3: no delay before the first retry.
+    if retry <= 1:
+        return 0.0
+    return float(settings.HTTP_CLIENT_BACKOFF_FACTOR * 2 ** (retry - 1))
+
+
+async def arequest(
+    method: str, url: str, *, endpoint: str, **kwargs: Any
+) -> httpx.Response:
+    """
+    Send a request through the event loop's pooled async client.
+
+    Connection errors and ``RETRY_STATUS_CODES`` responses are retried up to
+    ``HTTP_CLIENT_RETRIES`` times with backoff, like the sync session; the
+    last response is returned as-is. ``endpoint`` and ``timeout`` behave as in
+    ``request``.
+    """
+    if "timeout" not in kwargs:
+        connect, read = get_timeout(endpoint)
+        kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+    client = get_async_client()
+    retries = settings.HTTP_CLIENT_RETRIES
+    started = time.perf_counter()
+    failed = False
+    try:
+        retry = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if retry == retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or retry == retries:
+                    return response
+                await response.aclose()
+            retry += 1
+            await asyncio.sleep(_backoff(retry))
+    except httpx.HTTPError:
+        failed = True
+        raise
+    finally:
+        _record(endpoint, time.perf_counter() - started, failed)
+
+
+async def aget(url: str, *, endpoint: str, **kwargs: Any) -> httpx.Response:
+    """Send a GET request through the async client."""
+    return await arequest("GET", url, endpoint=endpoint, **kwargs)
+
+
+async def apost(url: str, *, endpoint: str, **kwargs: Any) -> httpx.Response:
+    """Send a POST request through the async client."""
+    return await arequest("POST", url, endpoint=endpoint, **kwargs)
+
+
+def _warm_up(origins: list[str]) -> None:
+    session = get_session()
+    for origin in origins:
+        try:
+            session.head(origin, timeout=get_timeout("default"))
+        except requests.RequestException as exc:
+            logger.info("Could not warm HTTP connection to %s: %s", origin, exc)
+
+
+def warm_up(origins: Iterable[str], background: bool = True) -> None:
+    """
+    Open keep-alive connections to ``origins`` ahead of the first request.
+
+    Runs in a daemon thread by default so worker startup is not delayed.
+    """
+    origins = list(origins)
+    if not origins:
+        return
+    if background:
+        threading.Thread(
+            target=_warm_up, args=(origins,), name="http-warm-up", daemon=True
+        ).start()
+    else:
+        _warm_up(origins)
+
+
+def get_http_client_stats() -> dict[str, Any]:
+    """
+    Return per-endpoint counters and per-host connection pool usage.
+
+    ``connections_opened`` lower than ``requests`` for a host means
+    connections were reused.
+    """
+    with _stats_lock:
+        endpoints = {name: stats.as_dict() for name, stats in _stats.items()}
+
+    pools: dict[str, dict[str, int]] = {}
+    session = _session
+    if session is not None and _session_pid == os.getpid():
+        adapter = session.get_adapter("https://")
+        pool_manager = getattr(adapter, "poolmanager", None)
+        if pool_manager is not None:
+            for key in pool_manager.pools.keys():
+                pool = pool_manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                    "requests": pool.num_requests,
+                    "connections_opened": pool.num_connections,
+                }
+
+    return {"endpoints": endpoints, "pools": pools}
+
+
+def reset_http_client() -> None:
+    """Close the shared session, forget the async clients and reset statistics."""
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
+    # Async clients are closed with their event loop.
+    _async_clients.clear()
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,63 @@
+"""
+Management command to compare the parse throughput of the HTML backends.
+"""
+
+import time
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from pharmacies.utils.html_parser import BACKENDS, parse_blocks
+
+
+class Command(BaseCommand):
+    """
+    Management command to time ``parse_blocks`` on saved scraper pages.
+
+    Each page is parsed ``--iterations`` times per backend, and the
+    blocks are queried the way the scrapers query them, so the numbers reflect
+    a full scrape. Save pages with e.g. ``curl -o page.html <url>``.
+    """
+
+    help = "Benchmarks the scraper HTML parser backends on saved pages"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register command line arguments."""
+        parser.add_argument("pages", nargs="+", help="Saved HTML pages")
+        parser.add_argument(
+            "--selector",
+            default=".card",
+            help="Blocks to parse, e.g. .card (Istanbul) or div.nobetci (Eskişehir)",
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Parses per page and backend"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Parse every page with every backend and report throughput."""
+        try:
+            pages = [
+                Path(page).read_text(encoding="utf-8") for page in options["pages"]
+            ]
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+        iterations = options["iterations"]
+        megabytes = sum(len(page.encode()) for page in pages) * iterations / 1e6
+
+        for backend in BACKENDS:
+            blocks = 0
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for page in pages:
+                    for block in parse_blocks(page, options["selector"], backend):
+                        # Touch the text like the scrapers do.
+                        block.text()
+                        blocks += 1
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{backend:<12} {len(pages) * iterations / elapsed:10.1f} pages/s "
+                f"{megabytes / elapsed:8.2f} MB/s "
+                f"{blocks // iterations:6d} blocks/iteration"
+            )
@@ -0,0 +1,151 @@
+"""
+Management command to fit the local travel-time estimator.
+"""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from pharmacies.utils.travel_estimator import (
+    TravelSample,
+    collect_travel_time_samples,
+    fit_calibrations,
+    haversine_distance,
+    save_calibrations,
+)
+from pharmacies.utils.utils import normalize_string, parse_location_identifier
+
+
+def _load_json(path: Path) -> Any:
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise CommandError(f"Unable to read {path}: {exc}") from exc
+
+
+def _recorded_destinations(
+    snapshots: dict[str, Any],
+    origin: str,
+    pharmacies: list[dict[str, Any]],
+    element_count: int,
+) -> tuple[str, list[tuple[float, float]]] | None:
+    """
+    Return the city and destinations a Distance Matrix snapshot was taken for.
+
+    The recorder stores them under ``destinations:<origin>``. Snapshots
+    without them, or whose element count does not match them, are skipped.
+    """
+    stored = snapshots.get(f"destinations:{origin}")
+    geocode = snapshots.get(f"geocode:{origin}")
+    if stored is None or not geocode:
+        return None
+    try:
+        identifier = normalize_string(parse_location_identifier(geocode))
+    except (KeyError, ValueError):
+        return None
+
+    city_pharmacies = [
+        p for p in pharmacies if normalize_string(p["city"]) in identifier
+    ]
+    if not city_pharmacies:
+        return None
+    city_name = city_pharmacies[0]["city"]
+
+    destinations = [(d["lat"], d["lng"]) for d in stored]
+    if len(destinations) != element_count:
+        return None
+    return city_name, destinations
+
+
+def iter_snapshot_samples(
+    snapshots: dict[str, Any], pharmacies: list[dict[str, Any]]
+) -> Iterator[TravelSample]:
+    """
+    Yield samples from recorded Google API snapshots.
+
+    Each matrix element is paired with the destination it was requested for,
+    see ``_recorded_destinations``.
+    """
+    for key, matrix in snapshots.items():
+        if not key.startswith("distancematrix:") or matrix.get("status") != "OK":
+            continue
+
+        origin = key.split(":", 1)[1]
+        elements = matrix["rows"][0]["elements"]
+        recorded = _recorded_destinations(snapshots, origin, pharmacies, len(elements))
+        if recorded is None:
+            continue
+
+        city_name, destinations = recorded
+        origin_lat, origin_lng = (float(value) for value in origin.split(","))
+        for (lat, lng), element in zip(destinations, elements, strict=True):
+            if element.get("status") != "OK":
+                continue
+            yield TravelSample(
+                city=city_name,
+                time_bucket="",
+                straight_distance=haversine_distance(origin_lat, origin_lng, lat, lng),
+                road_distance=element["distance"]["value"],
+                duration=element["duration"]["value"],
+            )
+
+
+class Command(BaseCommand):
+    """
+    Management command to calibrate the local travel-time estimator.
+
+    Fits detour factors and average speeds per city and time-of-day bucket
+    from the durable ``TravelTime`` cache, or from recorded API snapshots when
+    ``--snapshots`` and ``--pharmacies`` are given.
+    """
+
+    help = "Fits travel-time estimator calibrations from stored Distance Matrix data"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register command line arguments."""
+        parser.add_argument(
+            "--snapshots",
+            type=Path,
+            help="Recorded Google API snapshots (e.g. tests/fixtures/google_api_snapshots.json)",
+        )
+        parser.add_argument(
+            "--pharmacies",
+            type=Path,
+            help="Pharmacies the snapshots were recorded against",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Execute the calibration."""
+        snapshots_path: Path | None = options["snapshots"]
+        pharmacies_path: Path | None = options["pharmacies"]
+
+        if snapshots_path is not None:
+            if pharmacies_path is None:
+                raise CommandError("--snapshots requires --pharmacies")
+            samples = list(
+                iter_snapshot_samples(
+                    _load_json(snapshots_path), _load_json(pharmacies_path)
+                )
+            )
+        else:
+            samples = list(collect_travel_time_samples())
+
+        calibrations = fit_calibrations(samples)
+        for (city_name, time_bucket), calibration in sorted(calibrations.items()):
+            self.stdout.write(
+                f"{city_name} {time_bucket or 'all-day'}: "
+                f"detour={calibration.detour_factor:.2f} "
+                f"speed={calibration.speed * 3.6:.1f} km/h "
+                f"(n={calibration.sample_count})"
+            )
+
+        saved = save_calibrations(calibrations)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Saved {saved} calibrations from {len(samples)} samples"
+            )
+        )
@@ -0,0 +1,44 @@
+"""
+Management command to list the most requested origin cells.
+"""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from pharmacies.models import City
+
+
+class Command(BaseCommand):
+    """
+    Management command to dump the hottest origin cells per city.
+
+    Counts come from the ``OriginCellTraffic`` table, which web workers update
+    every ``HOT_CELLS_FLUSH_INTERVAL`` seconds.
+    """
+
+    help = "Lists the origin cells with the most pharmacy point requests"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register command line arguments."""
+        parser.add_argument("--city", help="Only list cells of this city")
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Cells listed per city"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """List the hottest cells."""
+        cities = City.objects.filter(origin_cell_traffic__isnull=False).distinct()
+        if options["city"]:
+            cities = cities.filter(name=options["city"])
+
+        listed = False
+        for city in cities.order_by("name"):
+            self.stdout.write(self.style.MIGRATE_HEADING(city.name))
+            rows = city.origin_cell_traffic.order_by("-requests", "origin_cell")
+            for row in rows[: options["limit"]]:
+                self.stdout.write(f"  {row.origin_cell}\t{row.requests}")
+            listed = True
+
+        if not listed:
+            self.stdout.write("No request counts recorded yet.")
@@ -0,0 +1,78 @@
+"""
+Management command to load city boundaries from a local GeoJSON file.
+"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from pharmacies.models import City
+from pharmacies.utils.city_resolver import reset_city_boundary_index
+from pharmacies.utils.utils import normalize_string
+
+
+def _to_multipolygon(geometry: dict[str, Any]) -> MultiPolygon:
+    """Convert a GeoJSON (Multi)Polygon geometry into a WGS84 MultiPolygon."""
+    geos_geometry = GEOSGeometry(json.dumps(geometry), srid=4326)
+    if isinstance(geos_geometry, Polygon):
+        geos_geometry = MultiPolygon(geos_geometry, srid=4326)
+    if not isinstance(geos_geometry, MultiPolygon):
+        raise CommandError(
+            f"Unsupported geometry type for a city boundary: {geos_geometry.geom_type}"
+        )
+    return geos_geometry
+
+
+class Command(BaseCommand):
+    """
+    Management command to load province boundaries into ``City.boundary``.
+
+    Each GeoJSON feature is matched to an existing city by comparing the
+    normalized value of ``--name-property`` with the normalized city name.
+    Features without a matching city are skipped.
+    """
+
+    help = "Loads city boundary polygons from a GeoJSON FeatureCollection"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Register command line arguments."""
+        parser.add_argument("path", type=Path, help="Path to the GeoJSON file")
+        parser.add_argument(
+            "--name-property",
+            default="name",
+            help="Feature property holding the province name (default: name)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Execute the import."""
+        path: Path = options["path"]
+        name_property: str = options["name_property"]
+
+        try:
+            with path.open(encoding="utf-8") as f:
+                collection = json.load(f)
+        except (OSError, json.JSONDecodeError) as exc:
+            raise CommandError(f"Unable to read GeoJSON file {path}: {exc}") from exc
+
+        cities = {normalize_string(city.name): city for city in City.objects.all()}
+        loaded = 0
+
+        for feature in collection.get("features", []):
+            feature_name = (feature.get("properties") or {}).get(name_property)
+            if not feature_name:
+                continue
+
+            city = cities.get(normalize_string(str(feature_name)))
+            if city is None:
+                continue
+
+            city.boundary = _to_multipolygon(feature["geometry"])
+            city.save(update_fields=["boundary"])
+            loaded += 1
+            self.stdout.write(f"City '{city.name}': boundary loaded")
+
+        reset_city_boundary_index()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} city boundaries"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:17
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacies', '0007_scraperconfig'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='boundary',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+    ]
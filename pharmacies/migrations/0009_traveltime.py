@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacies', '0008_city_boundary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_cell', models.CharField(max_length=32)),
+                ('distance', models.PositiveIntegerField(help_text='Road distance in meters')),
+                ('duration', models.PositiveIntegerField(help_text='Travel duration in seconds')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pharmacy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travel_times', to='pharmacies.pharmacy')),
+            ],
+            options={
+                'verbose_name': 'Travel Time',
+                'verbose_name_plural': 'Travel Times',
+                'constraints': [models.UniqueConstraint(fields=('origin_cell', 'pharmacy'), name='unique_travel_time_per_origin_cell')],
+            },
+        ),
+    ]
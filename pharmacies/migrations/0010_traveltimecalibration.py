@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacies', '0009_traveltime'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelTimeCalibration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time_bucket', models.CharField(blank=True, default='', max_length=16)),
+                ('detour_factor', models.FloatField()),
+                ('speed', models.FloatField(help_text='Average travel speed in meters per second')),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travel_time_calibrations', to='pharmacies.city')),
+            ],
+            options={
+                'verbose_name': 'Travel Time Calibration',
+                'verbose_name_plural': 'Travel Time Calibrations',
+                'constraints': [models.UniqueConstraint(fields=('city', 'time_bucket'), name='unique_travel_time_calibration_per_bucket')],
+            },
+        ),
+    ]
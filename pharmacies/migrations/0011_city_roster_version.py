@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacies', '0010_traveltimecalibration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='roster_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacies', '0011_city_roster_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OriginCellTraffic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_cell', models.CharField(max_length=32)),
+                ('requests', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='origin_cell_traffic', to='pharmacies.city')),
+            ],
+            options={
+                'verbose_name': 'Origin Cell Traffic',
+                'verbose_name_plural': 'Origin Cell Traffic',
+                'constraints': [models.UniqueConstraint(fields=('city', 'origin_cell'), name='unique_origin_cell_traffic_per_city')],
+            },
+        ),
+    ]
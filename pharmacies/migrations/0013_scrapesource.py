@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacies', '0012_origincelltraffic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200)),
+                ('scope', models.CharField(blank=True, default='', max_length=64)),
+                ('etag', models.CharField(blank=True, default='', max_length=200)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('checked_at', models.DateTimeField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(blank=True, null=True)),
+                ('unchanged_runs', models.PositiveIntegerField(default=0)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scrape_sources', to='pharmacies.city')),
+            ],
+            options={
+                'verbose_name': 'Scrape Source',
+                'verbose_name_plural': 'Scrape Sources',
+                'constraints': [models.UniqueConstraint(fields=('city', 'key'), name='unique_scrape_source_per_city')],
+            },
+        ),
+    ]
@@ -6,7 +6,7 @@ and Scraper Configurations, including their relationships and logic.
 """
 
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import StrEnum
 from typing import Any
 
@@ -38,10 +38,14 @@ class City(models.Model):
     Attributes:
         name: The name of the city.
         last_scraped_at: Timestamp of the last successful scraper run for this city.
+        boundary: Administrative boundary used to resolve coordinates offline.
+        roster_version: Incremented whenever the city's duty roster changes.
     """
 
     name = models.CharField(max_length=100, null=False, blank=False)
     last_scraped_at = models.DateTimeField(null=True, blank=True)
+    boundary = models.MultiPolygonField(null=True, blank=True)
+    roster_version = models.PositiveIntegerField(default=0)
 
     class Meta:
         """Meta options for City model."""
@@ -191,6 +195,27 @@ class WorkingSchedule(models.Model):
             else PharmacyStatus.CLOSED
         )
 
+    def next_status_change(self, query_time: datetime) -> datetime:
+        """
+        Return the first opening or closing time after ``query_time``.
+
+        Scrapes are scheduled at the same times, so this is also when the duty
+        roster is next expected to change.
+        """
+        for days in range(8):
+            day = query_time.date() + timedelta(days=days)
+            if day.weekday() < 5:
+                boundaries = (self.weekday_start, self.weekday_end)
+            elif day.weekday() == 5:
+                boundaries = (self.saturday_start, self.saturday_end)
+            else:
+                continue
+            for boundary in sorted(boundaries):
+                change = datetime.combine(day, boundary, tzinfo=query_time.tzinfo)
+                if change > query_time:
+                    return change
+        raise ValueError("Working schedule has no opening hours.")
+
     def __str__(self) -> str:
         return f"Schedule for {self.city.name}"
 
@@ -247,6 +272,191 @@ class Pharmacy(models.Model):
         return str(self.name)
 
 
+class TravelTime(models.Model):
+    """
+    Cached road travel metrics from an origin grid cell to a pharmacy.
+
+    Rows are keyed by a quantized origin cell rather than exact coordinates, so
+    nearby users and partially changed rosters can reuse earlier Distance
+    Matrix results.
+
+    Attributes:
+        origin_cell: Quantized origin coordinate ("lat,lng").
+        pharmacy: The destination pharmacy.
+        distance: Road distance in meters.
+        duration: Travel duration in seconds.
+        updated_at: When the metrics were last fetched from Google.
+    """
+
+    origin_cell = models.CharField(max_length=32, null=False, blank=False)
+    pharmacy = models.ForeignKey(
+        Pharmacy,
+        on_delete=models.CASCADE,
+        related_name="travel_times",
+        null=False,
+        blank=False,
+    )
+    distance = models.PositiveIntegerField(help_text="Road distance in meters")
+    duration = models.PositiveIntegerField(help_text="Travel duration in seconds")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta options for TravelTime model."""
+
+        verbose_name = "Travel Time"
+        verbose_name_plural = "Travel Times"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["origin_cell", "pharmacy"],
+                name="unique_travel_time_per_origin_cell",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.origin_cell} -> {self.pharmacy_id}"
+
+
+class TravelTimeCalibration(models.Model):
+    """
+    Fitted parameters of the local travel-time estimator.
+
+    Calibrations are fitted from stored Distance Matrix results by the
+    ``calibrate_travel_times`` management command.
+
+    Attributes:
+        city: The city the calibration applies to.
+        time_bucket: Time-of-day bucket, or blank for the all-day fit.
+        detour_factor: Ratio of road distance to straight-line distance.
+        speed: Average travel speed in meters per second.
+        sample_count: Number of Distance Matrix elements used for the fit.
+        updated_at: When the calibration was last fitted.
+    """
+
+    city = models.ForeignKey(
+        City,
+        on_delete=models.CASCADE,
+        related_name="travel_time_calibrations",
+        null=False,
+        blank=False,
+    )
+    time_bucket = models.CharField(max_length=16, blank=True, default="")
+    detour_factor = models.FloatField()
+    speed = models.FloatField(help_text="Average travel speed in meters per second")
+    sample_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta options for TravelTimeCalibration model."""
+
+        verbose_name = "Travel Time Calibration"
+        verbose_name_plural = "Travel Time Calibrations"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "time_bucket"],
+                name="unique_travel_time_calibration_per_bucket",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.city.name} {self.time_bucket or 'all-day'}"
+
+
+class OriginCellTraffic(models.Model):
+    """
+    Number of pharmacy point requests seen from an origin grid cell.
+
+    Web workers count requests in memory and periodically add their counts
+    for the hottest cells here; see ``pharmacies.utils.hot_cells``.
+
+    Attributes:
+        city: The city the requests were resolved to.
+        origin_cell: Quantized origin coordinate ("lat,lng").
+        requests: Requests counted so far.
+        updated_at: When counts were last added.
+    """
+
+    city = models.ForeignKey(
+        City,
+        on_delete=models.CASCADE,
+        related_name="origin_cell_traffic",
+        null=False,
+        blank=False,
+    )
+    origin_cell = models.CharField(max_length=32, null=False, blank=False)
+    requests = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta options for OriginCellTraffic model."""
+
+        verbose_name = "Origin Cell Traffic"
+        verbose_name_plural = "Origin Cell Traffic"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "origin_cell"],
+                name="unique_origin_cell_traffic_per_city",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.city.name} {self.origin_cell}"
+
+
+class ScrapeSource(models.Model):
+    """
+    Validators of one scraper source, used to skip unchanged pages.
+
+    Written by ``pharmacies.utils.conditional_fetch.ConditionalFetcher`` once
+    a scrape has been persisted.
+
+    Attributes:
+        city: The city the source belongs to.
+        key: The source URL or district.
+        scope: Duty window the validators apply to, for scrapers that derive
+            duty times from the clock rather than from the page.
+        etag: The upstream ETag header.
+        last_modified: The upstream Last-Modified header.
+        content_hash: SHA-256 of the response body.
+        checked_at: When the source was last fetched.
+        changed_at: When the source last changed.
+        unchanged_runs: Fetches that found the source unchanged.
+    """
+
+    city = models.ForeignKey(
+        City,
+        on_delete=models.CASCADE,
+        related_name="scrape_sources",
+        null=False,
+        blank=False,
+    )
+    key = models.CharField(max_length=200, null=False, blank=False)
+    scope = models.CharField(max_length=64, blank=True, default="")
+    etag = models.CharField(max_length=200, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    checked_at = models.DateTimeField(null=True, blank=True)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    unchanged_runs = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """Meta options for ScrapeSource model."""
+
+        verbose_name = "Scrape Source"
+        verbose_name_plural = "Scrape Sources"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "key"], name="unique_scrape_source_per_city"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.city.name} {self.key}"
+
+
 class ScraperConfig(models.Model):
     """
     Configuration for the city-specific scraper.
@@ -263,6 +473,20 @@ class ScraperConfig(models.Model):
     )
     last_run = models.DateTimeField(null=True, blank=True)
 
+    def next_run(self, query_time: datetime) -> datetime | None:
+        """
+        Return when the interval scrape is next expected after ``query_time``.
+
+        The task runs every ``interval`` hours, but ``last_run`` only moves
+        when a run saved data, so intervals that found nothing new are skipped
+        over. Returns ``None`` until the scraper has saved data once.
+        """
+        if self.last_run is None or not self.interval:
+            return None
+        interval = timedelta(hours=self.interval)
+        runs = max((query_time - self.last_run) // interval + 1, 1)
+        return self.last_run + runs * interval
+
     def save(self, *args: Any, **kwargs: Any) -> None:
         """
         Save the config and update the Celery schedule.
@@ -0,0 +1,53 @@
+"""
+Signal handlers for the Pharmacies application.
+
+Keeps process-local indexes derived from ``City``, ``WorkingSchedule`` and
+``ScraperConfig`` rows in sync with the database and bumps a city's roster version when one of
+its pharmacies is edited outside the scraper (e.g. in the admin). Other
+processes are told only once the change has committed, so that they never
+reload the old rows under the new generation token.
+"""
+
+from typing import Any
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from pharmacies.models import City, Pharmacy, ScraperConfig, WorkingSchedule
+from pharmacies.utils.city_registry import invalidate_city_registry
+from pharmacies.utils.city_resolver import reset_city_boundary_index
+from pharmacies.utils.roster_snapshot import reset_roster_snapshots
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def reset_city_indexes(sender: type[City], **kwargs: Any) -> None:
+    """Rebuild boundary-based lookups and the city registry after a city changes."""
+    transaction.on_commit(reset_city_boundary_index)
+    transaction.on_commit(invalidate_city_registry)
+
+
+@receiver(post_save, sender=WorkingSchedule)
+@receiver(post_delete, sender=WorkingSchedule)
+@receiver(post_save, sender=ScraperConfig)
+@receiver(post_delete, sender=ScraperConfig)
+def reset_city_schedules(
+    sender: type[WorkingSchedule | ScraperConfig], **kwargs: Any
+) -> None:
+    """Reload the city registry after a working schedule or scraper config changes."""
+    transaction.on_commit(invalidate_city_registry)
+
+
+@receiver(post_save, sender=Pharmacy)
+@receiver(post_delete, sender=Pharmacy)
+def bump_roster_version(
+    sender: type[Pharmacy], instance: Pharmacy, **kwargs: Any
+) -> None:
+    """Mark the pharmacy's city roster as changed so snapshots get rebuilt."""
+    City.objects.filter(pk=instance.city_id).update(
+        roster_version=F("roster_version") + 1
+    )
+    transaction.on_commit(reset_roster_snapshots)
+    transaction.on_commit(invalidate_city_registry)
@@ -0,0 +1,273 @@
+"""
+Single-flight coalescing of concurrent identical upstream lookups.
+
+When many requests miss the cache for the same key at once (e.g. at the
+evening shift handover), only one of them should call Google. Callers in the
+same process share a ``Future``; callers in other workers take turns on a short
+lock in the shared Django cache (Redis in production) and pick the leader's
+result up from a handoff key. Waiting is bounded: a follower that gives up, or
+finds the shared cache unavailable, calls the upstream itself.
+
+``asingle_flight`` does the same for coroutines. Callers on one event loop
+share a task, and the cross-worker lock and handoff key are shared with the
+sync callers.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, dataclass
+from typing import Any, Final, cast
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS: Final = "default"
+_MISSING: Final = object()
+
+
+@dataclass
+class SingleFlightStats:
+    """How calls were served by the single-flight layer (per process)."""
+
+    leader_calls: int = 0
+    local_waits: int = 0
+    remote_waits: int = 0
+    fallback_calls: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dictionary."""
+        return asdict(self)
+
+
+_stats = SingleFlightStats()
+_in_flight: dict[str, "Future[Any]"] = {}
+_in_flight_lock = threading.Lock()
+_async_in_flight: dict[
+    tuple[asyncio.AbstractEventLoop, str], "asyncio.Future[Any]"
+] = {}
+
+
+def _lock_key(key: str) -> str:
+    return f"singleflight:lock:{key}"
+
+
+def _result_key(key: str) -> str:
+    return f"singleflight:result:{key}"
+
+
+def _try_lock(key: str, token: str) -> bool:
+    return bool(
+        caches[CACHE_ALIAS].add(
+            _lock_key(key), token, timeout=settings.SINGLE_FLIGHT_LOCK_TTL
+        )
+    )
+
+
+def _hand_off(key: str, value: Any) -> None:
+    caches[CACHE_ALIAS].set(
+        _result_key(key), value, timeout=settings.SINGLE_FLIGHT_HANDOFF_TTL
+    )
+
+
+def _release(key: str, token: str) -> None:
+    cache = caches[CACHE_ALIAS]
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def _poll(key: str) -> tuple[Any, bool]:
+    """Return the handed-off result, or ``_MISSING``, and whether the lock is held."""
+    cache = caches[CACHE_ALIAS]
+    value = cache.get(_result_key(key), _MISSING)
+    return value, value is _MISSING and cache.get(_lock_key(key)) is not None
+
+
+def _call_as_leader[T](key: str, fn: Callable[[], T], token: str) -> T:
+    _stats.leader_calls += 1
+    try:
+        value = fn()
+        _hand_off(key, value)
+        return value
+    finally:
+        _release(key, token)
+
+
+def _call_across_workers[T](key: str, fn: Callable[[], T], deadline: float) -> T:
+    """
+    Call ``fn`` unless another worker is already doing so, then reuse its result.
+
+    If the leader fails it releases the lock without a result and the next
+    waiter becomes the leader, so a failing upstream is retried one caller at
+    a time instead of by the whole stampede.
+    """
+    token = uuid.uuid4().hex
+
+    # Two turns: one as a follower, one to take over after a failed leader.
+    for _ in range(2):
+        if _try_lock(key, token):
+            return _call_as_leader(key, fn, token)
+
+        _stats.remote_waits += 1
+        while time.monotonic() < deadline:
+            value, held = _poll(key)
+            if value is not _MISSING:
+                return cast(T, value)
+            # No visible holder: the leader is done, or the cache is down.
+            if not held:
+                break
+            time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        else:
+            break
+
+    logger.info("Single-flight wait for %s ended; calling upstream directly.", key)
+    _stats.fallback_calls += 1
+    return fn()
+
+
+def single_flight[T](key: str, fn: Callable[[], T]) -> T:
+    """
+    Return ``fn()``, sharing one call among concurrent callers with ``key``.
+
+    The result must be picklable, as it is handed to other workers through the
+    shared cache. Exceptions raised by ``fn`` propagate to the in-process
+    callers that waited on it.
+    """
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return fn()
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if future is None:
+            future = _in_flight[key] = Future()
+
+    if not leader:
+        _stats.local_waits += 1
+        try:
+            return cast(T, future.result(timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT))
+        except FutureTimeoutError:
+            logger.info("Single-flight wait for %s timed out.", key)
+            _stats.fallback_calls += 1
+            return fn()
+
+    try:
+        value = _call_across_workers(key, fn, deadline)
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(value)
+        return value
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
+async def _shared[T](fn: Callable[..., T], *args: Any) -> T:
+    # Shared cache calls block, so they run off the event loop.
+    return await sync_to_async(fn, thread_sensitive=False)(*args)
+
+
+async def _acall_across_workers[T](
+    key: str, fn: Callable[[], Awaitable[T]], deadline: float
+) -> T:
+    """Async counterpart of ``_call_across_workers``."""
+    token = uuid.uuid4().hex
+
+    for _ in range(2):
+        if await _shared(_try_lock, key, token):
+            _stats.leader_calls += 1
+            try:
+                value = await fn()
+                await _shared(_hand_off, key, value)
+                return value
+            finally:
+                await _shared(_release, key, token)
+
+        _stats.remote_waits += 1
+        while time.monotonic() < deadline:
+            value, held = await _shared(_poll, key)
+            if value is not _MISSING:
+                return cast(T, value)
+            if not held:
+                break
+            await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        else:
+            break
+
+    logger.info("Single-flight wait for %s ended; calling upstream directly.", key)
+    _stats.fallback_calls += 1
+    return await fn()
+
+
+def _retrieve(future: "asyncio.Future[Any]") -> None:
+    # Mark failures nobody waited for as retrieved so asyncio does not log them.
+    if not future.cancelled():
+        future.exception()
+
+
+async def asingle_flight[T](key: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    Return ``await fn()``, sharing one call among concurrent callers with
+    ``key``; see ``single_flight``.
+    """
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return await fn()
+
+    loop = asyncio.get_running_loop()
+    future = _async_in_flight.get((loop, key))
+    if future is not None:
+        _stats.local_waits += 1
+        try:
+            return cast(
+                T,
+                await asyncio.wait_for(
+                    asyncio.shield(future), settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+                ),
+            )
+        except TimeoutError:
+            logger.info("Single-flight wait for %s timed out.", key)
+        except asyncio.CancelledError:
+            # Only fall back when the leader, not this caller, was cancelled.
+            if not future.cancelled():
+                raise
+        _stats.fallback_calls += 1
+        return await fn()
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    future = _async_in_flight[(loop, key)] = loop.create_future()
+    future.add_done_callback(_retrieve)
+    try:
+        value = await _acall_across_workers(key, fn, deadline)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(value)
+        return value
+    finally:
+        _async_in_flight.pop((loop, key), None)
+
+
+def get_single_flight_stats() -> dict[str, int]:
+    """Return how calls were coalesced by this process."""
+    return _stats.as_dict()
+
+
+def reset_single_flight() -> None:
+    """Reset the counters; used by tests."""
+    global _stats
+    _stats = SingleFlightStats()
@@ -6,30 +6,96 @@ and updating the database.
 """
 
 import logging
+from collections.abc import Callable, Iterable
+from itertools import batched
 from json import JSONDecodeError
 from typing import Any
 
 from celery import shared_task
+from django.conf import settings
 from django.db import close_old_connections, transaction
 from django.db.utils import InterfaceError
 from django.utils import timezone
 from requests.exceptions import RequestException
 
-from pharmacies.models import ScraperConfig
+from pharmacies.models import City, ScraperConfig
 from pharmacies.utils import (
-    add_scraped_data_to_db,
+    cache_warming,
+    conditional_fetch,
+    duty_geojson,
     get_city_data,
+    publish_roster_update,
+    save_pharmacy_chunk,
 )
+from pharmacies.utils.conditional_fetch import ConditionalFetcher
 
 logger = logging.getLogger(__name__)
 
 
-def _persist_scraped_data(city_data: list[dict[str, Any]], city_name: str) -> int:
-    with transaction.atomic():
-        add_scraped_data_to_db(city_data, city_name=city_name)
-        return ScraperConfig.objects.filter(city__name=city_name).update(
-            last_run=timezone.now()
+def _retry_on_stale_connection[T](step: Callable[..., T], *args: Any) -> T:
+    """Run a database step, and once more on a fresh connection if it was stale."""
+    try:
+        return step(*args)
+    except InterfaceError:
+        logger.warning(
+            "Retrying %s after a stale database connection.",
+            step.__name__,
+            exc_info=True,
         )
+        close_old_connections()
+        return step(*args)
+
+
+def _save_chunk(city: City, chunk: tuple[dict[str, Any], ...]) -> int:
+    with transaction.atomic():
+        return save_pharmacy_chunk(city, chunk)
+
+
+def _persist_scraped_data(
+    city_data: Iterable[dict[str, Any]],
+    city_name: str,
+    fetcher: ConditionalFetcher | None = None,
+) -> tuple[int, int]:
+    """
+    Stream the scraped records into the database, one transaction per chunk.
+
+    The scraper runs between chunks with no transaction open, so a slow source
+    holds neither a transaction nor, under PgBouncer transaction pooling, a
+    server connection. A chunk that fails on a stale connection is written
+    again without scraping it again. The roster version, source validators and
+    ``last_run`` are written in a final transaction once every chunk is saved.
+
+    Returns the number of records saved and of ``ScraperConfig`` rows updated.
+    When nothing was scraped, only the validators of unchanged sources are
+    stored.
+    """
+    city = _retry_on_stale_connection(City.objects.get, city_name)
+    saved = created = 0
+    for chunk in batched(city_data, settings.SCRAPER_PERSIST_CHUNK_SIZE):
+        created += _retry_on_stale_connection(_save_chunk, city, chunk)
+        saved += len(chunk)
+
+    def finish() -> int:
+        with transaction.atomic():
+            if fetcher is not None and (saved or fetcher.all_unchanged):
+                fetcher.commit()
+            if not saved:
+                return 0
+            publish_roster_update(city, created=bool(created))
+            return ScraperConfig.objects.filter(city__name=city_name).update(
+                last_run=timezone.now()
+            )
+
+    return saved, _retry_on_stale_connection(finish)
+
+
+def _scrape(
+    city_name: str,
+) -> tuple[Iterable[dict[str, Any]], ConditionalFetcher | None]:
+    fetcher = (
+        ConditionalFetcher(city_name) if settings.SCRAPER_CONDITIONAL_FETCH else None
+    )
+    return get_city_data(city_name=city_name, fetcher=fetcher), fetcher
 
 
 @shared_task
@@ -38,39 +104,45 @@ def run_scraper(city_name: str) -> None:
     Execute the scraper for a specific city and save results to the database.
 
     This Celery task:
-    1. Fetches data for the given city using the appropriate scraper strategy.
-    2. Saves the scraped pharmacy data to the database.
-    3. Updates the ScraperConfig's last_run timestamp.
+    1. Streams the records of the city's scraper into the database in chunks
+       of ``SCRAPER_PERSIST_CHUNK_SIZE``, one transaction per chunk. With
+       ``SCRAPER_CONDITIONAL_FETCH``, unchanged sources are skipped, and
+       nothing is written when none of them changed.
+    2. Updates the ScraperConfig's last_run timestamp.
+    3. Queues ``build_duty_geojson`` and ``warm_city_caches`` for the new roster.
     """
     try:
         close_old_connections()
         print(f"Running scraper for city {city_name}")
-        city_data = get_city_data(city_name=city_name)
-        print(f"Scraper for city {city_name} finished")
-        if not city_data:
-            logger.warning(
-                "Scraper for city %s returned no data; skipping persistence update.",
-                city_name,
-            )
-            return
+        city_data, fetcher = _scrape(city_name)
 
         close_old_connections()
-        try:
-            rows_updated = _persist_scraped_data(city_data, city_name)
-        except InterfaceError:
-            logger.warning(
-                "Retrying scraper persistence for city %s after a stale database connection.",
-                city_name,
-                exc_info=True,
-            )
-            close_old_connections()
-            rows_updated = _persist_scraped_data(city_data, city_name)
+        saved, rows_updated = _persist_scraped_data(city_data, city_name, fetcher)
+        print(f"Scraper for city {city_name} finished")
+
+        if not saved:
+            if fetcher is not None and fetcher.all_unchanged:
+                logger.info(
+                    "Sources of city %s are unchanged; skipping persistence.",
+                    city_name,
+                )
+                conditional_fetch.record_skipped_run()
+            else:
+                logger.warning(
+                    "Scraper for city %s returned no data; skipping persistence update.",
+                    city_name,
+                )
+            return
 
-        print(f"Scraper data for city {city_name} saved to DB")
+        print(f"Scraper data for city {city_name} saved to DB ({saved} records)")
         if rows_updated:
             print(f"Scraper config for city {city_name} updated")
         else:
             print(f"No ScraperConfig found for city {city_name}")
+
+        build_duty_geojson.delay(city_name)
+        if settings.CACHE_WARMING_ENABLED:
+            warm_city_caches.delay(city_name)
     except (JSONDecodeError, RequestException):
         logger.warning(
             "Skipping scraper for city %s due to upstream fetch failure.",
@@ -80,3 +152,29 @@ def run_scraper(city_name: str) -> None:
         return
     finally:
         close_old_connections()
+
+
+@shared_task
+def warm_city_caches(city_name: str) -> dict[str, int]:
+    """
+    Precompute duty responses and travel times for a city's hottest origin
+    cells, so the first requests after the shift handover are served warm.
+    """
+    try:
+        close_old_connections()
+        return cache_warming.warm_city_caches(city_name)
+    finally:
+        close_old_connections()
+
+
+@shared_task
+def build_duty_geojson(city_name: str) -> int:
+    """
+    Build the duty roster GeoJSON of a freshly scraped city, so web workers
+    serve it without touching the database. Returns the roster version.
+    """
+    try:
+        close_old_connections()
+        return duty_geojson.refresh_duty_geojson(city_name).version
+    finally:
+        close_old_connections()
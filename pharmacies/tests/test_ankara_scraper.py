@@ -49,7 +49,7 @@ def test_get_duty_times_sunday(mock_now: MagicMock) -> None:
     assert duty_end == datetime(2025, 12, 22, 6, 0, tzinfo=UTC)
 
 
-@patch("pharmacies.utils.ankaraeo_scraper.requests.get")
+@patch("pharmacies.utils.ankaraeo_scraper.http_client.get")
 @patch("pharmacies.utils.ankaraeo_scraper._get_duty_times")
 def test_get_ankara_data(mock_duty_times: MagicMock, mock_get: MagicMock) -> None:
     mock_duty_times.return_value = (
@@ -75,7 +75,7 @@ def test_get_ankara_data(mock_duty_times: MagicMock, mock_get: MagicMock) -> Non
 
     mock_get.return_value = mock_response
 
-    data = get_ankara_data()
+    data = list(get_ankara_data())
 
     assert len(data) == 1
 
@@ -94,7 +94,7 @@ def test_get_ankara_data(mock_duty_times: MagicMock, mock_get: MagicMock) -> Non
     assert data[0]["duty_end"] == datetime(2025, 12, 17, 6, 0, tzinfo=UTC)
 
 
-@patch("pharmacies.utils.ankaraeo_scraper.requests.get")
+@patch("pharmacies.utils.ankaraeo_scraper.http_client.get")
 def test_get_ankara_data_invalid_json(mock_get: MagicMock) -> None:
     mock_response = MagicMock()
     mock_response.raise_for_status.return_value = None
@@ -102,20 +102,20 @@ def test_get_ankara_data_invalid_json(mock_get: MagicMock) -> None:
     mock_get.return_value = mock_response
 
     with pytest.raises(JSONDecodeError):
-        get_ankara_data()
+        list(get_ankara_data())
 
 
-@patch("pharmacies.utils.ankaraeo_scraper.requests.get")
+@patch("pharmacies.utils.ankaraeo_scraper.http_client.get")
 def test_get_ankara_data_http_error(mock_get: MagicMock) -> None:
     mock_response = MagicMock()
     mock_response.raise_for_status.side_effect = HTTPError("boom")
     mock_get.return_value = mock_response
 
     with pytest.raises(HTTPError):
-        get_ankara_data()
+        list(get_ankara_data())
 
 
-@patch("pharmacies.utils.ankaraeo_scraper.requests.get")
+@patch("pharmacies.utils.ankaraeo_scraper.http_client.get")
 def test_get_ankara_data_missing_pharmacy_list_returns_empty(
     mock_get: MagicMock,
 ) -> None:
@@ -124,14 +124,14 @@ def test_get_ankara_data_missing_pharmacy_list_returns_empty(
     mock_response.json.return_value = {}
     mock_get.return_value = mock_response
 
-    assert get_ankara_data() == []
+    assert list(get_ankara_data()) == []
 
 
-@patch("pharmacies.utils.ankaraeo_scraper.requests.get")
+@patch("pharmacies.utils.ankaraeo_scraper.http_client.get")
 def test_get_ankara_data_null_pharmacy_list_returns_empty(mock_get: MagicMock) -> None:
     mock_response = MagicMock()
     mock_response.raise_for_status.return_value = None
     mock_response.json.return_value = {"NobetciEczaneBilgisiListesi": None}
     mock_get.return_value = mock_response
 
-    assert get_ankara_data() == []
+    assert list(get_ankara_data()) == []
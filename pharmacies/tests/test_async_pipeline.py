@@ -0,0 +1,247 @@
+import asyncio
+import json
+from collections.abc import Callable, Iterator
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import pytest
+from django.test import RequestFactory
+
+from pharmacies import views
+from pharmacies.models import PharmacyStatus
+from pharmacies.utils import async_pipeline, fetch_nearest_pharmacies
+
+QUERY_TIME = datetime(2025, 12, 16, 22, 0, tzinfo=UTC)
+
+GEOCODE_RESPONSE = {
+    "status": "OK",
+    "plus_code": {"compound_code": "Q4G6+2M Eskişehir, Türkiye"},
+    "results": [{"address_components": []}],
+}
+
+PLACES_RESPONSE = {
+    "status": "OK",
+    "results": [
+        {
+            "name": "Open Eczane",
+            "vicinity": "Addr",
+            "geometry": {"location": {"lat": 39.71, "lng": 30.5}},
+        }
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def _inside_service_area() -> Iterator[None]:
+    with patch("pharmacies.utils.async_pipeline.is_in_service_area", return_value=True):
+        yield
+
+
+@pytest.fixture
+def google() -> Iterator[list[httpx.Request]]:
+    """Route the shared async client to a fake Google API."""
+    handled: list[httpx.Request] = []
+    responses: dict[str, Callable[[httpx.Request], httpx.Response]] = {
+        "/maps/api/geocode/json": lambda r: httpx.Response(200, json=GEOCODE_RESPONSE),
+        "/maps/api/place/nearbysearch/json": lambda r: httpx.Response(
+            200, json=PLACES_RESPONSE
+        ),
+        "/maps/api/distancematrix/json": lambda r: httpx.Response(503),
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        handled.append(request)
+        return responses[request.url.path](request)
+
+    with patch(
+        "pharmacies.http_client.get_async_client",
+        side_effect=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    ):
+        yield handled
+
+
+@patch("pharmacies.utils.async_pipeline.match_city_name", return_value="eskisehir")
+@patch(
+    "pharmacies.utils.async_pipeline.resolve_city_from_boundaries", return_value=None
+)
+def test_aget_city_name_from_location_caches_geocoding(
+    mock_resolve: Any, mock_match: Any, google: list[httpx.Request]
+) -> None:
+    async def resolve_twice() -> list[str]:
+        return [
+            await async_pipeline.aget_city_name_from_location(39.7, 30.5)
+            for _ in range(2)
+        ]
+
+    assert asyncio.run(resolve_twice()) == ["eskisehir", "eskisehir"]
+    assert len(google) == 1
+    assert google[0].url.params["latlng"] == "39.7,30.5"
+    mock_match.assert_called_with("Q4G6+2M Eskişehir, Türkiye")
+
+
+def test_aadd_travel_distances_falls_back_when_google_fails(
+    google: list[httpx.Request],
+) -> None:
+    pharmacy_data: list[dict[str, Any]] = [
+        {"position": {"lat": 39.71, "lng": 30.5}, "distance": 1100}
+    ]
+
+    asyncio.run(
+        async_pipeline.aadd_travel_distances_to_pharmacy_data(39.7, 30.5, pharmacy_data)
+    )
+
+    assert google[0].url.path == "/maps/api/distancematrix/json"
+    assert pharmacy_data[0]["travel_distance"] > 1100
+
+
+def test_async_and_sync_lookups_share_the_places_cache(
+    google: list[httpx.Request],
+) -> None:
+    results = asyncio.run(async_pipeline.afetch_nearest_pharmacies(39.7, 30.5))
+
+    with patch("pharmacies.utils.pharmacy_fetch.http_client.get") as mock_get:
+        assert fetch_nearest_pharmacies(39.7, 30.5) == results
+
+    mock_get.assert_not_called()
+    assert [r.url.path for r in google] == ["/maps/api/place/nearbysearch/json"]
+
+
+async def _fake_travel(
+    lat: float, lng: float, pharmacy_data: list[dict[str, Any]], **kwargs: Any
+) -> None:
+    for item in pharmacy_data:
+        item["travel_distance"] = 100
+
+
+@patch(
+    "pharmacies.utils.async_pipeline.aadd_travel_distances_to_pharmacy_data",
+    side_effect=_fake_travel,
+)
+@patch(
+    "pharmacies.utils.async_pipeline._get_city_status",
+    return_value=(PharmacyStatus.OPEN, 1),
+)
+@patch(
+    "pharmacies.utils.async_pipeline.aget_city_name_from_location",
+    return_value="eskisehir",
+)
+def test_aget_pharmacy_points_calls_places_only_on_a_cache_miss(
+    mock_city: Any, mock_status: Any, mock_travel: Any, google: list[httpx.Request]
+) -> None:
+    for _ in range(2):
+        body = asyncio.run(
+            async_pipeline.aget_pharmacy_points(39.7, 30.5, QUERY_TIME, limit=5)
+        )
+        assert [p["title"] for p in json.loads(body)["points"]] == ["Open Eczane"]
+
+    assert [r.url.path for r in google] == ["/maps/api/place/nearbysearch/json"]
+
+
+def test_concurrent_places_lookups_share_one_request(
+    google: list[httpx.Request],
+) -> None:
+    async def fetch_twice() -> list[list[dict[str, Any]]]:
+        return list(
+            await asyncio.gather(
+                async_pipeline.afetch_nearest_pharmacies(39.7, 30.5),
+                async_pipeline.afetch_nearest_pharmacies(39.7, 30.5),
+            )
+        )
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first == second
+    assert len(google) == 1
+
+
+@patch(
+    "pharmacies.utils.async_pipeline.aadd_travel_distances_to_pharmacy_data",
+    side_effect=_fake_travel,
+)
+@patch(
+    "pharmacies.utils.async_pipeline.find_pharmacies_on_duty",
+    return_value=[{"title": "Duty Eczane", "distance": 10}],
+)
+@patch(
+    "pharmacies.utils.async_pipeline._get_city_status",
+    return_value=(PharmacyStatus.CLOSED, 1),
+)
+@patch(
+    "pharmacies.utils.async_pipeline.aget_city_name_from_location",
+    return_value="eskisehir",
+)
+def test_aget_pharmacy_points_on_duty(
+    mock_city: Any,
+    mock_status: Any,
+    mock_find: Any,
+    mock_travel: Any,
+    google: list[httpx.Request],
+) -> None:
+    body = asyncio.run(
+        async_pipeline.aget_pharmacy_points(39.7, 30.5, QUERY_TIME, limit=5)
+    )
+
+    assert [p["title"] for p in json.loads(body)["points"]] == ["Duty Eczane"]
+    mock_find.assert_called_once_with(39.7, 30.5, "eskisehir", QUERY_TIME, 5)
+    assert google == []
+
+    # A second lookup from the same cell is answered from the response cache.
+    assert (
+        asyncio.run(
+            async_pipeline.aget_pharmacy_points(39.7001, 30.5001, QUERY_TIME, limit=5)
+        )
+        == body
+    )
+    mock_find.assert_called_once()
+
+
+def test_aget_pharmacy_points_rejects_points_outside_service_area(
+    google: list[httpx.Request],
+) -> None:
+    with (
+        patch("pharmacies.utils.async_pipeline.is_in_service_area", return_value=False),
+        pytest.raises(ValueError, match="Unknown city"),
+    ):
+        asyncio.run(async_pipeline.aget_pharmacy_points(0.0, 0.0, QUERY_TIME, limit=5))
+
+    assert google == []
+
+
+class TestAsyncPharmacyPointsView:
+    def test_not_post(self, rf: RequestFactory) -> None:
+        response = asyncio.run(views.aget_pharmacy_points(rf.get("/")))
+        assert response.status_code == 405
+
+    @patch(
+        "pharmacies.views.async_pipeline.aget_pharmacy_points",
+        return_value=b'{"points": [{"title": "Open Eczane"}]}',
+    )
+    def test_returns_points(self, mock_pipeline: Any, rf: RequestFactory) -> None:
+        request = rf.post(
+            "/",
+            data=json.dumps({"lat": 39.766681, "lng": 30.525631}),
+            content_type="application/json",
+        )
+
+        response = asyncio.run(views.aget_pharmacy_points(request))
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == {"points": [{"title": "Open Eczane"}]}
+        assert mock_pipeline.call_args.args[:2] == (39.7667, 30.5256)
+
+    @patch(
+        "pharmacies.views.async_pipeline.aget_pharmacy_points",
+        side_effect=httpx.ConnectTimeout("timed out"),
+    )
+    def test_upstream_timeout(self, mock_pipeline: Any, rf: RequestFactory) -> None:
+        request = rf.post(
+            "/",
+            data=json.dumps({"lat": 39.7, "lng": 30.5}),
+            content_type="application/json",
+        )
+
+        response = asyncio.run(views.aget_pharmacy_points(request))
+
+        assert response.status_code == 502
@@ -0,0 +1,121 @@
+import json
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from pharmacies.models import PharmacyStatus
+from pharmacies.utils.batch_points import (
+    BatchOrigin,
+    add_batch_travel_distances,
+    get_batch_pharmacy_points,
+    pack_matrix_requests,
+)
+from pharmacies.utils.roster_snapshot import RosterEntry, RosterSnapshot
+
+WHEN = datetime(2025, 12, 16, 20, 0, tzinfo=UTC)
+
+
+def _point(pharmacy_id: int, lat: float) -> dict[str, Any]:
+    return {"position": {"lat": lat, "lng": 30.5}, "pharmacy_id": pharmacy_id}
+
+
+def _origin(index: int, lat: float, destinations: list[int]) -> BatchOrigin:
+    points = [
+        _point(pharmacy_id, 39.0 + pharmacy_id / 100) for pharmacy_id in destinations
+    ]
+    return BatchOrigin(index, lat, 30.5, points=points, missing=list(points))
+
+
+def _element(distance: int) -> dict[str, Any]:
+    return {
+        "status": "OK",
+        "distance": {"value": distance},
+        "duration": {"value": distance // 10},
+    }
+
+
+def test_pack_matrix_requests_shares_destinations_within_limits() -> None:
+    # Ten origins sharing the same ten destinations fit in one 10 x 10 matrix.
+    shared = [_origin(i, 39.7, list(range(10))) for i in range(10)]
+    assert [len(group) for group in pack_matrix_requests(shared)] == [10]
+
+    # Disjoint destinations: a third origin would need 30 destinations, over
+    # the per-request maximum of 25.
+    disjoint = [_origin(i, 39.7, list(range(i * 10, i * 10 + 10))) for i in range(5)]
+    assert [len(group) for group in pack_matrix_requests(disjoint)] == [2, 2, 1]
+
+
+@patch("pharmacies.utils.batch_points.store_travel_times")
+@patch("pharmacies.utils.batch_points._get_distance_matrix_data")
+@patch("pharmacies.utils.batch_points.fill_cached_travel_distances")
+def test_add_batch_travel_distances_sends_one_matrix(
+    mock_fill: MagicMock, mock_dm: MagicMock, mock_store: MagicMock
+) -> None:
+    first = BatchOrigin(0, 39.7, 30.5, points=[_point(1, 39.71), _point(2, 39.72)])
+    second = BatchOrigin(1, 39.701, 30.5, points=[_point(2, 39.72)])
+    mock_fill.side_effect = lambda lat, lng, points: (f"{lat:.3f},30.500", points)
+    mock_dm.return_value = {
+        "status": "OK",
+        "rows": [
+            {"elements": [_element(1000), _element(2000)]},
+            {"elements": [_element(900), _element(1900)]},
+        ],
+    }
+
+    add_batch_travel_distances([first, second], "eskisehir", WHEN)
+
+    mock_dm.assert_called_once_with(
+        origins="39.7,30.5|39.701,30.5",
+        destinations="39.71,30.5|39.72,30.5",
+    )
+    assert [p["travel_distance"] for p in first.points] == [1000, 2000]
+    assert second.points[0]["travel_distance"] == 1900
+    # The extra element for the second origin is stored as well.
+    mock_store.assert_any_call("39.701,30.500", {1: (900, 90), 2: (1900, 190)})
+
+
+@patch("pharmacies.utils.batch_points.add_batch_travel_distances")
+@patch("pharmacies.utils.batch_points.get_roster_snapshot")
+@patch("pharmacies.utils.batch_points.get_city")
+@patch("pharmacies.utils.batch_points.get_city_name_from_location")
+def test_get_batch_pharmacy_points_groups_by_city(
+    mock_city_name: MagicMock,
+    mock_get_city: MagicMock,
+    mock_snapshot: MagicMock,
+    mock_travel: MagicMock,
+) -> None:
+    mock_city_name.side_effect = ["eskisehir", ValueError("Unknown city"), "eskisehir"]
+    city = MagicMock(roster_version=1)
+    city.get_city_status.return_value = PharmacyStatus.CLOSED
+    mock_get_city.return_value = city
+    mock_snapshot.return_value = RosterSnapshot(
+        city_name="eskisehir",
+        version=1,
+        built_at=WHEN,
+        lat=np.array([39.71]),
+        lng=np.array([30.5]),
+        duty_start=np.array([WHEN.timestamp()]),
+        duty_end=np.array([WHEN.timestamp() + 3600]),
+        entries=(RosterEntry(pharmacy_id=1, name="Eczane", address="Sokak"),),
+    )
+
+    def add_travel(origins: list[BatchOrigin], *args: Any) -> None:
+        for origin in origins:
+            for point in origin.points:
+                point["travel_distance"] = 100
+
+    mock_travel.side_effect = add_travel
+
+    results = get_batch_pharmacy_points(
+        [(39.7, 30.5), (0.0, 0.0), (39.8, 30.5)], WHEN, limit=5
+    )
+
+    assert isinstance(results[1], ValueError)
+    for body in (results[0], results[2]):
+        assert isinstance(body, bytes)
+        assert [p["title"] for p in json.loads(body)["points"]] == ["Eczane"]
+    mock_get_city.assert_called_once_with("eskisehir")
+    mock_snapshot.assert_called_once_with("eskisehir")
+    mock_travel.assert_called_once()
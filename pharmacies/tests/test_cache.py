@@ -0,0 +1,216 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import caches
+from django.test.utils import override_settings
+
+from pharmacies.cache import (
+    TwoTierCache,
+    _Compressed,
+    _Sized,
+    get_cache,
+    get_cache_stats,
+)
+
+
+def test_get_or_set_only_calls_loader_on_true_miss() -> None:
+    cache = TwoTierCache("test")
+    loader = MagicMock(return_value="value")
+
+    assert cache.get_or_set("key", loader) == "value"
+    assert cache.get_or_set("key", loader) == "value"
+
+    loader.assert_called_once()
+    assert cache.stats.as_dict() == {
+        "l1_hits": 1,
+        "l2_hits": 0,
+        "misses": 1,
+        "evictions": 0,
+        "stale_hits": 0,
+        "refreshes": 0,
+    }
+
+
+def test_l2_hit_repopulates_l1() -> None:
+    cache = TwoTierCache("test")
+    cache.set("key", "value")
+    cache.clear_local()
+
+    assert cache.get("key") == "value"
+    assert cache.get("key") == "value"
+    assert cache.stats.as_dict() == {
+        "l1_hits": 1,
+        "l2_hits": 1,
+        "misses": 0,
+        "evictions": 0,
+        "stale_hits": 0,
+        "refreshes": 0,
+    }
+
+
+def test_loader_errors_are_not_cached() -> None:
+    cache = TwoTierCache("test")
+    loader = MagicMock(side_effect=[ValueError("boom"), "value"])
+
+    with pytest.raises(ValueError, match="boom"):
+        cache.get_or_set("key", loader)
+
+    assert cache.get_or_set("key", loader) == "value"
+    assert loader.call_count == 2
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"L1_TTL": 10, "TTL": 60}})
+def test_l1_entries_expire_after_l1_ttl() -> None:
+    cache = TwoTierCache("test")
+
+    with patch("pharmacies.cache.time.monotonic", return_value=100.0):
+        cache.set("key", "value")
+    with patch("pharmacies.cache.time.monotonic", return_value=111.0):
+        assert cache.get("key") == "value"
+
+    # The expired L1 entry falls through to the shared cache.
+    assert cache.stats.l2_hits == 1
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"L1_MAXSIZE": 2}})
+def test_l1_evicts_least_recently_used_entry() -> None:
+    cache = TwoTierCache("test")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert list(cache._l1) == ["test:a", "test:c"]
+    assert cache.stats.evictions == 1
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"L1_MAX_BYTES": 2500}})
+def test_l1_evicts_by_pickled_size() -> None:
+    cache = TwoTierCache("test")
+    cache.set("a", "x" * 1000)
+    cache.set("b", "y" * 1000)
+    cache.set("c", "z" * 1000)
+    cache.set("huge", "h" * 5000)
+
+    # "huge" alone exceeds the budget and is only stored in L2.
+    assert list(cache._l1) == ["test:b", "test:c"]
+    assert cache.l1_bytes <= 2500
+    assert cache.stats.evictions == 1
+    assert cache.get("huge") == "h" * 5000
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"COMPRESS_MIN_BYTES": 100}})
+def test_large_values_are_compressed_in_l2() -> None:
+    cache = TwoTierCache("test")
+    small, large = {"a": 1}, {"rows": ["eczane"] * 500}
+    cache.set("small", small)
+    cache.set("large", large)
+
+    assert caches["default"].get("test:small").value == small
+    stored = caches["default"].get("test:large")
+    assert isinstance(stored, _Compressed)
+    assert len(stored.data) < 100
+
+    cache.clear_local()
+    assert cache.get("large") == large
+
+
+def test_l2_hits_reuse_the_stored_size() -> None:
+    cache = TwoTierCache("test")
+    cache.set("key", {"rows": ["eczane"] * 10})
+    size = cache.l1_bytes
+    cache.clear_local()
+
+    stored = caches["default"].get("test:key")
+    assert stored == _Sized({"rows": ["eczane"] * 10}, size)
+    with patch("pharmacies.cache.pickle.dumps") as mock_dumps:
+        assert cache.get("key") == {"rows": ["eczane"] * 10}
+
+    mock_dumps.assert_not_called()
+    assert cache.l1_bytes == size
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"SOFT_TTL": 10, "TTL": 60}})
+@patch("pharmacies.cache._submit_refresh")
+def test_stale_l1_entries_skip_l2_while_a_refresh_is_pending(
+    mock_submit: MagicMock,
+) -> None:
+    cache = TwoTierCache("test")
+    loader = MagicMock(return_value="value")
+
+    with patch("pharmacies.cache.time.time", return_value=100.0):
+        cache.get_or_set("key", loader)
+    with (
+        patch("pharmacies.cache.time.time", return_value=111.0),
+        patch.object(cache, "_l2_get", wraps=cache._l2_get) as mock_l2_get,
+    ):
+        for _ in range(3):
+            assert cache.get_or_set("key", loader) == "value"
+
+    # Only the first stale hit looked for a fresher copy in L2.
+    mock_l2_get.assert_called_once()
+    mock_submit.assert_called_once()
+    assert cache.stats.stale_hits == 1
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"SOFT_TTL": 10, "TTL": 60}})
+@patch("pharmacies.cache._submit_refresh", side_effect=lambda refresh: refresh())
+def test_stale_entries_are_served_while_refreshing(mock_submit: MagicMock) -> None:
+    cache = TwoTierCache("test")
+    loader = MagicMock(side_effect=["old", "new"])
+
+    with patch("pharmacies.cache.time.time", return_value=100.0):
+        assert cache.get_or_set("key", loader) == "old"
+    with patch("pharmacies.cache.time.time", return_value=105.0):
+        assert cache.get_or_set("key", loader) == "old"
+    mock_submit.assert_not_called()
+
+    with patch("pharmacies.cache.time.time", return_value=111.0):
+        assert cache.get_or_set("key", loader) == "old"
+        assert cache.get_or_set("key", loader) == "new"
+
+    assert loader.call_count == 2
+    assert cache.stats.stale_hits == 1
+    assert cache.stats.refreshes == 1
+    assert caches["default"].get("test:key:refreshing") is None
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"SOFT_TTL": 10, "TTL": 60}})
+@patch("pharmacies.cache._submit_refresh")
+def test_only_one_refresh_runs_per_key(mock_submit: MagicMock) -> None:
+    cache = TwoTierCache("test")
+    other_worker = TwoTierCache("test")
+    loader = MagicMock(return_value="value")
+
+    with patch("pharmacies.cache.time.time", return_value=100.0):
+        cache.get_or_set("key", loader)
+    with patch("pharmacies.cache.time.time", return_value=111.0):
+        cache.get_or_set("key", loader)
+        cache.get_or_set("key", loader)
+        other_worker.get_or_set("key", loader)
+
+    mock_submit.assert_called_once()
+    assert other_worker.stats.stale_hits == 1
+
+
+@override_settings(PHARMACY_CACHE_NAMESPACES={"test": {"SOFT_TTL": 10, "TTL": 60}})
+@patch("pharmacies.cache._submit_refresh", side_effect=lambda refresh: refresh())
+def test_failed_refresh_keeps_the_stale_value(mock_submit: MagicMock) -> None:
+    cache = TwoTierCache("test")
+    loader = MagicMock(side_effect=["old", ValueError("boom"), "new"])
+
+    with patch("pharmacies.cache.time.time", return_value=100.0):
+        cache.get_or_set("key", loader)
+    with patch("pharmacies.cache.time.time", return_value=111.0):
+        assert cache.get_or_set("key", loader) == "old"
+        # The refresh lock was released, so the next request retries.
+        assert cache.get_or_set("key", loader) == "old"
+        assert cache.get("key") == "new"
+
+
+def test_get_cache_stats_reports_namespaces() -> None:
+    get_cache("stats-test").get("missing")
+
+    stats = get_cache_stats()["stats-test"]
+    assert stats["misses"] == 1
+    assert stats["l1_entries"] == 0
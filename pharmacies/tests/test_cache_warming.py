@@ -0,0 +1,131 @@
+import json
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.gis.geos import Point
+
+from pharmacies.models import City, Pharmacy, PharmacyStatus, TravelTime
+from pharmacies.utils.cache_warming import (
+    QuotaBudget,
+    get_hot_origin_cells,
+    get_next_duty_time,
+    warm_origin_cell,
+)
+from pharmacies.utils.response_cache import get_cached_points, get_points_cache_key
+
+WHEN = datetime(2025, 12, 16, 20, 0, tzinfo=UTC)
+
+
+def _duty_points() -> list[dict[str, Any]]:
+    return [
+        {
+            "position": {"lat": 39.71, "lng": 30.5},
+            "pharmacy_id": 1,
+            "title": "Far Eczane",
+            "distance": 1100,
+        },
+        {
+            "position": {"lat": 39.701, "lng": 30.5},
+            "pharmacy_id": 2,
+            "title": "Near Eczane",
+            "distance": 110,
+        },
+    ]
+
+
+def test_quota_budget_rejects_requests_over_the_remaining_elements() -> None:
+    budget = QuotaBudget(5)
+
+    assert budget.take(3)
+    assert not budget.take(3)
+    assert budget.take(2)
+    assert budget.remaining == 0
+
+
+@patch("pharmacies.utils.cache_warming.apply_distance_matrix_data")
+@patch("pharmacies.utils.cache_warming._get_distance_matrix_data")
+@patch("pharmacies.utils.cache_warming.fill_cached_travel_distances")
+@patch("pharmacies.utils.cache_warming.find_pharmacies_on_duty")
+def test_warm_origin_cell_caches_the_duty_response(
+    mock_find: MagicMock,
+    mock_fill: MagicMock,
+    mock_dm: MagicMock,
+    mock_apply: MagicMock,
+) -> None:
+    points = _duty_points()
+    mock_find.return_value = points
+    mock_fill.return_value = ("39.700,30.500", points)
+
+    def apply(*args: Any) -> None:
+        for item, distance in zip(points, [1500, 200], strict=True):
+            item["travel_distance"] = distance
+
+    mock_apply.side_effect = apply
+    budget = QuotaBudget(10)
+
+    assert warm_origin_cell(
+        "eskisehir", "39.700,30.500", WHEN, PharmacyStatus.CLOSED, 3, budget
+    )
+
+    key = get_points_cache_key(
+        39.7004, 30.4996, "eskisehir", PharmacyStatus.CLOSED, 3, WHEN
+    )
+    body = get_cached_points(key)
+    assert body is not None
+    assert [p["title"] for p in json.loads(body)["points"]] == [
+        "Near Eczane",
+        "Far Eczane",
+    ]
+    assert budget.remaining == 8
+    mock_find.assert_called_once_with(39.7, 30.5, "eskisehir", WHEN, 5)
+
+    # Already warm: nothing is recomputed.
+    assert not warm_origin_cell(
+        "eskisehir", "39.700,30.500", WHEN, PharmacyStatus.CLOSED, 3, budget
+    )
+    mock_find.assert_called_once()
+
+
+@patch("pharmacies.utils.cache_warming._get_distance_matrix_data")
+@patch("pharmacies.utils.cache_warming.fill_cached_travel_distances")
+@patch("pharmacies.utils.cache_warming.find_pharmacies_on_duty")
+def test_warm_origin_cell_skips_cells_over_budget(
+    mock_find: MagicMock, mock_fill: MagicMock, mock_dm: MagicMock
+) -> None:
+    points = _duty_points()
+    mock_find.return_value = points
+    mock_fill.return_value = ("39.700,30.500", points)
+
+    assert not warm_origin_cell(
+        "eskisehir", "39.700,30.500", WHEN, PharmacyStatus.CLOSED, 3, QuotaBudget(1)
+    )
+    mock_dm.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_hot_origin_cells_and_next_duty_time() -> None:
+    city = City.objects.create(name="eskisehir")
+    pharmacies = [
+        Pharmacy.objects.create(
+            name=f"Eczane {i}",
+            city=city,
+            location=Point(30.5, 39.7 + i / 100),
+            duty_start=WHEN + timedelta(hours=i),
+            duty_end=WHEN + timedelta(hours=12),
+        )
+        for i in range(3)
+    ]
+    for cell, count in [("39.700,30.500", 3), ("39.710,30.500", 1)]:
+        for pharmacy in pharmacies[:count]:
+            TravelTime.objects.create(
+                origin_cell=cell, pharmacy=pharmacy, distance=100, duration=10
+            )
+
+    assert get_hot_origin_cells("eskisehir", 5) == ["39.700,30.500", "39.710,30.500"]
+    assert get_next_duty_time("eskisehir", WHEN - timedelta(hours=2)) == WHEN
+    assert get_next_duty_time("eskisehir", WHEN + timedelta(hours=1)) == (
+        WHEN + timedelta(hours=1)
+    )
+    assert get_next_duty_time("eskisehir", WHEN + timedelta(days=1)) is None
@@ -0,0 +1,146 @@
+from datetime import UTC, datetime, time
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import caches
+from django.test.utils import override_settings
+from pytest_django import DjangoAssertNumQueries
+
+from pharmacies.models import City, PharmacyStatus, ScraperConfig, WorkingSchedule
+from pharmacies.utils.city_registry import (
+    GENERATION_KEY,
+    get_city,
+    get_city_names,
+    invalidate_city_registry,
+)
+
+# Tuesday at 10:00 and 20:00
+OPEN_TIME = datetime(2025, 12, 16, 10, 0, tzinfo=UTC)
+CLOSED_TIME = datetime(2025, 12, 16, 20, 0, tzinfo=UTC)
+
+
+@patch(
+    "pharmacies.utils.city_registry._roster_versions",
+    return_value={"eskisehir": 0},
+)
+@patch("pharmacies.utils.city_registry._load_cities")
+def test_registry_reloads_when_another_process_invalidates_it(
+    mock_load: MagicMock, mock_versions: MagicMock
+) -> None:
+    mock_load.side_effect = [
+        {"eskisehir": City(name="eskisehir")},
+        {"eskisehir": City(name="eskisehir"), "ankara": City(name="ankara")},
+    ]
+
+    with override_settings(CITY_REGISTRY_CHECK_INTERVAL=0):
+        assert get_city_names() == ["eskisehir"]
+        assert get_city_names() == ["eskisehir"]
+        assert mock_load.call_count == 1
+
+        # Another worker replaced the generation token.
+        caches["default"].set(GENERATION_KEY, "elsewhere")
+        assert get_city_names() == ["eskisehir", "ankara"]
+        assert mock_load.call_count == 2
+
+
+@patch("pharmacies.utils.city_registry._roster_versions")
+@patch("pharmacies.utils.city_registry._load_cities")
+def test_registry_reloads_roster_changes_without_the_token(
+    mock_load: MagicMock, mock_versions: MagicMock
+) -> None:
+    mock_load.side_effect = [
+        {"eskisehir": City(name="eskisehir", roster_version=1)},
+        {"eskisehir": City(name="eskisehir", roster_version=2)},
+    ]
+    mock_versions.return_value = {"eskisehir": 1}
+
+    with override_settings(CITY_REGISTRY_CHECK_INTERVAL=0):
+        assert get_city("eskisehir").roster_version == 1
+        assert get_city("eskisehir").roster_version == 1
+        assert mock_load.call_count == 1
+
+        # A scrape in another process whose token never reached this cache.
+        mock_versions.return_value = {"eskisehir": 2}
+        assert get_city("eskisehir").roster_version == 2
+        assert mock_load.call_count == 2
+
+
+@patch("pharmacies.utils.city_registry._load_cities", return_value={})
+def test_registry_skips_checks_within_the_interval(mock_load: MagicMock) -> None:
+    with override_settings(CITY_REGISTRY_CHECK_INTERVAL=60):
+        get_city_names()
+        caches["default"].set(GENERATION_KEY, "elsewhere")
+        get_city_names()
+        assert mock_load.call_count == 1
+
+        invalidate_city_registry()
+        get_city_names()
+        assert mock_load.call_count == 2
+
+
+@patch("pharmacies.utils.city_registry._load_cities", return_value={})
+def test_get_city_raises_for_unknown_cities(mock_load: MagicMock) -> None:
+    with pytest.raises(City.DoesNotExist):
+        get_city("atlantis")
+
+
+@pytest.mark.django_db
+def test_city_status_is_served_from_memory(
+    django_assert_num_queries: DjangoAssertNumQueries,
+) -> None:
+    city = City.objects.create(name="eskisehir")
+    WorkingSchedule.objects.create(
+        city=city,
+        weekday_start=time(9, 0),
+        weekday_end=time(18, 0),
+        saturday_start=time(9, 0),
+        saturday_end=time(13, 0),
+    )
+
+    with django_assert_num_queries(1):
+        assert get_city("eskisehir").get_city_status(OPEN_TIME) == PharmacyStatus.OPEN
+        assert get_city("eskisehir").get_city_status(CLOSED_TIME) == (
+            PharmacyStatus.CLOSED
+        )
+        assert get_city_names() == ["eskisehir"]
+
+
+@pytest.mark.django_db
+def test_schedule_changes_invalidate_the_registry(
+    django_capture_on_commit_callbacks: Any,
+) -> None:
+    city = City.objects.create(name="eskisehir")
+    schedule = WorkingSchedule.objects.create(
+        city=city,
+        weekday_start=time(9, 0),
+        weekday_end=time(18, 0),
+        saturday_start=time(9, 0),
+        saturday_end=time(13, 0),
+    )
+    assert get_city("eskisehir").get_city_status(CLOSED_TIME) == PharmacyStatus.CLOSED
+
+    schedule.weekday_end = time(22, 0)
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule.save()
+
+    assert get_city("eskisehir").get_city_status(CLOSED_TIME) == PharmacyStatus.OPEN
+
+
+@pytest.mark.django_db
+def test_scraper_config_is_loaded_with_the_city(
+    django_assert_num_queries: DjangoAssertNumQueries,
+    django_capture_on_commit_callbacks: Any,
+) -> None:
+    city = City.objects.create(name="eskisehir")
+    with django_capture_on_commit_callbacks(execute=True):
+        config = ScraperConfig.objects.create(city=city, interval=6)
+
+    with django_assert_num_queries(1):
+        assert get_city("eskisehir").scraperconfig.interval == 6
+
+    config.interval = 12
+    with django_capture_on_commit_callbacks(execute=True):
+        config.save()
+
+    assert get_city("eskisehir").scraperconfig.interval == 12
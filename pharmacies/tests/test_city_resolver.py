@@ -0,0 +1,184 @@
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from pharmacies.models import City
+from pharmacies.utils.city_resolver import (
+    CityBoundaryIndex,
+    ServiceAreaIndex,
+    get_city_boundary_index,
+    is_in_service_area,
+    resolve_city_from_boundaries,
+)
+from pharmacies.utils.utils import get_city_name_from_location
+
+ESKISEHIR_BOX = ((30.0, 39.5), (31.0, 39.5), (31.0, 40.0), (30.0, 40.0), (30.0, 39.5))
+ANKARA_BOX = ((32.5, 39.7), (33.2, 39.7), (33.2, 40.2), (32.5, 40.2), (32.5, 39.7))
+
+
+def _multipolygon(ring: tuple[tuple[float, float], ...]) -> MultiPolygon:
+    return MultiPolygon(Polygon(ring), srid=4326)
+
+
+def test_city_boundary_index_lookup() -> None:
+    index = CityBoundaryIndex(
+        [
+            ("eskisehir", bytes(_multipolygon(ESKISEHIR_BOX).wkb)),
+            ("ankara", bytes(_multipolygon(ANKARA_BOX).wkb)),
+        ]
+    )
+
+    assert index.lookup(39.77, 30.52) == "eskisehir"
+    assert index.lookup(39.93, 32.86) == "ankara"
+    assert index.lookup(41.0, 28.97) is None
+
+
+def test_empty_city_boundary_index() -> None:
+    assert CityBoundaryIndex([]).lookup(39.77, 30.52) is None
+
+
+def test_service_area_index() -> None:
+    index = ServiceAreaIndex(
+        [bytes(_multipolygon(ESKISEHIR_BOX).wkb)],
+        [(28.5, 40.8, 29.5, 41.3)],
+        cell_size=0.02,
+    )
+
+    assert index.contains(39.77, 30.52)
+    assert index.contains(39.5, 31.0)  # on the boundary
+    assert index.contains(41.0, 28.97)
+    assert not index.contains(39.93, 32.86)
+    assert not index.contains(40.5, 30.0)  # between the two areas
+    assert not index.contains(0.0, 0.0)
+    assert not index.contains(-89.0, 179.0)
+
+
+def test_empty_service_area_index() -> None:
+    assert not ServiceAreaIndex([], [], cell_size=0.02).contains(39.77, 30.52)
+    assert ServiceAreaIndex([], [], 0.02, unbounded=True).contains(0.0, 0.0)
+
+
+@override_settings(SERVICE_AREA_REFRESH_INTERVAL=300)
+@patch("pharmacies.utils.city_resolver._load_boundaries")
+def test_boundary_index_is_rebuilt_after_the_refresh_interval(
+    mock_load: MagicMock,
+) -> None:
+    mock_load.side_effect = [
+        [],
+        [("eskisehir", bytes(_multipolygon(ESKISEHIR_BOX).wkb))],
+    ]
+
+    with patch("pharmacies.utils.city_resolver.time.monotonic", return_value=1000.0):
+        assert get_city_boundary_index().lookup(39.77, 30.52) is None
+    with patch("pharmacies.utils.city_resolver.time.monotonic", return_value=1200.0):
+        assert get_city_boundary_index().lookup(39.77, 30.52) is None
+    # Boundaries loaded by another process show up after the interval.
+    with patch("pharmacies.utils.city_resolver.time.monotonic", return_value=1300.0):
+        assert get_city_boundary_index().lookup(39.77, 30.52) == "eskisehir"
+
+    assert mock_load.call_count == 2
+
+
+@pytest.mark.django_db
+class TestCityResolverDB:
+    def test_service_area_reloads_when_a_city_is_added(
+        self, django_capture_on_commit_callbacks: Any
+    ) -> None:
+        City.objects.create(name="eskisehir", boundary=_multipolygon(ESKISEHIR_BOX))
+        assert not is_in_service_area(39.93, 32.86)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            City.objects.create(name="ankara", boundary=_multipolygon(ANKARA_BOX))
+
+        assert is_in_service_area(39.93, 32.86)
+
+    @patch("pharmacies.utils.utils.http_client.get")
+    def test_get_city_name_from_location_rejects_points_outside_service_area(
+        self, mock_get: MagicMock
+    ) -> None:
+        City.objects.create(name="eskisehir", boundary=_multipolygon(ESKISEHIR_BOX))
+
+        with pytest.raises(ValueError, match="Unknown city"):
+            get_city_name_from_location(48.85, 2.35)
+        mock_get.assert_not_called()
+
+    def test_resolve_city_from_boundaries(self) -> None:
+        City.objects.create(name="eskisehir", boundary=_multipolygon(ESKISEHIR_BOX))
+        City.objects.create(name="istanbul")
+
+        assert resolve_city_from_boundaries(39.77, 30.52) == "eskisehir"
+        assert resolve_city_from_boundaries(41.0, 28.97) is None
+
+    def test_new_boundary_invalidates_index(
+        self, django_capture_on_commit_callbacks: Any
+    ) -> None:
+        city = City.objects.create(name="ankara")
+        assert resolve_city_from_boundaries(39.93, 32.86) is None
+
+        city.boundary = _multipolygon(ANKARA_BOX)
+        with django_capture_on_commit_callbacks(execute=True):
+            city.save()
+
+        assert resolve_city_from_boundaries(39.93, 32.86) == "ankara"
+
+    def test_boundaries_missing_from_the_index_are_found_in_postgis(self) -> None:
+        city = City.objects.create(name="ankara")
+        assert resolve_city_from_boundaries(39.93, 32.86) is None
+
+        # Saved by another process: this process's index is not reset.
+        City.objects.filter(pk=city.pk).update(boundary=_multipolygon(ANKARA_BOX))
+
+        assert resolve_city_from_boundaries(39.93, 32.86) == "ankara"
+
+    @patch("pharmacies.utils.utils.http_client.get")
+    def test_get_city_name_from_location_skips_geocoding_inside_boundary(
+        self, mock_get: MagicMock
+    ) -> None:
+        City.objects.create(name="eskisehir", boundary=_multipolygon(ESKISEHIR_BOX))
+
+        assert get_city_name_from_location(39.77, 30.52) == "eskisehir"
+        mock_get.assert_not_called()
+
+    @override_settings(CITY_RESOLVER_GOOGLE_FALLBACK=False)
+    @patch("pharmacies.utils.utils.http_client.get")
+    def test_get_city_name_from_location_without_google_fallback(
+        self, mock_get: MagicMock
+    ) -> None:
+        City.objects.create(name="eskisehir", boundary=_multipolygon(ESKISEHIR_BOX))
+
+        with pytest.raises(ValueError, match="Unknown city"):
+            get_city_name_from_location(41.0, 28.97)
+        mock_get.assert_not_called()
+
+    def test_load_city_boundaries_command(self, tmp_path: Path) -> None:
+        City.objects.create(name="eskisehir")
+        geojson = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "properties": {"name": "Eskişehir"},
+                    "geometry": {"type": "Polygon", "coordinates": [ESKISEHIR_BOX]},
+                },
+                {
+                    "type": "Feature",
+                    "properties": {"name": "Konya"},
+                    "geometry": {"type": "Polygon", "coordinates": [ANKARA_BOX]},
+                },
+            ],
+        }
+        path = tmp_path / "provinces.geojson"
+        path.write_text(json.dumps(geojson), encoding="utf-8")
+
+        call_command("load_city_boundaries", str(path))
+
+        city = City.objects.get(name="eskisehir")
+        assert city.boundary is not None
+        assert city.boundary.geom_type == "MultiPolygon"
+        assert resolve_city_from_boundaries(39.77, 30.52) == "eskisehir"
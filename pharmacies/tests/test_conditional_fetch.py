@@ -0,0 +1,123 @@
+import hashlib
+from collections.abc import Iterator
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from pharmacies.models import City, ScrapeSource
+from pharmacies.utils.conditional_fetch import (
+    ConditionalFetcher,
+    fetch_source,
+    get_conditional_fetch_stats,
+    reset_conditional_fetch_stats,
+)
+
+BODY = b"<html>nobetci</html>"
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats() -> Iterator[None]:
+    reset_conditional_fetch_stats()
+    yield
+    reset_conditional_fetch_stats()
+
+
+def _response(
+    status_code: int = 200, body: bytes = BODY, **headers: str
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers.update(headers)
+    return response
+
+
+def _fetcher(**known: ScrapeSource) -> ConditionalFetcher:
+    fetcher = ConditionalFetcher("eskisehir")
+    fetcher.load = MagicMock(return_value=known)  # type: ignore[method-assign]
+    return fetcher
+
+
+def _source(**fields: str) -> ScrapeSource:
+    return ScrapeSource(
+        key="page", content_hash=hashlib.sha256(BODY).hexdigest(), **fields
+    )
+
+
+def test_fetch_sends_validators_and_treats_304_as_unchanged() -> None:
+    fetcher = _fetcher(page=_source(etag='"v1"', last_modified="Mon, 01 Jan 2026"))
+    send = MagicMock(return_value=_response(304, b""))
+
+    assert fetcher.fetch("page", send) is None
+
+    send.assert_called_once_with(
+        {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2026"}
+    )
+    assert fetcher.all_unchanged
+    assert get_conditional_fetch_stats()["not_modified"] == 1
+
+
+def test_fetch_treats_identical_body_as_unchanged() -> None:
+    fetcher = _fetcher(page=_source())
+    send = MagicMock(return_value=_response(ETag='"v2"'))
+
+    assert fetcher.fetch("page", send) is None
+
+    send.assert_called_once_with({})
+    assert fetcher.unchanged == {"page"}
+    assert get_conditional_fetch_stats()["same_hash"] == 1
+
+
+def test_fetch_returns_changed_and_error_responses() -> None:
+    fetcher = _fetcher(page=_source())
+
+    changed = _response(body=b"<html>yeni</html>")
+    assert fetcher.fetch("page", lambda headers: changed) is changed
+    error = _response(503)
+    assert fetcher.fetch("other", lambda headers: error) is error
+
+    assert fetcher.changed == {"page"}
+    assert not fetcher.all_unchanged
+
+
+def test_fetch_ignores_validators_of_another_scope() -> None:
+    fetcher = _fetcher(page=_source(scope="2026-10-17", etag='"v1"'))
+    response = _response()
+    send = MagicMock(return_value=response)
+
+    # Same bytes, but a new duty window has to be persisted.
+    assert fetcher.fetch("page", send, scope="2026-10-18") is response
+    send.assert_called_once_with({})
+
+
+def test_fetch_source_without_fetcher_sends_unconditionally() -> None:
+    response = _response()
+    send = MagicMock(return_value=response)
+
+    assert fetch_source(None, "page", send) is response
+    send.assert_called_once_with({})
+
+
+@pytest.mark.django_db
+def test_commit_stores_validators_and_counts_unchanged_runs() -> None:
+    City.objects.create(name="eskisehir")
+
+    first = ConditionalFetcher("eskisehir")
+    first.fetch("page", lambda headers: _response(ETag='"v1"'))
+    first.commit()
+
+    source = ScrapeSource.objects.get(city__name="eskisehir", key="page")
+    assert source.etag == '"v1"'
+    assert source.content_hash == hashlib.sha256(BODY).hexdigest()
+    assert source.unchanged_runs == 0
+
+    second = ConditionalFetcher("eskisehir")
+    send = MagicMock(return_value=_response(304, b""))
+    assert second.fetch("page", send) is None
+    send.assert_called_once_with({"If-None-Match": '"v1"'})
+    second.commit()
+
+    source.refresh_from_db()
+    assert source.unchanged_runs == 1
+    assert source.checked_at > source.changed_at
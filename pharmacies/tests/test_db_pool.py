@@ -0,0 +1,48 @@
+import logging
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pharmacies.db_pool import (
+    get_pool_stats,
+    report_pool_stats,
+    reset_pool_stats_report,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_report() -> Iterator[None]:
+    reset_pool_stats_report()
+    yield
+    reset_pool_stats_report()
+
+
+def test_no_pool_reports_nothing() -> None:
+    with patch("pharmacies.db_pool._get_pool", return_value=None):
+        assert get_pool_stats() == {}
+        report_pool_stats()
+
+
+def test_report_logs_average_wait_once_per_interval(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    pool = MagicMock()
+    pool.pop_stats.return_value = {
+        "requests_num": 4,
+        "requests_queued": 2,
+        "requests_wait_ms": 30,
+        "pool_available": 1,
+        "pool_size": 4,
+    }
+
+    with (
+        patch("pharmacies.db_pool._get_pool", return_value=pool),
+        caplog.at_level(logging.INFO, logger="pharmacies.db_pool"),
+    ):
+        report_pool_stats()
+        report_pool_stats()
+
+    pool.pop_stats.assert_called_once()
+    assert "4 requests, 2 queued, 7.5 ms average wait" in caplog.text
+    assert "1/4 connections idle" in caplog.text
@@ -0,0 +1,84 @@
+import gzip
+import json
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.utils import timezone
+
+from pharmacies.models import City, Pharmacy
+from pharmacies.utils.duty_geojson import (
+    build_duty_geojson,
+    get_duty_geojson,
+    refresh_duty_geojson,
+)
+
+
+@patch("pharmacies.utils.duty_geojson.build_duty_geojson")
+@patch("pharmacies.utils.duty_geojson.get_city")
+def test_get_duty_geojson_builds_once_per_roster_version(
+    mock_get_city: MagicMock, mock_build: MagicMock
+) -> None:
+    mock_get_city.return_value = MagicMock(roster_version=3)
+    mock_build.side_effect = lambda name, version: (name, version)
+
+    assert get_duty_geojson("eskisehir") == ("eskisehir", 3)
+    assert get_duty_geojson("eskisehir") == ("eskisehir", 3)
+    mock_build.assert_called_once_with("eskisehir", 3)
+
+    mock_get_city.return_value = MagicMock(roster_version=4)
+    assert get_duty_geojson("eskisehir") == ("eskisehir", 4)
+
+
+@pytest.mark.django_db
+class TestBuildDutyGeoJSON:
+    def test_lists_current_and_upcoming_shifts(self) -> None:
+        city = City.objects.create(name="eskisehir")
+        now = timezone.now()
+        for name, start, end in (
+            ("Past Eczane", now - timedelta(hours=10), now - timedelta(hours=1)),
+            ("Current Eczane", now - timedelta(hours=1), now + timedelta(hours=8)),
+            ("Next Eczane", now + timedelta(hours=8), now + timedelta(hours=20)),
+        ):
+            Pharmacy.objects.create(
+                name=name,
+                city=city,
+                district="D1",
+                location=Point(30.5, 39.7),
+                duty_start=start,
+                duty_end=end,
+            )
+
+        geojson = build_duty_geojson("eskisehir", 2, now=now)
+        document = json.loads(geojson.body)
+
+        assert document["type"] == "FeatureCollection"
+        assert document["roster_version"] == 2
+        assert [f["properties"]["name"] for f in document["features"]] == [
+            "Current Eczane",
+            "Next Eczane",
+        ]
+        assert document["features"][0]["geometry"] == {
+            "type": "Point",
+            "coordinates": [30.5, 39.7],
+        }
+        # Same roster, same bytes and validator.
+        rebuilt = build_duty_geojson("eskisehir", 2, now=now)
+        assert rebuilt.etag == geojson.etag
+        assert rebuilt.gzipped == geojson.gzipped
+        assert gzip.decompress(rebuilt.gzipped) == geojson.body
+
+    def test_refresh_stores_the_current_version(self) -> None:
+        City.objects.create(name="eskisehir", roster_version=5)
+
+        geojson = refresh_duty_geojson("eskisehir")
+
+        assert geojson.version == 5
+        with patch("pharmacies.utils.duty_geojson.build_duty_geojson") as mock_build:
+            with patch(
+                "pharmacies.utils.duty_geojson.get_city",
+                return_value=MagicMock(roster_version=5),
+            ):
+                assert get_duty_geojson("eskisehir") == geojson
+            mock_build.assert_not_called()
@@ -19,7 +19,7 @@ def test_get_duty_dates() -> None:
     assert end == datetime(2025, 12, 17, 9, 0)
 
 
-@patch("pharmacies.utils.eskisehireo_scraper.requests.get")
+@patch("pharmacies.utils.eskisehireo_scraper.http_client.get")
 @patch("pharmacies.utils.utils.get_coordinates_from_google_maps_url")
 def test_get_eskisehir_data(mock_get_coords: MagicMock, mock_get: MagicMock) -> None:
     mock_get_coords.return_value = {"lat": 39.7, "lng": 30.5}
@@ -37,7 +37,7 @@ def test_get_eskisehir_data(mock_get_coords: MagicMock, mock_get: MagicMock) ->
     mock_response.text = html_content
     mock_get.return_value = mock_response
 
-    data = get_eskisehir_data()
+    data = list(get_eskisehir_data())
 
     assert len(data) == 1
     assert data[0]["name"] == "TEST ECZANESİ"
@@ -49,7 +49,7 @@ def test_get_eskisehir_data(mock_get_coords: MagicMock, mock_get: MagicMock) ->
     assert data[0]["duty_end"] == datetime(2025, 12, 17, 9, 0)
 
 
-@patch("pharmacies.utils.eskisehireo_scraper.requests.get")
+@patch("pharmacies.utils.eskisehireo_scraper.http_client.get")
 def test_get_eskisehir_data_no_h4(mock_get: MagicMock) -> None:
     html_content = """
     <div class="nobetci">
@@ -60,5 +60,5 @@ def test_get_eskisehir_data_no_h4(mock_get: MagicMock) -> None:
     mock_response.text = html_content
     mock_get.return_value = mock_response
 
-    data = get_eskisehir_data()
+    data = list(get_eskisehir_data())
     assert len(data) == 0
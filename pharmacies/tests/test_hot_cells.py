@@ -0,0 +1,91 @@
+import time
+from collections.abc import Iterator
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from pharmacies.models import City, OriginCellTraffic
+from pharmacies.utils.hot_cells import (
+    CountMinSketch,
+    HotCellCounter,
+    flush_hot_cells,
+    get_local_hot_cells,
+    record_request,
+    reset_hot_cells,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_hot_cells() -> Iterator[None]:
+    reset_hot_cells()
+    yield
+    reset_hot_cells()
+
+
+def test_count_min_sketch_never_undercounts() -> None:
+    sketch = CountMinSketch(width=64, depth=4)
+    counts = {f"39.{i:03d},30.500": i % 7 + 1 for i in range(200)}
+    for key, count in counts.items():
+        sketch.add(key, count)
+
+    for key, count in counts.items():
+        assert sketch.estimate(key) >= count
+    assert sketch.estimate("39.000,30.500") == sketch.estimate("39.000,30.500")
+
+
+def test_hot_cell_counter_keeps_heavy_hitters() -> None:
+    counter = HotCellCounter(width=256, depth=4, top_k=3)
+    for i in range(100):
+        counter.add(f"39.{i:03d},30.500")
+    for cell, requests in [("39.700,30.500", 50), ("39.710,30.500", 30)]:
+        for _ in range(requests):
+            counter.add(cell)
+
+    assert [cell for cell, _ in counter.most_common(2)] == [
+        "39.700,30.500",
+        "39.710,30.500",
+    ]
+    assert counter.most_common(1)[0][1] >= 50
+    assert counter.total == 180
+
+
+def test_record_request_counts_quantized_cells_per_city() -> None:
+    record_request("eskisehir", 39.7001, 30.5002)
+    record_request("eskisehir", 39.7004, 30.4998)
+    record_request("ankara", 39.93, 32.85)
+
+    assert get_local_hot_cells("eskisehir") == [("39.700,30.500", 2)]
+    assert get_local_hot_cells("istanbul") == []
+
+
+def test_record_request_overhead_is_well_under_a_millisecond() -> None:
+    iterations = 2000
+    started = time.perf_counter()
+    for i in range(iterations):
+        record_request("istanbul", 41.0 + (i % 50) / 1000, 29.0)
+    per_request = (time.perf_counter() - started) / iterations
+
+    assert per_request < 0.0005
+
+
+@pytest.mark.django_db
+def test_flush_adds_window_counts_and_command_lists_cells() -> None:
+    City.objects.create(name="eskisehir")
+    for _ in range(2):
+        record_request("eskisehir", 39.7, 30.5)
+        record_request("eskisehir", 39.71, 30.5)
+        record_request("eskisehir", 39.71, 30.5)
+        record_request("unknown", 1.0, 1.0)
+        assert flush_hot_cells() == 2
+
+    assert dict(OriginCellTraffic.objects.values_list("origin_cell", "requests")) == {
+        "39.700,30.500": 2,
+        "39.710,30.500": 4,
+    }
+    assert get_local_hot_cells("eskisehir") == []
+
+    out = StringIO()
+    call_command("hot_cells", "--limit", "1", stdout=out)
+    assert "39.710,30.500\t4" in out.getvalue()
+    assert "39.700,30.500" not in out.getvalue()
@@ -0,0 +1,114 @@
+import json
+from datetime import UTC, datetime
+from io import StringIO
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test.utils import override_settings
+
+from pharmacies.utils.eskisehireo_scraper import get_eskisehir_data
+from pharmacies.utils.html_parser import BACKENDS, parse_blocks
+from pharmacies.utils.istanbul_saglik_scraper import get_istanbul_data
+
+PAGES = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "scraper_pages"
+# Outputs of the BeautifulSoup "html.parser" scrapers on the saved pages.
+EXPECTED = json.loads((PAGES / "expected_output.json").read_text(encoding="utf-8"))
+
+SNIPPET = """
+<div class="card border-primary">
+    <p><i class="fa fa-home"></i> Arifiye Mah. &amp; Sok. <b>bold</b></p>
+    <p><i class="la la-home"></i> <span>x <label>Address</label></span></p>
+    <a class="btn btn-block" href="tel:123">1 2 3</a>
+</div>
+<div class="cards">Not a card</div>
+"""
+
+
+def _response(page: str) -> MagicMock:
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    response.text = (PAGES / page).read_text(encoding="utf-8")
+    return response
+
+
+def _serialize(data: list[dict[str, object]]) -> object:
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+class TestBackendParity:
+    def test_istanbul(self, backend: str) -> None:
+        with (
+            override_settings(
+                SCRAPER_HTML_PARSER=backend, ISTANBUL_SCRAPER_REQUEST_INTERVAL=0
+            ),
+            patch(
+                "pharmacies.utils.istanbul_saglik_scraper.http_client.post",
+                return_value=_response("istanbul_district.html"),
+            ),
+            patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Kadıköy"]),
+            patch(
+                "pharmacies.utils.istanbul_saglik_scraper.timezone.now",
+                return_value=datetime(2025, 12, 16, 14, 0, tzinfo=UTC),
+            ),
+            patch("builtins.print"),
+        ):
+            data = list(get_istanbul_data())
+
+        assert _serialize(data) == EXPECTED["istanbul"]
+
+    def test_eskisehir(self, backend: str) -> None:
+        with (
+            override_settings(SCRAPER_HTML_PARSER=backend),
+            patch(
+                "pharmacies.utils.eskisehireo_scraper.http_client.get",
+                return_value=_response("eskisehir_duty.html"),
+            ),
+        ):
+            data = list(get_eskisehir_data())
+
+        assert _serialize(data) == EXPECTED["eskisehir"]
+
+    def test_node_queries(self, backend: str) -> None:
+        (card,) = parse_blocks(SNIPPET, ".card", backend)
+
+        icon = card.select_one("i.fa-home")
+        assert icon is not None
+        assert icon.tail().strip() == "Arifiye Mah. & Sok."
+
+        label_icon = card.select_one("i.la.la-home")
+        assert label_icon is not None
+        assert label_icon.tail().strip() == ""
+        label = label_icon.find_next("label")
+        assert label is not None
+        assert label.text() == "Address"
+
+        link = card.select_one('a[href^="tel:"]')
+        assert link is not None
+        assert link.attr("href") == "tel:123"
+        assert link.attr("title") is None
+        assert card.select_one("h4") is None
+        assert len(card.select("p")) == 2
+
+
+def test_unknown_backend_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown HTML parser backend"):
+        parse_blocks(SNIPPET, ".card", "html5lib")
+
+
+def test_benchmark_command_reports_every_backend() -> None:
+    out = StringIO()
+    call_command(
+        "benchmark_html_parsers",
+        str(PAGES / "eskisehir_duty.html"),
+        selector="div.nobetci",
+        iterations=2,
+        stdout=out,
+    )
+
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines] == list(BACKENDS)
+    assert all(line.endswith("4 blocks/iteration") for line in lines)
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+import requests
+from django.test.utils import override_settings
+
+from pharmacies import http_client
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _reset_http_client() -> Iterator[None]:
+    http_client.reset_http_client()
+    yield
+    http_client.reset_http_client()
+
+
+@pytest.fixture
+def local_server() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_use_endpoint_timeout_and_record_stats() -> None:
+    session = MagicMock()
+    with patch("pharmacies.http_client.get_session", return_value=session):
+        http_client.get("https://example.com", endpoint="eskisehir_scraper")
+        http_client.post(
+            "https://example.com", endpoint="unknown", params={"a": 1}, timeout=1
+        )
+
+    assert session.request.call_args_list[0].kwargs == {"timeout": (5, 60)}
+    assert session.request.call_args_list[1].kwargs == {
+        "params": {"a": 1},
+        "timeout": 1,
+    }
+    endpoints = http_client.get_http_client_stats()["endpoints"]
+    assert endpoints["eskisehir_scraper"]["requests"] == 1
+    assert endpoints["unknown"]["errors"] == 0
+
+
+def test_failed_requests_are_counted() -> None:
+    session = MagicMock()
+    session.request.side_effect = requests.ConnectionError("refused")
+    with (
+        patch("pharmacies.http_client.get_session", return_value=session),
+        pytest.raises(requests.ConnectionError),
+    ):
+        http_client.get("https://example.com", endpoint="google_geocode")
+
+    stats = http_client.get_http_client_stats()["endpoints"]["google_geocode"]
+    assert stats["requests"] == 1
+    assert stats["errors"] == 1
+
+
+@override_settings(HTTP_CLIENT_RETRIES=4, HTTP_CLIENT_POOL_MAXSIZE=3)
+def test_session_is_shared_and_configured() -> None:
+    session = http_client.get_session()
+
+    assert http_client.get_session() is session
+    adapter = session.get_adapter("https://maps.googleapis.com")
+    assert adapter.max_retries.total == 4
+    assert "POST" in adapter.max_retries.allowed_methods
+    assert adapter._pool_maxsize == 3  # type: ignore[attr-defined]
+
+
+def test_session_is_rebuilt_after_fork() -> None:
+    session = http_client.get_session()
+
+    with patch("pharmacies.http_client.os.getpid", return_value=-1):
+        assert http_client.get_session() is not session
+
+
+def test_connections_are_kept_alive(local_server: str) -> None:
+    http_client.warm_up([local_server], background=False)
+    for _ in range(3):
+        response = http_client.get(f"{local_server}/", endpoint="default")
+        assert response.text == "ok"
+
+    pools = http_client.get_http_client_stats()["pools"]
+    assert pools[local_server] == {"requests": 4, "connections_opened": 1}
+
+
+def _async_client(handler: Any) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@override_settings(HTTP_CLIENT_RETRIES=2, HTTP_CLIENT_BACKOFF_FACTOR=0)
+def test_async_requests_retry_and_record_stats() -> None:
+    statuses = iter([503, 200])
+    timeouts: list[Any] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(next(statuses))
+
+    with patch(
+        "pharmacies.http_client.get_async_client",
+        side_effect=lambda: _async_client(handler),
+    ):
+        response = asyncio.run(
+            http_client.aget("https://example.com", endpoint="eskisehir_scraper")
+        )
+
+    assert response.status_code == 200
+    assert timeouts[0] == {"connect": 5, "read": 60, "write": 60, "pool": 60}
+    stats = http_client.get_http_client_stats()["endpoints"]["eskisehir_scraper"]
+    assert (stats["requests"], stats["errors"]) == (1, 0)
+
+
+@override_settings(HTTP_CLIENT_RETRIES=1, HTTP_CLIENT_BACKOFF_FACTOR=0)
+def test_async_requests_raise_after_last_retry() -> None:
+    attempts: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    with (
+        patch(
+            "pharmacies.http_client.get_async_client",
+            side_effect=lambda: _async_client(handler),
+        ),
+        pytest.raises(httpx.ConnectError),
+    ):
+        asyncio.run(http_client.apost("https://example.com", endpoint="default"))
+
+    assert len(attempts) == 2
+    assert http_client.get_http_client_stats()["endpoints"]["default"]["errors"] == 1
@@ -43,20 +43,18 @@ def test_invalid_coordinates(
     assert b"Invalid coordinates" in response.content
 
 
-@patch("pharmacies.views.City")
+@patch("pharmacies.views.get_city")
 @patch("pharmacies.views.get_city_name_from_location")
 def test_valid_coordinates(
-    mock_get_city: MagicMock, mock_city_model: MagicMock, rf: RequestFactory
+    mock_get_city: MagicMock, mock_get_city_record: MagicMock, rf: RequestFactory
 ) -> None:
     """Test that valid coordinates proceed (mocking the rest)."""
-    mock_city_model.DoesNotExist = Exception
-
     mock_get_city.return_value = "Test City"
     mock_city_instance = MagicMock()
     # Assuming PharmacyStatus.OPEN is handled/mocked correctly.
     # The view checks: if city_status == PharmacyStatus.OPEN
     mock_city_instance.get_city_status.return_value = PharmacyStatus.OPEN
-    mock_city_model.objects.get.return_value = mock_city_instance
+    mock_get_city_record.return_value = mock_city_instance
 
     with patch("pharmacies.views.get_nearest_pharmacies_open", return_value=[]):
         data = {"lat": 40.0, "lng": 30.0}
@@ -1,16 +1,29 @@
+import threading
+import time
+from collections.abc import Iterator
 from datetime import UTC, datetime
+from typing import Any
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.conf import settings
+from django.test.utils import override_settings
 from requests.exceptions import ConnectionError, HTTPError
 
 from pharmacies.utils.istanbul_saglik_scraper import (
     _get_coordinates_from_sehirharitasi_url,
     _get_duty_times,
+    _Throttle,
     get_istanbul_data,
 )
 
 
+@pytest.fixture(autouse=True)
+def _no_request_interval() -> Iterator[None]:
+    with override_settings(ISTANBUL_SCRAPER_REQUEST_INTERVAL=0):
+        yield
+
+
 def test_get_coordinates_from_sehirharitasi_url() -> None:
     url = "http://sehirharitasi.ibb.gov.tr/?lat=41.0&lon=28.9&zoom=18"
     coords = _get_coordinates_from_sehirharitasi_url(url)
@@ -31,7 +44,7 @@ def test_get_duty_times(mock_now: MagicMock) -> None:
     assert end == datetime(2025, 12, 17, 6, 0, tzinfo=UTC)
 
 
-@patch("pharmacies.utils.istanbul_saglik_scraper.requests.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
 @patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar"])
 def test_get_istanbul_data(mock_post: MagicMock) -> None:
     html_content = """
@@ -51,7 +64,7 @@ def test_get_istanbul_data(mock_post: MagicMock) -> None:
     mock_response.text = html_content
     mock_post.return_value = mock_response
 
-    data = get_istanbul_data()
+    data = list(get_istanbul_data())
 
     assert len(data) == 1
     assert data[0]["name"] == "TEST ECZANESİ"
@@ -61,7 +74,7 @@ def test_get_istanbul_data(mock_post: MagicMock) -> None:
     assert data[0]["district"] == "Adalar"
 
 
-@patch("pharmacies.utils.istanbul_saglik_scraper.requests.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
 @patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar"])
 def test_get_istanbul_data_failure(mock_post: MagicMock) -> None:
     mock_response = MagicMock()
@@ -69,20 +82,16 @@ def test_get_istanbul_data_failure(mock_post: MagicMock) -> None:
     mock_post.return_value = mock_response
 
     with pytest.raises(HTTPError):
-        get_istanbul_data()
+        list(get_istanbul_data())
 
     mock_response.raise_for_status.assert_called_once()
 
 
-@patch("pharmacies.utils.istanbul_saglik_scraper.requests.post")
-@patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar", "Ataşehir"])
-def test_get_istanbul_data_raises_on_connection_error_after_partial_fetch(
-    mock_post: MagicMock,
-) -> None:
-    html_content = """
+def _district_response(name: str) -> MagicMock:
+    html_content = f"""
     <div class="card">
         <div class="card-header">Ignored</div>
-        <div class="card-header"><b>TEST ECZANESİ</b></div>
+        <div class="card-header"><b>{name}</b></div>
         <label>Ignored</label>
         <label><a href="tel:123456">123 456</a></label>
         <i class="la la-home"></i><label>Test Address</label>
@@ -92,15 +101,98 @@ def test_get_istanbul_data_raises_on_connection_error_after_partial_fetch(
     mock_response = MagicMock()
     mock_response.raise_for_status.return_value = None
     mock_response.text = html_content
-    mock_post.side_effect = [mock_response, ConnectionError("down")]
+    return mock_response
+
+
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar", "Ataşehir"])
+def test_get_istanbul_data_skips_districts_that_fail(mock_post: MagicMock) -> None:
+    def post(
+        url: str, *, endpoint: str, params: dict[str, str], **kwargs: Any
+    ) -> MagicMock:
+        if params["ilce"] == "Adalar":
+            raise ConnectionError("down")
+        return _district_response("ATAŞEHİR ECZANESİ")
+
+    mock_post.side_effect = post
+
+    data = list(get_istanbul_data())
+
+    assert [(p["district"], p["name"]) for p in data] == [
+        ("Ataşehir", "ATAŞEHİR ECZANESİ")
+    ]
+    assert mock_post.call_count == 2
+
+
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar", "Ataşehir"])
+def test_get_istanbul_data_raises_when_every_district_fails(
+    mock_post: MagicMock,
+) -> None:
+    mock_post.side_effect = ConnectionError("down")
 
     with pytest.raises(ConnectionError):
-        get_istanbul_data()
+        list(get_istanbul_data())
 
     assert mock_post.call_count == 2
 
 
-@patch("pharmacies.utils.istanbul_saglik_scraper.requests.post")
+@override_settings(
+    PHARMACY_SCRAPERS={
+        "istanbul": {**settings.PHARMACY_SCRAPERS["istanbul"], "concurrency": 4}
+    }
+)
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
+@patch(
+    "pharmacies.utils.istanbul_saglik_scraper.DISTRICTS",
+    ["Adalar", "Ataşehir", "Beykoz", "Fatih"],
+)
+def test_get_istanbul_data_keeps_district_order(mock_post: MagicMock) -> None:
+    started = threading.Barrier(4, timeout=5)
+
+    def post(
+        url: str, *, endpoint: str, params: dict[str, str], **kwargs: Any
+    ) -> MagicMock:
+        # All districts are in flight at once; later ones finish first.
+        started.wait()
+        time.sleep(
+            {"Adalar": 0.03, "Ataşehir": 0.02, "Beykoz": 0.01}.get(params["ilce"], 0)
+        )
+        return _district_response(params["ilce"].upper())
+
+    mock_post.side_effect = post
+
+    data = list(get_istanbul_data())
+
+    assert [p["district"] for p in data] == ["Adalar", "Ataşehir", "Beykoz", "Fatih"]
+
+
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar", "Fatih"])
+def test_get_istanbul_data_streams_districts(mock_post: MagicMock) -> None:
+    mock_post.side_effect = lambda url, *, params, **kwargs: _district_response(
+        params["ilce"].upper()
+    )
+
+    records = get_istanbul_data()
+    mock_post.assert_not_called()
+
+    # The first district is yielded before the generator finishes.
+    assert next(records)["district"] == "Adalar"
+    assert [p["district"] for p in records] == ["Fatih"]
+
+
+def test_throttle_spaces_request_starts() -> None:
+    throttle = _Throttle(0.05)
+    with patch("pharmacies.utils.istanbul_saglik_scraper.time.sleep") as mock_sleep:
+        throttle.wait()
+        throttle.wait()
+
+    mock_sleep.assert_called_once()
+    assert 0 < mock_sleep.call_args.args[0] <= 0.05
+
+
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
 @patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar"])
 def test_get_istanbul_data_missing_tags(mock_post: MagicMock) -> None:
     # Structure where tags are missing or malformed to hit else branches
@@ -128,12 +220,12 @@ def test_get_istanbul_data_missing_tags(mock_post: MagicMock) -> None:
 
     # Capture print output to verify warning
     with patch("builtins.print") as mock_print:
-        data = get_istanbul_data()
+        data = list(get_istanbul_data())
         assert len(data) == 0
         mock_print.assert_called_with("Warning: Unable to get coordinates for N/A")
 
 
-@patch("pharmacies.utils.istanbul_saglik_scraper.requests.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
 @patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar"])
 def test_get_istanbul_data_directions_list(mock_post: MagicMock) -> None:
     # Test case where directions_tag.get("href") returns a list (though unlikely in BS4 unless attributes are multivalued)
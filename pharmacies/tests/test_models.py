@@ -1,9 +1,15 @@
-from datetime import UTC, datetime, time
+from datetime import UTC, datetime, time, timedelta
 
 import pytest
 from django.contrib.gis.geos import Point
 
-from pharmacies.models import City, Pharmacy, PharmacyStatus, WorkingSchedule
+from pharmacies.models import (
+    City,
+    Pharmacy,
+    PharmacyStatus,
+    ScraperConfig,
+    WorkingSchedule,
+)
 
 
 @pytest.mark.django_db
@@ -112,6 +118,29 @@ class TestWorkingScheduleModel:
         # Sunday - Always closed
         assert schedule.is_open(datetime(2025, 12, 21, 10, 0)) is False
 
+    def test_next_status_change(self) -> None:
+        city = City.objects.create(name="Test City")
+        schedule = WorkingSchedule.objects.create(
+            city=city,
+            weekday_start=time(9, 0),
+            weekday_end=time(18, 0),
+            saturday_start=time(9, 0),
+            saturday_end=time(13, 0),
+        )
+
+        # Monday 10:00 - closes at 18:00
+        assert schedule.next_status_change(
+            datetime(2025, 12, 15, 10, 0, tzinfo=UTC)
+        ) == datetime(2025, 12, 15, 18, 0, tzinfo=UTC)
+        # Monday 18:00 - opens on Tuesday
+        assert schedule.next_status_change(
+            datetime(2025, 12, 15, 18, 0, tzinfo=UTC)
+        ) == datetime(2025, 12, 16, 9, 0, tzinfo=UTC)
+        # Saturday 14:00 - skips Sunday
+        assert schedule.next_status_change(
+            datetime(2025, 12, 20, 14, 0, tzinfo=UTC)
+        ) == datetime(2025, 12, 22, 9, 0, tzinfo=UTC)
+
     def test_update_periodic_tasks(self) -> None:
         from django_celery_beat.models import PeriodicTask
 
@@ -164,3 +193,23 @@ class TestPharmacyModel:
 
         assert near_pharmacies[0] == p1
         assert near_pharmacies[1] == p2
+
+
+class TestScraperConfigModel:
+    def test_next_run_skips_intervals_without_saved_data(self) -> None:
+        last_run = datetime(2025, 12, 15, 10, 0, tzinfo=UTC)
+        config = ScraperConfig(interval=6, last_run=last_run)
+
+        assert config.next_run(last_run + timedelta(hours=1)) == datetime(
+            2025, 12, 15, 16, 0, tzinfo=UTC
+        )
+        # Runs at 16:00 and 22:00 found nothing new.
+        assert config.next_run(datetime(2025, 12, 16, 1, 0, tzinfo=UTC)) == (
+            datetime(2025, 12, 16, 4, 0, tzinfo=UTC)
+        )
+        assert config.next_run(datetime(2025, 12, 15, 16, 0, tzinfo=UTC)) == (
+            datetime(2025, 12, 15, 22, 0, tzinfo=UTC)
+        )
+
+    def test_next_run_is_unknown_before_the_first_run(self) -> None:
+        assert ScraperConfig(interval=6).next_run(datetime.now(UTC)) is None
@@ -0,0 +1,228 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.contrib.gis.geos import Point
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from pharmacies.cache import get_cache
+from pharmacies.models import City, Pharmacy
+from pharmacies.utils.roster_snapshot import (
+    RosterEntry,
+    RosterSnapshot,
+    get_roster_snapshot,
+    rebuild_roster_snapshot,
+)
+from pharmacies.utils.utils import (
+    add_scraped_data_to_db,
+    get_map_points_from_roster_snapshot,
+)
+
+DUTY_START = datetime(2025, 12, 16, 18, 0, tzinfo=UTC)
+DUTY_END = datetime(2025, 12, 17, 8, 0, tzinfo=UTC)
+
+
+def _snapshot(points: list[tuple[float, float, datetime, datetime]]) -> RosterSnapshot:
+    return RosterSnapshot(
+        city_name="eskisehir",
+        version=1,
+        built_at=datetime(2025, 12, 16, tzinfo=UTC),
+        lat=np.array([p[0] for p in points]),
+        lng=np.array([p[1] for p in points]),
+        duty_start=np.array([p[2].timestamp() for p in points]),
+        duty_end=np.array([p[3].timestamp() for p in points]),
+        entries=tuple(
+            RosterEntry(pharmacy_id=i, name=f"Eczane {i}", address="")
+            for i in range(len(points))
+        ),
+    )
+
+
+def test_roster_snapshot_nearest_orders_on_duty_pharmacies() -> None:
+    off_duty_end = DUTY_START - timedelta(hours=1)
+    snapshot = _snapshot(
+        [
+            (39.80, 30.50, DUTY_START, DUTY_END),
+            (39.71, 30.50, DUTY_START, DUTY_END),
+            (39.70, 30.50, DUTY_START - timedelta(days=1), off_duty_end),
+            (39.75, 30.50, DUTY_START, DUTY_END),
+        ]
+    )
+
+    nearest = snapshot.nearest(39.7, 30.5, datetime(2025, 12, 16, 22, tzinfo=UTC), 2)
+
+    assert [entry.pharmacy_id for entry, *_ in nearest] == [1, 3]
+    assert nearest[0][3] == pytest.approx(1112, abs=1)
+
+
+def test_roster_snapshot_nearest_applies_radius() -> None:
+    snapshot = _snapshot(
+        [
+            (39.71, 30.50, DUTY_START, DUTY_END),
+            (39.80, 30.50, DUTY_START, DUTY_END),
+        ]
+    )
+    when = datetime(2025, 12, 16, 22, tzinfo=UTC)
+
+    nearest = snapshot.nearest(39.7, 30.5, when, 5, radius=5_000)
+
+    assert [entry.pharmacy_id for entry, *_ in nearest] == [0]
+    assert snapshot.nearest(39.7, 30.5, when, 5, radius=500) == []
+
+
+def test_roster_snapshot_nearest_without_duty_pharmacies() -> None:
+    snapshot = _snapshot([(39.71, 30.50, DUTY_START, DUTY_END)])
+
+    assert snapshot.nearest(39.7, 30.5, DUTY_END + timedelta(hours=1), 5) == []
+    assert not snapshot.covers(datetime(2025, 12, 15, tzinfo=UTC))
+
+
+def test_rebuild_roster_snapshot_reuses_snapshot_from_shared_cache() -> None:
+    snapshot = _snapshot([(39.71, 30.50, DUTY_START, DUTY_END)] * 200)
+    with patch(
+        "pharmacies.utils.roster_snapshot.build_roster_snapshot",
+        return_value=snapshot,
+    ) as mock_build:
+        rebuild_roster_snapshot("eskisehir", version=1)
+        # Another worker: empty L1, snapshot only in the shared cache.
+        get_cache("roster").clear_local()
+        shared = rebuild_roster_snapshot("eskisehir", version=1)
+
+    mock_build.assert_called_once_with("eskisehir", 1)
+    assert shared is not snapshot
+    assert np.array_equal(shared.lat, snapshot.lat)
+    assert shared.entries == snapshot.entries
+
+
+def test_get_map_points_from_roster_snapshot() -> None:
+    entry = RosterEntry(pharmacy_id=7, name="Test Eczane", address="Addr")
+
+    points = get_map_points_from_roster_snapshot([(entry, 39.71, 30.5, 1111.6)])
+
+    assert points == [
+        {
+            "position": {"lat": 39.71, "lng": 30.5},
+            "pharmacy_id": 7,
+            "title": "Test Eczane",
+            "address": "Addr",
+            "status": "Nöbetçi",
+            "distance": 1112,
+        }
+    ]
+
+
+@pytest.mark.django_db
+class TestRosterSnapshotDB:
+    def _create_pharmacy(self, city: City, name: str, lat: float) -> Pharmacy:
+        now = timezone.now()
+        return Pharmacy.objects.create(
+            name=name,
+            city=city,
+            district="D1",
+            location=Point(30.5, lat),
+            duty_start=now - timedelta(hours=1),
+            duty_end=now + timedelta(hours=8),
+        )
+
+    def test_scrape_bumps_roster_version(self) -> None:
+        city = City.objects.create(name="eskisehir")
+        now = timezone.now()
+
+        add_scraped_data_to_db(
+            [
+                {
+                    "name": "Scraped Eczane",
+                    "address": "Addr",
+                    "phone": "123",
+                    "district": "D1",
+                    "coordinates": {"lat": 39.71, "lng": 30.5},
+                    "duty_start": now - timedelta(hours=1),
+                    "duty_end": now + timedelta(hours=8),
+                }
+            ],
+            city_name="eskisehir",
+        )
+
+        city.refresh_from_db()
+        assert city.roster_version == 1
+        assert len(get_roster_snapshot("eskisehir")) == 1
+
+    def test_scrape_announces_new_roster_on_commit(
+        self, django_capture_on_commit_callbacks: Any
+    ) -> None:
+        City.objects.create(name="eskisehir")
+        now = timezone.now()
+
+        with (
+            patch("pharmacies.utils.utils.invalidate_city_registry") as mock_invalidate,
+            django_capture_on_commit_callbacks() as callbacks,
+        ):
+            add_scraped_data_to_db(
+                [
+                    {
+                        "name": "Scraped Eczane",
+                        "address": "Addr",
+                        "phone": "123",
+                        "district": "D1",
+                        "coordinates": {"lat": 39.71, "lng": 30.5},
+                        "duty_start": now - timedelta(hours=1),
+                        "duty_end": now + timedelta(hours=8),
+                    }
+                ],
+                city_name="eskisehir",
+            )
+            mock_invalidate.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        mock_invalidate.assert_called_once_with()
+
+    def test_version_change_rebuilds_snapshot(self) -> None:
+        city = City.objects.create(name="eskisehir")
+        self._create_pharmacy(city, "First", 39.71)
+        first = get_roster_snapshot("eskisehir")
+
+        with override_settings(ROSTER_SNAPSHOT_VERSION_CHECK_INTERVAL=0):
+            assert get_roster_snapshot("eskisehir") is first
+            City.objects.filter(pk=city.pk).update(roster_version=100)
+            second = get_roster_snapshot("eskisehir")
+
+        assert second is not first
+        assert second.version == 100
+
+    def test_unknown_city_raises(self) -> None:
+        with pytest.raises(City.DoesNotExist):
+            get_roster_snapshot("atlantis")
+
+    def test_get_nearest_pharmacies_on_duty_uses_snapshot(self) -> None:
+        from pharmacies.utils.utils import get_nearest_pharmacies_on_duty
+
+        city = City.objects.create(name="eskisehir")
+        self._create_pharmacy(city, "Far", 39.80)
+        self._create_pharmacy(city, "Near", 39.71)
+        get_roster_snapshot("eskisehir")
+
+        def side_effect(
+            lat: float, lng: float, pharmacy_data: list[Any], **kwargs: Any
+        ) -> None:
+            for p in pharmacy_data:
+                p["travel_distance"] = p["distance"]
+
+        with (
+            patch(
+                "pharmacies.utils.utils.add_travel_distances_to_pharmacy_data",
+                side_effect=side_effect,
+            ),
+            patch(
+                "pharmacies.utils.utils._query_nearest_pharmacies_on_duty"
+            ) as mock_query,
+        ):
+            results = get_nearest_pharmacies_on_duty(
+                lat=39.7, lng=30.5, city="eskisehir"
+            )
+
+        mock_query.assert_not_called()
+        assert [r["title"] for r in results] == ["Near", "Far"]
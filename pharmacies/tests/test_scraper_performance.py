@@ -1,4 +1,6 @@
 import time
+from collections.abc import Iterator
+from typing import Any
 
 from django.contrib.gis.geos import Point
 from django.db import connection
@@ -93,3 +95,35 @@ class ScraperPerformanceTest(TestCase):
             expected_max_queries,
             "Query count is too high, N+1 problem detected!",
         )
+
+    def test_add_scraped_data_streams_in_chunks(self) -> None:
+        consumed = []
+
+        def records() -> Iterator[dict[str, Any]]:
+            for i in range(self.num_existing + self.num_new):
+                consumed.append(i)
+                yield {
+                    "name": f"Pharmacy {i}",
+                    "phone": f"123456789{i}",
+                    "address": f"Address {i}",
+                    "coordinates": {"lat": 40.0, "lng": 30.0},
+                    "duty_start": timezone.now(),
+                    "duty_end": timezone.now(),
+                    "district": "District 1",
+                }
+
+        with CaptureQueriesContext(connection) as ctx:
+            saved = add_scraped_data_to_db(records(), self.city.name, chunk_size=30)
+
+        self.assertEqual(saved, 100)
+        self.assertEqual(len(consumed), 100)
+        self.assertEqual(Pharmacy.objects.filter(city=self.city).count(), 100)
+        # Per chunk: one lookup, one bulk create and one bulk update.
+        self.assertLessEqual(len(ctx.captured_queries), 2 + 4 * 3)
+        self.city.refresh_from_db()
+        self.assertEqual(self.city.roster_version, 1)
+
+    def test_add_scraped_data_without_records_keeps_roster_version(self) -> None:
+        self.assertEqual(add_scraped_data_to_db(iter([]), self.city.name), 0)
+        self.city.refresh_from_db()
+        self.assertEqual(self.city.roster_version, 0)
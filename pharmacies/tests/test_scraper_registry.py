@@ -0,0 +1,121 @@
+import subprocess
+import sys
+from collections.abc import Iterator
+from importlib.metadata import EntryPoint
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.test.utils import override_settings
+
+from pharmacies.utils import get_city_data
+from pharmacies.utils.scraper_registry import (
+    ScraperSpec,
+    get_scraper,
+    get_scrapers,
+    reset_scraper_registry,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_registry() -> Iterator[None]:
+    reset_scraper_registry()
+    yield
+    reset_scraper_registry()
+
+
+def test_builtin_scrapers_are_registered_from_settings() -> None:
+    assert set(get_scrapers()) >= {"ankara", "eskisehir", "istanbul"}
+
+    spec = get_scraper("eskisehir")
+    assert spec.endpoint == "eskisehir_scraper"
+    assert spec.source == "https://www.eskisehireo.org.tr"
+
+    with pytest.raises(ValueError, match="Unknown city"):
+        get_scraper("atlantis")
+
+
+@patch("pharmacies.utils.scraper_registry.entry_points")
+def test_entry_points_register_cities_and_settings_override_them(
+    mock_entry_points: MagicMock,
+) -> None:
+    mock_entry_points.return_value = [
+        EntryPoint("izmir", "izmir_scraper:get_izmir_data", "pharmacies.scrapers")
+    ]
+
+    with override_settings(
+        PHARMACY_SCRAPERS={
+            "izmir": {"source": "https://izmir.example", "concurrency": 2}
+        }
+    ):
+        spec = get_scraper("izmir")
+
+    assert spec == ScraperSpec(
+        city="izmir",
+        scraper="izmir_scraper:get_izmir_data",
+        source="https://izmir.example",
+        concurrency=2,
+    )
+    mock_entry_points.assert_called_once_with(group="pharmacies.scrapers")
+
+
+@override_settings(PHARMACY_SCRAPERS={"izmir": {"source": "https://izmir.example"}})
+def test_settings_entry_without_scraper_is_rejected() -> None:
+    with pytest.raises(ValueError, match="has no scraper"):
+        get_scrapers()
+
+
+@override_settings(
+    PHARMACY_SCRAPERS={
+        "izmir": {"scraper": "pharmacies.tests.test_scraper_registry.fake_scraper"}
+    }
+)
+def test_get_city_data_dispatches_through_registry() -> None:
+    fetcher = MagicMock()
+    assert get_city_data("izmir", fetcher) == [{"fetcher": fetcher}]
+
+
+def fake_scraper(fetcher: object) -> list[dict[str, object]]:
+    return [{"fetcher": fetcher}]
+
+
+class FakeScrapers:
+    scrape = staticmethod(fake_scraper)
+
+
+def test_entry_point_style_path_is_loaded_through_attributes() -> None:
+    spec = ScraperSpec(
+        city="izmir",
+        scraper="pharmacies.tests.test_scraper_registry:FakeScrapers.scrape",
+    )
+
+    assert spec.load() is fake_scraper
+
+
+@patch("pharmacies.utils.eskisehireo_scraper.http_client.get")
+@override_settings(
+    PHARMACY_SCRAPERS={
+        "eskisehir": {
+            "scraper": "pharmacies.utils.eskisehireo_scraper.get_eskisehir_data",
+            "endpoint": "eskisehir_mirror",
+        }
+    }
+)
+def test_scrapers_send_requests_as_their_registered_endpoint(
+    mock_get: MagicMock,
+) -> None:
+    mock_get.return_value.text = ""
+
+    assert list(get_city_data("eskisehir")) == []
+    assert mock_get.call_args.kwargs["endpoint"] == "eskisehir_mirror"
+
+
+def test_scraper_modules_are_not_imported_by_views() -> None:
+    code = (
+        "import sys, django; django.setup(); import pharmacies.views; "
+        "print(sorted(m for m in sys.modules if m.startswith('bs4') "
+        "or m.endswith('_scraper')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
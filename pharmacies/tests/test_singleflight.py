@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from pharmacies.singleflight import (
+    asingle_flight,
+    get_single_flight_stats,
+    reset_single_flight,
+    single_flight,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats() -> Iterator[None]:
+    reset_single_flight()
+    yield
+    reset_single_flight()
+
+
+def test_concurrent_callers_share_one_call() -> None:
+    release = threading.Event()
+    calls = 0
+
+    def fetch() -> str:
+        nonlocal calls
+        calls += 1
+        release.wait(timeout=5)
+        return "eskisehir"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(single_flight, "geocode:1,2", fetch) for _ in range(8)]
+        while get_single_flight_stats()["local_waits"] < 7:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert results == ["eskisehir"] * 8
+    assert calls == 1
+    assert get_single_flight_stats()["leader_calls"] == 1
+
+
+def test_in_process_waiters_receive_the_leaders_exception() -> None:
+    release = threading.Event()
+
+    def fetch() -> str:
+        release.wait(timeout=5)
+        raise ValueError("quota exceeded")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(single_flight, "places:1,2", fetch) for _ in range(2)]
+        while get_single_flight_stats()["local_waits"] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="quota exceeded"):
+                future.result(timeout=5)
+
+
+def test_follower_uses_result_of_leader_in_another_worker() -> None:
+    # Another worker holds the lock and publishes its result shortly after.
+    cache.add("singleflight:lock:geocode:1,2", "other-worker", timeout=15)
+    timer = threading.Timer(
+        0.1, cache.set, args=("singleflight:result:geocode:1,2", "ankara")
+    )
+    timer.start()
+
+    try:
+        result = single_flight("geocode:1,2", lambda: pytest.fail("fetched"))
+    finally:
+        timer.cancel()
+
+    assert result == "ankara"
+    assert get_single_flight_stats()["remote_waits"] == 1
+
+
+def test_follower_takes_over_when_other_worker_fails() -> None:
+    # The other worker releases its lock without publishing a result.
+    cache.add("singleflight:lock:geocode:1,2", "other-worker", timeout=15)
+    timer = threading.Timer(0.1, cache.delete, args=("singleflight:lock:geocode:1,2",))
+    timer.start()
+
+    assert single_flight("geocode:1,2", lambda: "istanbul") == "istanbul"
+    stats = get_single_flight_stats()
+    assert stats["leader_calls"] == 1
+    assert cache.get("singleflight:lock:geocode:1,2") is None
+
+
+@override_settings(SINGLE_FLIGHT_WAIT_TIMEOUT=0)
+def test_follower_calls_upstream_after_wait_timeout() -> None:
+    cache.add("singleflight:lock:geocode:1,2", "other-worker", timeout=15)
+
+    assert single_flight("geocode:1,2", lambda: "izmir") == "izmir"
+    assert get_single_flight_stats()["fallback_calls"] == 1
+
+
+@override_settings(SINGLE_FLIGHT_ENABLED=False)
+def test_disabled_calls_through() -> None:
+    cache.add("singleflight:lock:geocode:1,2", "other-worker", timeout=15)
+
+    assert single_flight("geocode:1,2", lambda: "bursa") == "bursa"
+    assert get_single_flight_stats()["leader_calls"] == 0
+
+
+def test_async_callers_share_one_call() -> None:
+    calls = 0
+
+    async def fetch() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "eskisehir"
+
+    async def fetch_concurrently() -> list[str]:
+        return list(
+            await asyncio.gather(
+                *(asingle_flight("geocode:1,2", fetch) for _ in range(5))
+            )
+        )
+
+    assert asyncio.run(fetch_concurrently()) == ["eskisehir"] * 5
+    assert calls == 1
+    assert get_single_flight_stats()["local_waits"] == 4
+
+
+def test_async_follower_uses_result_of_sync_leader_in_another_worker() -> None:
+    cache.add("singleflight:lock:geocode:1,2", "other-worker", timeout=15)
+    timer = threading.Timer(
+        0.1, cache.set, args=("singleflight:result:geocode:1,2", "ankara")
+    )
+    timer.start()
+
+    async def fetch() -> str:
+        pytest.fail("fetched")
+
+    try:
+        result = asyncio.run(asingle_flight("geocode:1,2", fetch))
+    finally:
+        timer.cancel()
+
+    assert result == "ankara"
+    assert get_single_flight_stats()["remote_waits"] == 1
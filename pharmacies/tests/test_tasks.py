@@ -1,11 +1,26 @@
+from collections.abc import Iterator
 from contextlib import nullcontext
 from json import JSONDecodeError
 from unittest.mock import MagicMock, patch
 
+import pytest
 from django.db.utils import InterfaceError
+from django.test.utils import override_settings
 from requests.exceptions import RequestException
 
-from pharmacies.tasks import run_scraper
+from pharmacies.tasks import build_duty_geojson, run_scraper, warm_city_caches
+
+
+@pytest.fixture(autouse=True)
+def mock_warm_delay() -> Iterator[MagicMock]:
+    with patch("pharmacies.tasks.warm_city_caches.delay") as mock_delay:
+        yield mock_delay
+
+
+@pytest.fixture(autouse=True)
+def mock_geojson_delay() -> Iterator[MagicMock]:
+    with patch("pharmacies.tasks.build_duty_geojson.delay") as mock_delay:
+        yield mock_delay
 
 
 @patch("pharmacies.tasks.logger")
@@ -46,9 +61,10 @@ def test_run_scraper_skips_persistence_on_upstream_request_error(
     assert mock_close_old_connections.call_count == 2
 
 
+@override_settings(SCRAPER_CONDITIONAL_FETCH=False)
 @patch("pharmacies.tasks.logger")
 @patch("pharmacies.tasks._persist_scraped_data")
-@patch("pharmacies.utils.istanbul_saglik_scraper.requests.post")
+@patch("pharmacies.utils.istanbul_saglik_scraper.http_client.post")
 @patch("pharmacies.utils.istanbul_saglik_scraper.DISTRICTS", ["Adalar"])
 def test_run_scraper_handles_istanbul_request_failures_through_dispatcher(
     mock_post: MagicMock,
@@ -56,10 +72,11 @@ def test_run_scraper_handles_istanbul_request_failures_through_dispatcher(
     mock_logger: MagicMock,
 ) -> None:
     mock_post.side_effect = RequestException("down")
+    mock_persist.side_effect = lambda city_data, *args: (len(list(city_data)), 0)
 
     run_scraper("istanbul")
 
-    mock_persist.assert_not_called()
+    mock_persist.assert_called_once()
     mock_logger.warning.assert_called_once()
 
 
@@ -74,66 +91,138 @@ def test_run_scraper_skips_empty_scrapes(
     mock_logger: MagicMock,
 ) -> None:
     mock_get_city_data.return_value = []
+    mock_persist.return_value = (0, 0)
 
     run_scraper("istanbul")
 
-    mock_persist.assert_not_called()
+    mock_persist.assert_called_once()
     mock_logger.warning.assert_called_once()
-    assert mock_close_old_connections.call_count == 2
+    assert mock_close_old_connections.call_count == 3
 
 
-@patch("pharmacies.tasks.logger")
+@patch("pharmacies.tasks.close_old_connections")
+@patch("pharmacies.tasks._persist_scraped_data", return_value=(1, 1))
+@patch("pharmacies.tasks.get_city_data", return_value=[{"name": "Example"}])
+def test_run_scraper_queues_cache_warming_after_persistence(
+    mock_get_city_data: MagicMock,
+    mock_persist: MagicMock,
+    mock_close_old_connections: MagicMock,
+    mock_warm_delay: MagicMock,
+) -> None:
+    run_scraper("eskisehir")
+
+    mock_warm_delay.assert_called_once_with("eskisehir")
+
+    mock_warm_delay.reset_mock()
+    with override_settings(CACHE_WARMING_ENABLED=False):
+        run_scraper("eskisehir")
+    mock_warm_delay.assert_not_called()
+
+
+@patch("pharmacies.tasks.conditional_fetch.record_skipped_run")
 @patch("pharmacies.tasks.close_old_connections")
 @patch("pharmacies.tasks._persist_scraped_data")
-@patch("pharmacies.tasks.get_city_data")
-def test_run_scraper_retries_after_stale_db_connection(
+@patch("pharmacies.tasks.ConditionalFetcher")
+@patch("pharmacies.tasks.get_city_data", return_value=[])
+def test_run_scraper_skips_runs_whose_sources_are_unchanged(
     mock_get_city_data: MagicMock,
+    mock_fetcher_class: MagicMock,
     mock_persist: MagicMock,
     mock_close_old_connections: MagicMock,
+    mock_record_skipped_run: MagicMock,
+    mock_warm_delay: MagicMock,
+    mock_geojson_delay: MagicMock,
+) -> None:
+    fetcher = mock_fetcher_class.return_value
+    fetcher.all_unchanged = True
+    mock_persist.return_value = (0, 0)
+
+    run_scraper("eskisehir")
+
+    mock_get_city_data.assert_called_once_with(city_name="eskisehir", fetcher=fetcher)
+    mock_persist.assert_called_once_with([], "eskisehir", fetcher)
+    mock_record_skipped_run.assert_called_once_with()
+    mock_warm_delay.assert_not_called()
+    mock_geojson_delay.assert_not_called()
+
+
+@patch("pharmacies.tasks.close_old_connections")
+@patch(
+    "pharmacies.tasks.cache_warming.warm_city_caches",
+    return_value={"cells": 2, "warmed": 1, "elements": 5},
+)
+def test_warm_city_caches_task(
+    mock_warm: MagicMock, mock_close_old_connections: MagicMock
+) -> None:
+    assert warm_city_caches("eskisehir") == {"cells": 2, "warmed": 1, "elements": 5}
+    mock_warm.assert_called_once_with("eskisehir")
+
+
+@patch("pharmacies.tasks.close_old_connections")
+@patch("pharmacies.tasks.duty_geojson.refresh_duty_geojson")
+def test_build_duty_geojson_task(
+    mock_refresh: MagicMock, mock_close_old_connections: MagicMock
+) -> None:
+    mock_refresh.return_value.version = 7
+    assert build_duty_geojson("eskisehir") == 7
+    mock_refresh.assert_called_once_with("eskisehir")
+
+
+@patch("pharmacies.tasks.logger")
+@patch("pharmacies.tasks.close_old_connections")
+@patch("pharmacies.tasks.transaction.atomic", return_value=nullcontext())
+@patch("pharmacies.tasks.ScraperConfig.objects.filter")
+@patch("pharmacies.tasks.publish_roster_update")
+@patch("pharmacies.tasks.save_pharmacy_chunk")
+@patch("pharmacies.tasks.City.objects.get")
+@patch("pharmacies.tasks.get_city_data")
+def test_run_scraper_retries_chunk_after_stale_db_connection(
+    mock_get_city_data: MagicMock,
+    mock_get_city: MagicMock,
+    mock_save_chunk: MagicMock,
+    mock_publish: MagicMock,
+    mock_filter: MagicMock,
+    mock_atomic: MagicMock,
+    mock_close_old_connections: MagicMock,
     mock_logger: MagicMock,
 ) -> None:
-    mock_get_city_data.return_value = [{"name": "Example"}]
-    mock_persist.side_effect = [InterfaceError("connection already closed"), 1]
+    mock_get_city_data.return_value = iter([{"name": "Example"}])
+    mock_save_chunk.side_effect = [InterfaceError("connection already closed"), 1]
+    mock_filter.return_value.update.return_value = 1
 
     run_scraper("istanbul")
 
-    assert mock_persist.call_count == 2
+    # The chunk is written again from memory; the city is not scraped again.
+    mock_get_city_data.assert_called_once()
+    assert mock_save_chunk.call_count == 2
+    assert mock_save_chunk.call_args_list[0] == mock_save_chunk.call_args_list[1]
+    mock_publish.assert_called_once_with(mock_get_city.return_value, created=True)
+    mock_filter.assert_called_once_with(city__name="istanbul")
     mock_logger.warning.assert_called_once()
     assert mock_close_old_connections.call_count == 4
 
 
-@patch("pharmacies.tasks.transaction.atomic")
+@patch("pharmacies.tasks.transaction.atomic", return_value=nullcontext())
 @patch("pharmacies.tasks.ScraperConfig.objects.filter")
-@patch("pharmacies.tasks.add_scraped_data_to_db")
-@patch("pharmacies.tasks.logger")
-def test_run_scraper_retries_real_persistence_helper_path(
-    mock_logger: MagicMock,
-    mock_add_scraped_data_to_db: MagicMock,
+@patch("pharmacies.tasks.publish_roster_update")
+@patch("pharmacies.tasks.save_pharmacy_chunk", return_value=0)
+@patch("pharmacies.tasks.City.objects.get")
+@override_settings(SCRAPER_PERSIST_CHUNK_SIZE=2)
+def test_run_scraper_opens_a_transaction_per_chunk(
+    mock_get_city: MagicMock,
+    mock_save_chunk: MagicMock,
+    mock_publish: MagicMock,
     mock_filter: MagicMock,
     mock_atomic: MagicMock,
 ) -> None:
-    mock_atomic.return_value = nullcontext()
+    scraped_data = [{"name": f"Pharmacy {i}"} for i in range(5)]
     mock_filter.return_value.update.return_value = 1
-    scraped_data = [
-        {
-            "name": "Example Pharmacy",
-            "address": "Example Address",
-            "district": "Kadikoy",
-            "phone": "123456",
-            "coordinates": {"lat": 41.0, "lng": 28.9},
-            "duty_start": MagicMock(),
-            "duty_end": MagicMock(),
-        }
-    ]
-    mock_add_scraped_data_to_db.side_effect = [
-        InterfaceError("connection already closed"),
-        None,
-    ]
-
-    with patch("pharmacies.tasks.get_city_data", return_value=scraped_data):
+
+    with patch("pharmacies.tasks.get_city_data", return_value=iter(scraped_data)):
         run_scraper("istanbul")
 
-    assert mock_add_scraped_data_to_db.call_count == 2
-    mock_filter.assert_called_once_with(city__name="istanbul")
+    assert [len(call.args[1]) for call in mock_save_chunk.call_args_list] == [2, 2, 1]
+    # One transaction per chunk, and a last one for the roster version bump.
+    assert mock_atomic.call_count == 4
+    mock_publish.assert_called_once_with(mock_get_city.return_value, created=False)
     mock_filter.return_value.update.assert_called_once()
-    mock_logger.warning.assert_called_once()
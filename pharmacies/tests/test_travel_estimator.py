@@ -0,0 +1,180 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from django.test.utils import override_settings
+
+from pharmacies.management.commands.calibrate_travel_times import (
+    iter_snapshot_samples,
+)
+from pharmacies.utils.travel_estimator import (
+    TravelSample,
+    estimate_travel,
+    fit_calibrations,
+    get_time_bucket,
+    haversine_distance,
+)
+from pharmacies.utils.utils import add_travel_distances_to_pharmacy_data
+
+FIXTURES = Path(__file__).resolve().parents[2] / "tests" / "fixtures"
+
+
+def test_haversine_distance() -> None:
+    # One degree of latitude is ~111.2 km.
+    assert haversine_distance(39.0, 30.0, 40.0, 30.0) == pytest.approx(
+        111_195, rel=1e-3
+    )
+    assert haversine_distance(39.7, 30.5, 39.7, 30.5) == 0
+
+
+@pytest.mark.parametrize(
+    ("hour", "bucket"),
+    [
+        (0, "night"),
+        (6, "night"),
+        (7, "morning_peak"),
+        (12, "daytime"),
+        (18, "evening_peak"),
+        (23, "evening"),
+    ],
+)
+def test_get_time_bucket(hour: int, bucket: str) -> None:
+    assert get_time_bucket(datetime(2025, 1, 1, hour)) == bucket
+
+
+def test_fit_calibrations() -> None:
+    samples = [
+        TravelSample("ankara", "daytime", 1000, 1300, 130),
+        TravelSample("ankara", "daytime", 1000, 1500, 150),
+        TravelSample("ankara", "night", 2000, 2400, 120),
+        # Too close to be meaningful.
+        TravelSample("ankara", "night", 10, 400, 60),
+    ]
+
+    calibrations = fit_calibrations(samples)
+
+    assert calibrations[("ankara", "daytime")].detour_factor == 1.4
+    assert calibrations[("ankara", "daytime")].speed == 10.0
+    assert calibrations[("ankara", "night")].speed == 20.0
+    assert calibrations[("ankara", "")].sample_count == 3
+
+
+@override_settings(
+    TRAVEL_ESTIMATOR_DEFAULT_DETOUR_FACTOR=1.5, TRAVEL_ESTIMATOR_DEFAULT_SPEED=10.0
+)
+def test_estimate_travel_uses_defaults_without_city() -> None:
+    straight = haversine_distance(39.7, 30.5, 39.71, 30.5)
+
+    distance, duration = estimate_travel(39.7, 30.5, 39.71, 30.5)
+
+    assert distance == round(straight * 1.5)
+    assert duration == round(straight * 1.5 / 10.0)
+
+
+def test_iter_snapshot_samples_skips_snapshots_without_destinations() -> None:
+    # These fixtures predate the recorder storing its destinations.
+    with open(FIXTURES / "google_api_snapshots.json", encoding="utf-8") as f:
+        snapshots = json.load(f)
+    with open(FIXTURES / "fabricated_pharmacies.json", encoding="utf-8") as f:
+        pharmacies = json.load(f)
+
+    assert list(iter_snapshot_samples(snapshots, pharmacies)) == []
+
+
+def _matrix(*distances: int) -> dict[str, Any]:
+    return {
+        "status": "OK",
+        "rows": [
+            {
+                "elements": [
+                    {
+                        "status": "OK",
+                        "distance": {"value": d},
+                        "duration": {"value": d // 10},
+                    }
+                    for d in distances
+                ]
+            }
+        ],
+    }
+
+
+def test_iter_snapshot_samples_pairs_elements_with_recorded_destinations() -> None:
+    geocode = {
+        "status": "OK",
+        "plus_code": {"compound_code": "Q4G6+2M Eskişehir, Türkiye"},
+        "results": [{"address_components": []}],
+    }
+    pharmacies = [
+        {"city": "eskisehir", "coordinates": {"lat": 39.71, "lng": 30.5}},
+        {"city": "eskisehir", "coordinates": {"lat": 39.8, "lng": 30.5}},
+    ]
+    snapshots = {
+        "geocode:39.7,30.5": geocode,
+        # Recorded farthest first, e.g. against another duty roster.
+        "distancematrix:39.7,30.5": _matrix(14000, 1500),
+        "destinations:39.7,30.5": [
+            {"name": "Far", "lat": 39.8, "lng": 30.5},
+            {"name": "Near", "lat": 39.71, "lng": 30.5},
+        ],
+        # Destinations were not stored, so the elements cannot be paired.
+        "geocode:39.6,30.5": geocode,
+        "distancematrix:39.6,30.5": _matrix(1500, 14000),
+        # Recorded against more destinations than the matrix has elements.
+        "geocode:39.5,30.5": geocode,
+        "distancematrix:39.5,30.5": _matrix(1500),
+        "destinations:39.5,30.5": [
+            {"name": "Far", "lat": 39.8, "lng": 30.5},
+            {"name": "Near", "lat": 39.71, "lng": 30.5},
+        ],
+    }
+
+    samples = list(iter_snapshot_samples(snapshots, pharmacies))
+
+    assert [s.road_distance for s in samples] == [14000, 1500]
+    assert samples[0].straight_distance == pytest.approx(
+        haversine_distance(39.7, 30.5, 39.8, 30.5)
+    )
+    assert samples[1].straight_distance == pytest.approx(
+        haversine_distance(39.7, 30.5, 39.71, 30.5)
+    )
+    for calibration in fit_calibrations(samples).values():
+        assert calibration.detour_factor >= 1.0
+
+
+@override_settings(TRAVEL_TIME_MODE="local")
+@patch("pharmacies.utils.utils._get_distance_matrix_data")
+def test_add_travel_distances_local_mode(mock_get_dm: MagicMock) -> None:
+    pharmacy_data: list[dict[str, Any]] = [
+        {"position": {"lat": 39.71, "lng": 30.5}, "distance": 1100}
+    ]
+
+    add_travel_distances_to_pharmacy_data(39.7, 30.5, pharmacy_data)
+
+    mock_get_dm.assert_not_called()
+    assert pharmacy_data[0]["travel_distance"] > 1100
+    assert pharmacy_data[0]["travel_duration"] > 0
+
+
+@patch(
+    "pharmacies.utils.utils._get_distance_matrix_data",
+    side_effect=requests.Timeout("timed out"),
+)
+def test_add_travel_distances_falls_back_when_google_fails(
+    mock_get_dm: MagicMock,
+) -> None:
+    pharmacy_data: list[dict[str, Any]] = [
+        {"position": {"lat": 39.71, "lng": 30.5}, "distance": 1100}
+    ]
+
+    add_travel_distances_to_pharmacy_data(39.7, 30.5, pharmacy_data)
+
+    mock_get_dm.assert_called_once()
+    assert (
+        pharmacy_data[0]["travel_distance"],
+        pharmacy_data[0]["travel_duration"],
+    ) == estimate_travel(39.7, 30.5, 39.71, 30.5)
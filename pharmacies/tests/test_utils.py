@@ -7,12 +7,12 @@ from django.contrib.gis.geos import Point
 
 from pharmacies.models import City, Pharmacy, WorkingSchedule
 from pharmacies.utils.utils import (
-    _parse_location_identifier,
     get_city_name_from_location,
     get_coordinates_from_google_maps_url,
     get_map_points_from_fetched_data,
     get_map_points_from_pharmacies,
     order_data_by_distance,
+    parse_location_identifier,
     round_lat_lng,
 )
 
@@ -55,6 +55,7 @@ def test_get_map_points_from_fetched_data_without_vicinity() -> None:
 def test_get_map_points_from_pharmacies() -> None:
     class MockPharmacy:
         def __init__(self) -> None:
+            self.pk = 7
             self.location = Point(30.5, 39.7)
             self.name = "Test Pharmacy"
             self.address = "Test Address"
@@ -64,6 +65,7 @@ def test_get_map_points_from_pharmacies() -> None:
     points = get_map_points_from_pharmacies([MockPharmacy()])
     assert len(points) == 1
     assert points[0]["distance"] == 500
+    assert points[0]["pharmacy_id"] == 7
     assert points[0]["position"] == {"lat": 39.7, "lng": 30.5}
 
 
@@ -79,6 +81,13 @@ def test_order_data_by_distance() -> None:
     assert data[2]["travel_distance"] == 1500
 
 
+def test_quantize_origin() -> None:
+    from pharmacies.utils.travel_times import quantize_origin
+
+    assert quantize_origin(39.76668, 30.52561) == "39.767,30.526"
+    assert quantize_origin(39.7667, 30.5) == "39.767,30.500"
+
+
 def test_round_lat_lng() -> None:
     assert round_lat_lng(39.1234567, 30.1234567, 4) == (39.1235, 30.1235)
 
@@ -89,7 +98,7 @@ def test_extract_city_name_from_google_maps_response_compound_code() -> None:
         "plus_code": {"compound_code": "XF+VX Eskişehir, Turkey"},
         "results": [{}],  # Dummy result
     }
-    assert _parse_location_identifier(data) == "XF+VX Eskişehir, Turkey"
+    assert parse_location_identifier(data) == "XF+VX Eskişehir, Turkey"
 
 
 def test_extract_city_name_from_google_maps_response_address_components() -> None:
@@ -104,7 +113,7 @@ def test_extract_city_name_from_google_maps_response_address_components() -> Non
             }
         ],
     }
-    assert _parse_location_identifier(data) == "Eskişehir"
+    assert parse_location_identifier(data) == "Eskişehir"
 
 
 def test_extract_city_name_from_google_maps_response_error() -> None:
@@ -112,10 +121,10 @@ def test_extract_city_name_from_google_maps_response_error() -> None:
     with pytest.raises(
         ValueError, match="Unable to parse_location_identifier: status is not OK"
     ):
-        _parse_location_identifier(data)
+        parse_location_identifier(data)
 
 
-@patch("pharmacies.utils.utils.requests.get")
+@patch("pharmacies.utils.utils.http_client.get")
 def test_get_distance_matrix_data(mock_get: MagicMock) -> None:
     from pharmacies.utils.utils import _get_distance_matrix_data
 
@@ -164,10 +173,9 @@ def test_add_travel_distances_to_pharmacy_data_empty() -> None:
 
 @pytest.mark.django_db
 class TestUtilsDB:
-    @patch("pharmacies.utils.utils.requests.get")
+    @patch("pharmacies.utils.utils.http_client.get")
     def test_get_city_name_from_location_istanbul(self, mock_get: MagicMock) -> None:
         City.objects.create(name="istanbul")
-        get_city_name_from_location.cache_clear()
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "status": "OK",
@@ -178,9 +186,8 @@ class TestUtilsDB:
 
         assert get_city_name_from_location(41.0, 28.0) == "istanbul"
 
-    @patch("pharmacies.utils.utils.requests.get")
+    @patch("pharmacies.utils.utils.http_client.get")
     def test_get_city_name_from_location_unknown(self, mock_get: MagicMock) -> None:
-        get_city_name_from_location.cache_clear()
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "status": "OK",
@@ -192,6 +199,31 @@ class TestUtilsDB:
         with pytest.raises(ValueError, match="Unknown city"):
             get_city_name_from_location(0, 0)
 
+    @patch("pharmacies.utils.utils.http_client.get")
+    def test_get_city_name_from_location_uses_shared_cache(
+        self, mock_get: MagicMock
+    ) -> None:
+        from pharmacies.cache import get_cache
+
+        City.objects.create(name="istanbul")
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "status": "OK",
+            "plus_code": {"compound_code": "İstanbul, Turkey"},
+            "results": [{}],  # Dummy result
+        }
+        mock_get.return_value = mock_response
+
+        assert get_city_name_from_location(41.0, 28.0) == "istanbul"
+        # Simulate another worker: empty L1, warm shared L2.
+        get_cache("geocode").clear_local()
+        assert get_city_name_from_location(41.0, 28.0) == "istanbul"
+        assert get_city_name_from_location(41.0, 28.0) == "istanbul"
+
+        mock_get.assert_called_once()
+        stats = get_cache("geocode").stats
+        assert (stats.misses, stats.l2_hits, stats.l1_hits) == (1, 1, 1)
+
     def test_add_scraped_data_to_db(self) -> None:
         from pharmacies.utils.utils import add_scraped_data_to_db
 
@@ -271,7 +303,9 @@ class TestUtilsDB:
             "pharmacies.utils.utils.add_travel_distances_to_pharmacy_data"
         ) as mock_add_travel:
             # We need to manually add travel_distance because the mock won't do it
-            def side_effect(lat: float, lng: float, pharmacy_data: list[Any]) -> None:
+            def side_effect(
+                lat: float, lng: float, pharmacy_data: list[Any], **kwargs: Any
+            ) -> None:
                 for p in pharmacy_data:
                     p["travel_distance"] = 100
 
@@ -299,7 +333,9 @@ class TestUtilsDB:
             "pharmacies.utils.utils.add_travel_distances_to_pharmacy_data"
         ) as mock_add_travel:
 
-            def side_effect(lat: float, lng: float, pharmacy_data: list[Any]) -> None:
+            def side_effect(
+                lat: float, lng: float, pharmacy_data: list[Any], **kwargs: Any
+            ) -> None:
                 for p in pharmacy_data:
                     p["travel_distance"] = 100
 
@@ -312,3 +348,63 @@ class TestUtilsDB:
             assert results[0]["address"] == ""
             assert results[0]["description"] == ""
             assert results[0]["travel_distance"] == 100
+
+    @patch("pharmacies.utils.utils._get_distance_matrix_data")
+    def test_add_travel_distances_reuses_cached_origin_cell(
+        self, mock_get_dm: MagicMock
+    ) -> None:
+        from pharmacies.models import TravelTime
+        from pharmacies.utils.utils import add_travel_distances_to_pharmacy_data
+
+        city = City.objects.create(name="eskisehir")
+        cached, missing = (
+            Pharmacy.objects.create(
+                name=name, city=city, district="D1", location=Point(30.5, 39.7)
+            )
+            for name in ("Cached Eczane", "Missing Eczane")
+        )
+        TravelTime.objects.create(
+            origin_cell="39.700,30.500", pharmacy=cached, distance=800, duration=120
+        )
+        mock_get_dm.return_value = {
+            "status": "OK",
+            "rows": [
+                {
+                    "elements": [
+                        {
+                            "status": "OK",
+                            "distance": {"value": 1200},
+                            "duration": {"value": 300},
+                        }
+                    ]
+                }
+            ],
+        }
+
+        pharmacy_data = [
+            {
+                "pharmacy_id": pharmacy.pk,
+                "position": {"lat": 39.71, "lng": 30.51},
+                "distance": 1000,
+            }
+            for pharmacy in (cached, missing)
+        ]
+        # A user ~20 m away from the cached origin shares its cell.
+        add_travel_distances_to_pharmacy_data(39.7001, 30.5001, pharmacy_data)
+
+        mock_get_dm.assert_called_once_with(
+            origins="39.7001,30.5001", destinations="39.71,30.51"
+        )
+        assert (
+            pharmacy_data[0]["travel_distance"],
+            pharmacy_data[0]["travel_duration"],
+        ) == (800, 120)
+        assert (
+            pharmacy_data[1]["travel_distance"],
+            pharmacy_data[1]["travel_duration"],
+        ) == (1200, 300)
+        assert TravelTime.objects.get(pharmacy=missing).distance == 1200
+
+        mock_get_dm.reset_mock()
+        add_travel_distances_to_pharmacy_data(39.7001, 30.5001, pharmacy_data)
+        mock_get_dm.assert_not_called()
@@ -1,6 +1,7 @@
+import gzip
 import json
 from collections.abc import Iterator
-from datetime import UTC, datetime, time
+from datetime import UTC, datetime, time, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -10,7 +11,18 @@ from django.test import Client
 from django.test.utils import override_settings
 from django.urls import reverse
 
-from pharmacies.models import City, PharmacyStatus, WorkingSchedule
+from pharmacies.models import City, PharmacyStatus, ScraperConfig, WorkingSchedule
+from pharmacies.utils.duty_geojson import DutyGeoJSON
+from pharmacies.views import _next_scrape
+
+
+def build_geojson_fixture() -> DutyGeoJSON:
+    return DutyGeoJSON(
+        city_name="eskisehir",
+        version=1,
+        etag='"abc"',
+        gzipped=gzip.compress(b'{"type":"FeatureCollection"}'),
+    )
 
 
 @pytest.fixture(autouse=True)
@@ -45,6 +57,239 @@ class TestGetPharmacyPointsNoDb:
         assert response.status_code == 400
         assert response.json()["error"] == "Missing required fields: lng."
 
+    @patch("pharmacies.views.get_nearest_pharmacies_on_duty")
+    @patch("pharmacies.views.get_city")
+    @patch("pharmacies.views.get_city_name_from_location", return_value="eskisehir")
+    def test_get_pharmacy_points_serves_cached_response_until_roster_changes(
+        self,
+        mock_get_city: MagicMock,
+        mock_get_city_record: MagicMock,
+        mock_fetch_duty: MagicMock,
+        client: Client,
+    ) -> None:
+        city = MagicMock(roster_version=1)
+        city.get_city_status.return_value = PharmacyStatus.CLOSED
+        mock_get_city_record.return_value = city
+        mock_fetch_duty.return_value = [{"title": "Duty Pharmacy"}]
+        url = reverse("pharmacies:get_pharmacy_points")
+
+        def post(lat: float, lng: float) -> list[dict[str, str]]:
+            response = client.post(
+                url,
+                data=json.dumps({"lat": lat, "lng": lng}),
+                content_type="application/json",
+            )
+            assert response.status_code == 200
+            points: list[dict[str, str]] = response.json()["points"]
+            return points
+
+        assert post(39.7, 30.5) == [{"title": "Duty Pharmacy"}]
+        # Same coordinate cell: served from the cache.
+        assert post(39.7002, 30.5001) == [{"title": "Duty Pharmacy"}]
+        assert mock_fetch_duty.call_count == 1
+
+        # A new scrape bumps the roster version and misses the cache.
+        city.roster_version = 2
+        mock_fetch_duty.return_value = [{"title": "New Duty Pharmacy"}]
+        assert post(39.7, 30.5) == [{"title": "New Duty Pharmacy"}]
+        assert mock_fetch_duty.call_count == 2
+
+    @pytest.mark.parametrize(
+        "payload",
+        [{"locations": []}, {"locations": "39.7,30.5"}, [{"lat": 39.7, "lng": 30.5}]],
+    )
+    def test_batch_rejects_payloads_without_locations(
+        self, client: Client, payload: object
+    ) -> None:
+        response = client.post(
+            reverse("pharmacies:get_pharmacy_points_batch"),
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
+        assert response.json()["error"] == "Expected a list of locations."
+
+    @override_settings(PHARMACY_POINTS_BATCH_MAX_LOCATIONS=1)
+    def test_batch_rejects_too_many_locations(self, client: Client) -> None:
+        response = client.post(
+            reverse("pharmacies:get_pharmacy_points_batch"),
+            data=json.dumps({"locations": [{"lat": 39.7, "lng": 30.5}] * 2}),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
+        assert response.json()["error"] == "At most 1 locations per request."
+
+    @patch("pharmacies.views.get_batch_pharmacy_points")
+    def test_batch_returns_results_in_request_order(
+        self, mock_batch: MagicMock, client: Client
+    ) -> None:
+        mock_batch.return_value = [
+            b'{"points": [{"title": "Duty Pharmacy"}]}',
+            ValueError("Unknown city: 0.0,0.0"),
+        ]
+
+        response = client.post(
+            reverse("pharmacies:get_pharmacy_points_batch"),
+            data=json.dumps(
+                {
+                    "locations": [
+                        {"lat": 39.70001, "lng": 30.5},
+                        {"lat": 95, "lng": 30.5},
+                        {"lat": 0, "lng": 0},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"points": [{"title": "Duty Pharmacy"}]},
+            {"error": "Invalid coordinates."},
+            {"error": "No city found for the provided location."},
+        ]
+        locations = mock_batch.call_args.args[0]
+        assert locations == [(39.7, 30.5), (0, 0)]
+
+    @patch("pharmacies.views._next_scrape", return_value=None)
+    @patch("pharmacies.views._get_points")
+    def test_get_form_is_cacheable_until_the_next_status_change(
+        self, mock_points: MagicMock, mock_scrape: MagicMock, client: Client
+    ) -> None:
+        city = MagicMock()
+        city.working_schedule.next_status_change.side_effect = lambda t: (
+            t + timedelta(seconds=600)
+        )
+        mock_points.return_value = (b'{"points": []}', city)
+        url = reverse("pharmacies:pharmacy_points")
+
+        response = client.get(url, {"lat": "39.70049", "lng": "30.5"})
+
+        assert response.status_code == 200
+        assert response.json() == {"points": []}
+        assert mock_points.call_args.args[:2] == (39.7, 30.5)
+        assert "public" in response["Cache-Control"]
+        assert "max-age=600" in response["Cache-Control"]
+        assert response.has_header("Expires")
+        assert "Accept-Encoding" in response["Vary"]
+
+        response = client.get(
+            url, {"lat": "39.7", "lng": "30.5"}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        assert response.status_code == 304
+
+    @patch("pharmacies.views._next_scrape")
+    @patch("pharmacies.views._get_points")
+    def test_get_form_expires_at_the_next_interval_scrape(
+        self, mock_points: MagicMock, mock_scrape: MagicMock, client: Client
+    ) -> None:
+        city = MagicMock()
+        city.working_schedule.next_status_change.side_effect = lambda t: (
+            t + timedelta(seconds=600)
+        )
+        mock_points.return_value = (b'{"points": []}', city)
+        mock_scrape.side_effect = lambda city, t: t + timedelta(seconds=120)
+
+        response = client.get(
+            reverse("pharmacies:pharmacy_points"), {"lat": 39.7, "lng": 30.5}
+        )
+
+        assert "max-age=120" in response["Cache-Control"]
+
+    @override_settings(PHARMACY_POINTS_GET_MAX_AGE=60)
+    @patch("pharmacies.views._next_scrape", return_value=None)
+    @patch("pharmacies.views._get_points")
+    def test_get_form_max_age_is_capped(
+        self, mock_points: MagicMock, mock_scrape: MagicMock, client: Client
+    ) -> None:
+        city = MagicMock()
+        city.working_schedule.next_status_change.side_effect = lambda t: (
+            t + timedelta(hours=12)
+        )
+        mock_points.return_value = (b'{"points": []}', city)
+
+        response = client.get(
+            reverse("pharmacies:pharmacy_points"), {"lat": 39.7, "lng": 30.5}
+        )
+
+        assert "max-age=60" in response["Cache-Control"]
+
+    def test_next_scrape_is_read_from_the_loaded_scraper_config(self) -> None:
+        query_time = datetime(2025, 12, 16, 10, 0, tzinfo=UTC)
+        city = City(name="eskisehir")
+        assert _next_scrape(city, query_time) is None
+
+        city.scraperconfig = ScraperConfig(
+            interval=6, last_run=query_time - timedelta(hours=1)
+        )
+        assert _next_scrape(city, query_time) == query_time + timedelta(hours=5)
+
+    @patch(
+        "pharmacies.views._get_points",
+        side_effect=ValueError("No pharmacies are on duty at this time."),
+    )
+    def test_get_form_errors_are_not_cached(
+        self, mock_points: MagicMock, client: Client
+    ) -> None:
+        response = client.get(
+            reverse("pharmacies:pharmacy_points"), {"lat": 39.7, "lng": 30.5}
+        )
+
+        assert response.status_code == 400
+        assert "no-store" in response["Cache-Control"]
+
+    def test_get_form_rejects_invalid_coordinates(self, client: Client) -> None:
+        url = reverse("pharmacies:pharmacy_points")
+
+        assert client.get(url, {"lat": 39.7}).status_code == 400
+        assert client.get(url, {"lat": "x", "lng": 30.5}).status_code == 400
+        assert client.post(url, {"lat": 39.7, "lng": 30.5}).status_code == 405
+
+    @patch("pharmacies.views.get_duty_geojson")
+    def test_duty_geojson_is_served_gzipped_with_etag(
+        self, mock_geojson: MagicMock, client: Client
+    ) -> None:
+        mock_geojson.return_value = build_geojson_fixture()
+        url = reverse("pharmacies:duty_pharmacies_geojson", args=["eskisehir"])
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        assert response.status_code == 200
+        assert response["Content-Encoding"] == "gzip"
+        assert response["ETag"] == '"abc-gzip"'
+        assert "Accept-Encoding" in response["Vary"]
+        assert gzip.decompress(response.content) == b'{"type":"FeatureCollection"}'
+
+        response = client.get(
+            url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH='"abc-gzip"'
+        )
+        assert response.status_code == 304
+
+    @patch("pharmacies.views.get_duty_geojson")
+    def test_duty_geojson_without_gzip(
+        self, mock_geojson: MagicMock, client: Client
+    ) -> None:
+        mock_geojson.return_value = build_geojson_fixture()
+
+        response = client.get(
+            reverse("pharmacies:duty_pharmacies_geojson", args=["eskisehir"])
+        )
+
+        assert response.status_code == 200
+        assert not response.has_header("Content-Encoding")
+        assert response["ETag"] == '"abc"'
+        assert response.json() == {"type": "FeatureCollection"}
+
+    @patch("pharmacies.views.get_duty_geojson", side_effect=City.DoesNotExist)
+    def test_duty_geojson_unknown_city(
+        self, mock_geojson: MagicMock, client: Client
+    ) -> None:
+        response = client.get(
+            reverse("pharmacies:duty_pharmacies_geojson", args=["atlantis"])
+        )
+        assert response.status_code == 404
+
 
 @pytest.mark.django_db
 class TestGetPharmacyPoints:
@@ -179,7 +424,7 @@ class TestGetPharmacyPoints:
         assert response.status_code == 400
         assert response.json()["error"] == "No pharmacies are on duty at this time."
 
-    @patch("pharmacies.views.City.objects.get")
+    @patch("pharmacies.views.get_city")
     @patch("pharmacies.views.get_city_name_from_location")
     def test_get_pharmacy_points_city_status_failure_returns_400(
         self,
@@ -275,7 +520,7 @@ class TestOtherViews:
         response = client.get(url, HTTP_REFERER="http://malicious.com")
         assert response.status_code == 403
 
-    @patch("pharmacies.views.requests.get")
+    @patch("pharmacies.views.http_client.get")
     def test_google_maps_proxy_success(
         self, mock_get: MagicMock, client: Client
     ) -> None:
@@ -306,7 +551,7 @@ class TestProxyAwareCsrf:
         ALLOWED_HOSTS=["eczanerede.com"],
         SECURE_PROXY_SSL_HEADER=("HTTP_X_FORWARDED_PROTO", "https"),
     )
-    @patch("pharmacies.views.City.objects.get")
+    @patch("pharmacies.views.get_city")
     @patch("pharmacies.views.get_city_name_from_location")
     @patch("pharmacies.views.get_nearest_pharmacies_open")
     def test_get_pharmacy_points_accepts_same_origin_https_behind_proxy(
@@ -348,7 +593,7 @@ class TestProxyAwareCsrf:
         assert response.status_code == 200
         assert response.json()["points"][0]["title"] == "Open Pharmacy"
 
-    @patch("pharmacies.views.requests.get")
+    @patch("pharmacies.views.http_client.get")
     def test_google_maps_proxy_failure(
         self, mock_get: MagicMock, client: Client
     ) -> None:
@@ -2,16 +2,40 @@
 URL Configuration for the pharmacies application.
 
 Routes:
-- get_pharmacy_points: API endpoint to fetch pharmacy data.
+- get_pharmacy_points: API endpoint to fetch pharmacy data (async view when
+  PHARMACY_POINTS_ASYNC is enabled).
+- pharmacy_points: Cacheable GET form of get_pharmacy_points.
+- get_pharmacy_points_batch: API endpoint to fetch pharmacy data for many
+  locations at once.
+- duty_pharmacies_geojson: GeoJSON of a city's duty roster, revalidated with
+  an ETag.
 - google_maps_proxy: Proxy endpoint for Google Maps API.
 """
 
+from django.conf import settings
 from django.urls import path
 
 from pharmacies import views
 
 app_name = "pharmacies"
 urlpatterns = [
-    path("get_pharmacy_points", views.get_pharmacy_points, name="get_pharmacy_points"),
+    path(
+        "get_pharmacy_points",
+        views.aget_pharmacy_points
+        if settings.PHARMACY_POINTS_ASYNC
+        else views.get_pharmacy_points,
+        name="get_pharmacy_points",
+    ),
+    path("pharmacy_points", views.pharmacy_points, name="pharmacy_points"),
+    path(
+        "get_pharmacy_points_batch",
+        views.get_pharmacy_points_batch,
+        name="get_pharmacy_points_batch",
+    ),
+    path(
+        "duty_pharmacies/<str:city_name>.geojson",
+        views.duty_pharmacies_geojson,
+        name="duty_pharmacies_geojson",
+    ),
     path("google_maps_proxy", views.google_maps_proxy, name="google_maps_proxy"),
 ]
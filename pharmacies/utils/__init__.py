@@ -1,6 +1,6 @@
-from pharmacies.utils.ankaraeo_scraper import get_ankara_data
-from pharmacies.utils.eskisehireo_scraper import get_eskisehir_data
-from pharmacies.utils.istanbul_saglik_scraper import get_istanbul_data
+from importlib import import_module
+from typing import Any
+
 from pharmacies.utils.pharmacy_fetch import fetch_nearest_pharmacies
 from pharmacies.utils.utils import (
     ScrapedDataStatus,
@@ -11,7 +11,9 @@ from pharmacies.utils.utils import (
     get_nearest_pharmacies_on_duty,
     get_nearest_pharmacies_open,
     normalize_string,
+    publish_roster_update,
     round_lat_lng,
+    save_pharmacy_chunk,
 )
 
 __all__ = [
@@ -28,4 +30,21 @@ __all__ = [
     "get_nearest_pharmacies_open",
     "round_lat_lng",
     "normalize_string",
+    "publish_roster_update",
+    "save_pharmacy_chunk",
 ]
+
+# The scrapers pull in the HTML parsers; import them only when first used.
+_LAZY_SCRAPERS = {
+    "get_ankara_data": "pharmacies.utils.ankaraeo_scraper",
+    "get_eskisehir_data": "pharmacies.utils.eskisehireo_scraper",
+    "get_istanbul_data": "pharmacies.utils.istanbul_saglik_scraper",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_SCRAPERS:
+        value = getattr(import_module(_LAZY_SCRAPERS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
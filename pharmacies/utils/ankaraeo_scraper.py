@@ -4,12 +4,16 @@ Scraper for Ankara Eczacılar Odası (AEO).
 Fetches duty pharmacy data from the official Ankara Chamber of Pharmacists API.
 """
 
+from collections.abc import Iterator
 from datetime import datetime, timedelta
 from typing import Any
 
-import requests
 from django.utils import timezone
 
+from pharmacies import http_client
+from pharmacies.utils.conditional_fetch import ConditionalFetcher, fetch_source
+from pharmacies.utils.scraper_registry import get_scraper
+
 
 def _get_duty_times() -> tuple[datetime, datetime]:
     """
@@ -42,38 +46,45 @@ def _get_duty_times() -> tuple[datetime, datetime]:
     return duty_start, duty_end
 
 
-def get_ankara_data() -> list[dict[str, Any]]:
+def get_ankara_data(
+    fetcher: ConditionalFetcher | None = None,
+) -> Iterator[dict[str, Any]]:
     """
     Scrape pharmacy data from the Ankara Eczacılar Odası website.
-    Returns a list of dictionaries with name, address, district, phone, coordinates.
+    Yields dictionaries with name, address, district, phone, coordinates.
+    Yields nothing when ``fetcher`` finds the day's list unchanged within
+    the current duty window.
     """
     base_url = "https://mvc.aeo.org.tr/home/NobetciEczaneGetirTarih?nobetTarihi="
     today = timezone.localtime()
     url = base_url + today.strftime("%Y-%m-%d")
-    response = requests.get(url, timeout=10)
+    duty_start, duty_end = _get_duty_times()
+    endpoint = get_scraper("ankara").endpoint
+    response = fetch_source(
+        fetcher,
+        base_url,
+        lambda headers: http_client.get(url, endpoint=endpoint, headers=headers),
+        scope=f"{today:%Y-%m-%d}/{duty_start.isoformat()}",
+    )
+    if response is None:
+        return
     response.raise_for_status()
 
     received_data = response.json()
     received_pharmacy_list = received_data.get("NobetciEczaneBilgisiListesi") or []
-    duty_start, duty_end = _get_duty_times()
-    pharmacies: list[dict[str, Any]] = []
     for pharmacy in received_pharmacy_list:
-        pharmacies.append(
-            {
-                "name": pharmacy["EczaneAdi"].title() + " Eczanesi",
-                "address": pharmacy["EczaneAdresi"],
-                "district": pharmacy["IlceAdi"],
-                "phone": pharmacy["Telefon"],
-                "coordinates": {
-                    "lat": float(pharmacy["KoordinatLat"]),
-                    "lng": float(pharmacy["KoordinatLng"]),
-                },
-                "duty_start": duty_start,
-                "duty_end": duty_end,
-            }
-        )
-
-    return pharmacies
+        yield {
+            "name": pharmacy["EczaneAdi"].title() + " Eczanesi",
+            "address": pharmacy["EczaneAdresi"],
+            "district": pharmacy["IlceAdi"],
+            "phone": pharmacy["Telefon"],
+            "coordinates": {
+                "lat": float(pharmacy["KoordinatLat"]),
+                "lng": float(pharmacy["KoordinatLng"]),
+            },
+            "duty_start": duty_start,
+            "duty_end": duty_end,
+        }
 
 
 if __name__ == "__main__":
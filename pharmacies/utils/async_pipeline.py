@@ -0,0 +1,231 @@
+"""
+Async pharmacy lookup pipeline for ASGI deployments.
+
+Mirrors the synchronous helpers in ``pharmacies.utils.utils``. Google is
+called with native coroutines on the event loop's pooled ``httpx`` client, so
+a request waiting on Google holds no thread. Only database and cache access
+goes through ``sync_to_async``.
+
+Google results use the same cache namespaces and keys as the sync helpers,
+and concurrent misses are coalesced with ``asingle_flight``, which shares its
+cross-worker lock with the sync ``single_flight``.
+"""
+
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any, Final, cast
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from pharmacies import http_client
+from pharmacies.cache import get_cache
+from pharmacies.models import PharmacyStatus
+from pharmacies.singleflight import asingle_flight
+from pharmacies.utils.city_registry import get_city
+from pharmacies.utils.city_resolver import (
+    is_in_service_area,
+    resolve_city_from_boundaries,
+)
+from pharmacies.utils.hot_cells import record_request
+from pharmacies.utils.pharmacy_fetch import PLACES_NEARBY_SEARCH_URL, get_places_params
+from pharmacies.utils.response_cache import (
+    cache_points,
+    get_cached_points,
+    get_points_cache_key,
+)
+from pharmacies.utils.utils import (
+    _check_distance_matrix_response,
+    _check_geocode_response,
+    add_estimated_travel_distances,
+    apply_distance_matrix_data,
+    fill_cached_travel_distances,
+    find_pharmacies_on_duty,
+    format_distance_matrix_query,
+    get_map_points_from_fetched_data,
+    match_city_name,
+    order_data_by_distance,
+)
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+_MISSING: Final = object()
+
+
+async def _get_json(url: str, endpoint: str, params: dict[str, str]) -> Any:
+    response = await http_client.aget(url, endpoint=endpoint, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _cached[T](namespace: str, key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+    """
+    Return the cached value of ``key`` in ``namespace``, awaiting ``fetch`` on
+    a miss.
+
+    Uses the same keys as the sync ``get_or_set`` callers. Stale values are
+    served as-is; their background refresh is left to the sync path.
+    """
+    cache = get_cache(namespace)
+    value = await sync_to_async(cache.get, thread_sensitive=False)(key, _MISSING)
+    if value is not _MISSING:
+        return cast(T, value)
+
+    value = await asingle_flight(f"{namespace}:{key}", fetch)
+    await sync_to_async(cache.set, thread_sensitive=False)(key, value)
+    return value
+
+
+async def aget_city_name_from_location(lat: float, lng: float) -> str:
+    """Async counterpart of ``get_city_name_from_location``."""
+    city_name = await sync_to_async(resolve_city_from_boundaries)(lat, lng)
+    if city_name is not None:
+        return city_name
+
+    if not settings.CITY_RESOLVER_GOOGLE_FALLBACK:
+        raise ValueError(f"Unknown city: {lat},{lng}")
+
+    key = f"{lat},{lng}"
+
+    async def geocode() -> str:
+        return _check_geocode_response(
+            await _get_json(
+                GEOCODE_URL,
+                "google_geocode",
+                {"latlng": key, "key": settings.GOOGLE_MAPS_API_KEY},
+            )
+        )
+
+    city_data = await _cached("geocode", key, geocode)
+    return await sync_to_async(match_city_name)(city_data)
+
+
+async def afetch_nearest_pharmacies(
+    lat: float, lng: float, keyword: str = "pharmacy", limit: int = 5
+) -> list[dict[str, Any]]:
+    """Async counterpart of ``fetch_nearest_pharmacies``."""
+
+    async def search() -> list[dict[str, Any]]:
+        data = await _get_json(
+            PLACES_NEARBY_SEARCH_URL,
+            "google_places",
+            get_places_params(lat, lng, keyword),
+        )
+        return cast(list[dict[str, Any]], data.get("results", []))
+
+    results = await _cached("places", f"{lat},{lng}:{keyword}", search)
+    return results[:limit]
+
+
+async def aadd_travel_distances_to_pharmacy_data(
+    lat: float,
+    lng: float,
+    pharmacy_data: list[dict[str, Any]],
+    city: str | None = None,
+    when: datetime | None = None,
+) -> None:
+    """Async counterpart of ``add_travel_distances_to_pharmacy_data``."""
+    if not pharmacy_data:
+        raise ValueError("Cannot retrieve travel distances. Pharmacy data is empty!")
+
+    if settings.TRAVEL_TIME_MODE == "local":
+        await sync_to_async(add_estimated_travel_distances)(
+            lat, lng, pharmacy_data, city, when
+        )
+        return
+
+    origin_cell, missing_data = await sync_to_async(fill_cached_travel_distances)(
+        lat, lng, pharmacy_data
+    )
+    if not missing_data:
+        return
+
+    origins, destinations = format_distance_matrix_query(lat, lng, missing_data)
+
+    async def distance_matrix() -> dict[str, Any]:
+        return _check_distance_matrix_response(
+            await _get_json(
+                DISTANCE_MATRIX_URL,
+                "google_distance_matrix",
+                {
+                    "origins": origins,
+                    "destinations": destinations,
+                    "key": settings.GOOGLE_MAPS_API_KEY,
+                },
+            )
+        )
+
+    try:
+        received_data = await _cached(
+            "distance_matrix", f"{origins}:{destinations}", distance_matrix
+        )
+    except (httpx.HTTPError, ValueError):
+        logger.warning(
+            "Distance Matrix lookup failed; using local travel estimates.",
+            exc_info=True,
+        )
+        await sync_to_async(add_estimated_travel_distances)(
+            lat, lng, missing_data, city, when
+        )
+        return
+
+    await sync_to_async(apply_distance_matrix_data)(
+        lat, lng, origin_cell, missing_data, received_data, city, when
+    )
+
+
+def _get_city_status(
+    city_name: str, query_time: datetime
+) -> tuple[PharmacyStatus, int]:
+    city = get_city(city_name)
+    return city.get_city_status(query_time), city.roster_version
+
+
+async def aget_pharmacy_points(
+    lat: float, lng: float, query_time: datetime, limit: int
+) -> bytes:
+    """
+    Resolve the city and return the JSON body listing the nearest open or
+    on-duty pharmacies, served from the response cache when possible.
+
+    Google Places is only called on a response cache miss while the city is
+    open.
+    """
+    if not await sync_to_async(is_in_service_area)(lat, lng):
+        raise ValueError(f"Unknown city: {lat},{lng}")
+
+    city_name = await aget_city_name_from_location(lat, lng)
+    record_request(city_name, lat, lng)
+    city_status, roster_version = await sync_to_async(_get_city_status)(
+        city_name, query_time
+    )
+    logger.info("City status for %s: %s", city_name, city_status)
+
+    cache_key = get_points_cache_key(
+        lat, lng, city_name, city_status, roster_version, query_time
+    )
+    cached = await sync_to_async(get_cached_points, thread_sensitive=False)(cache_key)
+    if cached is not None:
+        return cached
+
+    if city_status == PharmacyStatus.OPEN:
+        fetched_data = await afetch_nearest_pharmacies(lat, lng, limit=limit)
+        pharmacy_data = get_map_points_from_fetched_data(fetched_data)
+        await aadd_travel_distances_to_pharmacy_data(lat, lng, pharmacy_data)
+    else:
+        pharmacy_data = await sync_to_async(find_pharmacies_on_duty)(
+            lat, lng, city_name, query_time, limit
+        )
+        await aadd_travel_distances_to_pharmacy_data(
+            lat, lng, pharmacy_data, city=city_name, when=query_time
+        )
+
+    order_data_by_distance(pharmacy_data)
+    return await sync_to_async(cache_points, thread_sensitive=False)(
+        cache_key, pharmacy_data[:limit]
+    )
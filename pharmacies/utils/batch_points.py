@@ -0,0 +1,286 @@
+"""
+Nearest open or on-duty pharmacies for many origins in one call.
+
+Origins are resolved to cities and grouped, so each city's status and roster
+are looked up once. Duty candidates for every origin of a city come from one
+roster snapshot, which is either the in-memory snapshot or a single query
+loading the city's current roster. Travel distances missing from the durable
+``TravelTime`` cache are fetched with multi-origin Distance Matrix requests:
+nearby origins share most of their destinations, so they are packed into one
+origins x destinations matrix within the API's per-request limits. Every
+element of a packed matrix is stored, including pairs that another origin
+asked for.
+
+Each origin gets its own JSON body, cached under the same key as a single
+``get_pharmacy_points`` response, or the exception that prevented it.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Final
+
+import requests
+from django.conf import settings
+
+from pharmacies.models import PharmacyStatus
+from pharmacies.utils.city_registry import get_city
+from pharmacies.utils.pharmacy_fetch import fetch_nearest_pharmacies
+from pharmacies.utils.response_cache import (
+    cache_points,
+    get_cached_points,
+    get_points_cache_key,
+)
+from pharmacies.utils.roster_snapshot import (
+    RosterSnapshot,
+    build_roster_snapshot,
+    get_roster_snapshot,
+)
+from pharmacies.utils.travel_times import store_travel_times
+from pharmacies.utils.utils import (
+    DEFAULT_DUTY_SEARCH_RADIUS,
+    _add_estimated_travel,
+    _get_distance_matrix_data,
+    add_estimated_travel_distances,
+    fill_cached_travel_distances,
+    get_city_name_from_location,
+    get_map_points_from_fetched_data,
+    get_map_points_from_roster_snapshot,
+    order_data_by_distance,
+)
+
+logger = logging.getLogger(__name__)
+
+# Distance Matrix limits per request.
+MAX_MATRIX_ORIGINS: Final = 25
+MAX_MATRIX_DESTINATIONS: Final = 25
+MAX_MATRIX_ELEMENTS: Final = 100
+
+
+@dataclass
+class BatchOrigin:
+    """One requested coordinate and its candidate points."""
+
+    index: int
+    lat: float
+    lng: float
+    points: list[dict[str, Any]] = field(default_factory=list)
+    origin_cell: str = ""
+    # Points whose travel metrics still have to be fetched.
+    missing: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def coordinates(self) -> str:
+        return f"{self.lat},{self.lng}"
+
+
+def _destination(point: dict[str, Any]) -> str:
+    return f"{point['position']['lat']},{point['position']['lng']}"
+
+
+def pack_matrix_requests(origins: list[BatchOrigin]) -> list[list[BatchOrigin]]:
+    """
+    Group origins into Distance Matrix requests.
+
+    Origins are added in order while the union of their destinations keeps
+    the matrix within the per-request origin, destination and element limits.
+    Callers sort origins by cell so neighbours land in the same request.
+    """
+    groups: list[list[BatchOrigin]] = []
+    group: list[BatchOrigin] = []
+    destinations: set[str] = set()
+    for origin in origins:
+        wanted = destinations | {_destination(p) for p in origin.missing}
+        if group and (
+            len(group) + 1 > MAX_MATRIX_ORIGINS
+            or len(wanted) > MAX_MATRIX_DESTINATIONS
+            or (len(group) + 1) * len(wanted) > MAX_MATRIX_ELEMENTS
+        ):
+            groups.append(group)
+            group = []
+            wanted = {_destination(p) for p in origin.missing}
+        group.append(origin)
+        destinations = wanted
+    if group:
+        groups.append(group)
+    return groups
+
+
+def _fetch_matrix(group: list[BatchOrigin], city_name: str, when: datetime) -> None:
+    """Fill the missing travel metrics of a packed group with one request."""
+    destinations: dict[str, int] = {}
+    pharmacy_ids: dict[str, int] = {}
+    for origin in group:
+        for point in origin.missing:
+            key = _destination(point)
+            destinations.setdefault(key, len(destinations))
+            if point.get("pharmacy_id"):
+                pharmacy_ids[key] = point["pharmacy_id"]
+
+    try:
+        received_data = _get_distance_matrix_data(
+            origins="|".join(origin.coordinates for origin in group),
+            destinations="|".join(destinations),
+        )
+    except (requests.RequestException, ValueError):
+        logger.warning(
+            "Batch Distance Matrix lookup failed; using local travel estimates.",
+            exc_info=True,
+        )
+        for origin in group:
+            add_estimated_travel_distances(
+                origin.lat, origin.lng, origin.missing, city_name, when
+            )
+        return
+
+    for origin, row in zip(group, received_data["rows"], strict=True):
+        elements = row["elements"]
+        for point in origin.missing:
+            element = elements[destinations[_destination(point)]]
+            if element["status"] == "OK":
+                point["travel_distance"] = element["distance"]["value"]
+                point["travel_duration"] = element["duration"]["value"]
+            else:
+                _add_estimated_travel(origin.lat, origin.lng, point, city_name, when)
+
+        store_travel_times(
+            origin.origin_cell,
+            {
+                pharmacy_id: (
+                    elements[destinations[key]]["distance"]["value"],
+                    elements[destinations[key]]["duration"]["value"],
+                )
+                for key, pharmacy_id in pharmacy_ids.items()
+                if elements[destinations[key]]["status"] == "OK"
+            },
+        )
+
+
+def add_batch_travel_distances(
+    origins: list[BatchOrigin], city_name: str, when: datetime
+) -> None:
+    """Add travel metrics to the points of every origin of one city."""
+    if settings.TRAVEL_TIME_MODE == "local":
+        for origin in origins:
+            add_estimated_travel_distances(
+                origin.lat, origin.lng, origin.points, city_name, when
+            )
+        return
+
+    for origin in origins:
+        origin.origin_cell, origin.missing = fill_cached_travel_distances(
+            origin.lat, origin.lng, origin.points
+        )
+
+    pending = sorted(
+        (origin for origin in origins if origin.missing),
+        key=lambda origin: origin.origin_cell,
+    )
+    for group in pack_matrix_requests(pending):
+        _fetch_matrix(group, city_name, when)
+
+
+def _get_duty_snapshot(
+    city_name: str, roster_version: int, when: datetime
+) -> RosterSnapshot:
+    snapshot = (
+        get_roster_snapshot(city_name) if settings.ROSTER_SNAPSHOT_ENABLED else None
+    )
+    if snapshot is None or not snapshot.covers(when):
+        # One query for the whole city instead of one per origin.
+        snapshot = build_roster_snapshot(city_name, roster_version, now=when)
+    return snapshot
+
+
+def _get_city_points(
+    city_name: str,
+    origins: list[BatchOrigin],
+    when: datetime,
+    limit: int,
+    results: list[bytes | Exception],
+) -> None:
+    """Compute or look up the responses of every origin in one city."""
+    city = get_city(city_name)
+    city_status = city.get_city_status(when)
+
+    pending: list[tuple[BatchOrigin, str]] = []
+    for origin in origins:
+        cache_key = get_points_cache_key(
+            origin.lat, origin.lng, city_name, city_status, city.roster_version, when
+        )
+        cached = get_cached_points(cache_key)
+        if cached is not None:
+            results[origin.index] = cached
+        else:
+            pending.append((origin, cache_key))
+    if not pending:
+        return
+
+    snapshot = (
+        None
+        if city_status == PharmacyStatus.OPEN
+        else _get_duty_snapshot(city_name, city.roster_version, when)
+    )
+    found: list[tuple[BatchOrigin, str]] = []
+    for origin, cache_key in pending:
+        try:
+            if snapshot is None:
+                origin.points = get_map_points_from_fetched_data(
+                    fetch_nearest_pharmacies(origin.lat, origin.lng, limit=limit)
+                )
+            else:
+                origin.points = get_map_points_from_roster_snapshot(
+                    snapshot.nearest(
+                        origin.lat,
+                        origin.lng,
+                        when,
+                        limit * 2,
+                        DEFAULT_DUTY_SEARCH_RADIUS,
+                    )
+                )
+            if not origin.points:
+                # Same errors as the single-origin path.
+                raise ValueError(
+                    "No pharmacies are on duty at this time."
+                    if snapshot is not None
+                    else "Cannot retrieve travel distances. Pharmacy data is empty!"
+                )
+        except Exception as exc:
+            results[origin.index] = exc
+        else:
+            found.append((origin, cache_key))
+
+    add_batch_travel_distances([origin for origin, _ in found], city_name, when)
+    for origin, cache_key in found:
+        order_data_by_distance(origin.points)
+        results[origin.index] = cache_points(cache_key, origin.points[:limit])
+
+
+def get_batch_pharmacy_points(
+    locations: list[tuple[float, float]], when: datetime, limit: int
+) -> list[bytes | Exception]:
+    """
+    Return the response body for each location, or the exception raised for
+    it, in request order.
+    """
+    results: list[bytes | Exception] = [ValueError("Not processed.")] * len(locations)
+
+    by_city: dict[str, list[BatchOrigin]] = defaultdict(list)
+    for index, (lat, lng) in enumerate(locations):
+        try:
+            city_name = get_city_name_from_location(lat, lng)
+        except Exception as exc:
+            results[index] = exc
+        else:
+            by_city[city_name].append(BatchOrigin(index, lat, lng))
+
+    for city_name, origins in by_city.items():
+        try:
+            _get_city_points(city_name, origins, when, limit, results)
+        except Exception as exc:
+            for origin in origins:
+                if not isinstance(results[origin.index], bytes):
+                    results[origin.index] = exc
+
+    return results
@@ -0,0 +1,197 @@
+"""
+Post-scrape cache warming for a city's most requested origin cells.
+
+After a new roster is persisted, the first users in each neighbourhood would
+otherwise pay for a Distance Matrix call. ``warm_city_caches`` computes the
+nearest-duty response for the city's hottest origin cells ahead of the shift
+handover, storing travel times in the durable ``TravelTime`` table and the
+serialized response in the ``pharmacy_points`` cache. Cells are warmed by a
+small thread pool, and Distance Matrix usage is capped by an element budget.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from pharmacies.models import (
+    City,
+    OriginCellTraffic,
+    Pharmacy,
+    PharmacyStatus,
+    TravelTime,
+)
+from pharmacies.utils.response_cache import (
+    SHOWN_PHARMACIES,
+    cache_points,
+    get_cached_points,
+    get_points_cache_key,
+)
+from pharmacies.utils.utils import (
+    _get_distance_matrix_data,
+    add_estimated_travel_distances,
+    apply_distance_matrix_data,
+    fill_cached_travel_distances,
+    find_pharmacies_on_duty,
+    format_distance_matrix_query,
+    order_data_by_distance,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaBudget:
+    """Thread-safe allowance of Distance Matrix elements for one warming run."""
+
+    def __init__(self, elements: int) -> None:
+        self.remaining = elements
+        self._lock = threading.Lock()
+
+    def take(self, elements: int) -> bool:
+        """Reserve ``elements`` if the budget allows it."""
+        with self._lock:
+            if elements > self.remaining:
+                return False
+            self.remaining -= elements
+            return True
+
+
+def get_hot_origin_cells(city_name: str, limit: int) -> list[str]:
+    """
+    Return the city's most requested origin cells.
+
+    Cells are ranked by the request counts in ``OriginCellTraffic``. Until
+    enough traffic has been counted the list is topped up with the cells that
+    have the most ``TravelTime`` rows, as every Distance Matrix lookup leaves
+    rows for its origin cell.
+    """
+    cells = list(
+        OriginCellTraffic.objects.filter(city__name=city_name)
+        .order_by("-requests", "-updated_at")
+        .values_list("origin_cell", flat=True)[:limit]
+    )
+    if len(cells) < limit:
+        travel_time_cells = (
+            TravelTime.objects.filter(pharmacy__city__name=city_name)
+            .exclude(origin_cell__in=cells)
+            .values("origin_cell")
+            .annotate(pairs=Count("id"), last_used=Max("updated_at"))
+            .order_by("-pairs", "-last_used")
+            .values_list("origin_cell", flat=True)[: limit - len(cells)]
+        )
+        cells.extend(travel_time_cells)
+    return cells
+
+
+def get_next_duty_time(city_name: str, now: datetime) -> datetime | None:
+    """Return ``now`` during a duty shift, else the start of the next one."""
+    next_start = Pharmacy.objects.filter(
+        city__name=city_name, duty_end__gte=now
+    ).aggregate(next_start=Min("duty_start"))["next_start"]
+    if next_start is None:
+        return None
+    return max(now, next_start)
+
+
+def warm_origin_cell(
+    city_name: str,
+    origin_cell: str,
+    when: datetime,
+    city_status: PharmacyStatus,
+    roster_version: int,
+    budget: QuotaBudget,
+) -> bool:
+    """
+    Compute and cache the duty response for one origin cell.
+
+    Returns whether a response was stored. Cells that are already cached, or
+    whose uncached travel times do not fit in the remaining budget, are
+    skipped.
+    """
+    lat, lng = (float(part) for part in origin_cell.split(","))
+    cache_key = get_points_cache_key(
+        lat, lng, city_name, city_status, roster_version, when
+    )
+    if get_cached_points(cache_key) is not None:
+        return False
+
+    pharmacy_data = find_pharmacies_on_duty(lat, lng, city_name, when, SHOWN_PHARMACIES)
+    if settings.TRAVEL_TIME_MODE == "local":
+        add_estimated_travel_distances(lat, lng, pharmacy_data, city_name, when)
+    else:
+        cell, missing_data = fill_cached_travel_distances(lat, lng, pharmacy_data)
+        if missing_data:
+            if not budget.take(len(missing_data)):
+                return False
+            origins, destinations = format_distance_matrix_query(lat, lng, missing_data)
+            received_data = _get_distance_matrix_data(origins, destinations)
+            apply_distance_matrix_data(
+                lat, lng, cell, missing_data, received_data, city_name, when
+            )
+
+    order_data_by_distance(pharmacy_data)
+    cache_points(cache_key, pharmacy_data[:SHOWN_PHARMACIES])
+    return True
+
+
+def _warm_origin_cell_in_thread(*args: Any) -> bool:
+    try:
+        return warm_origin_cell(*args)
+    except (requests.RequestException, ValueError):
+        logger.warning("Could not warm origin cell %s.", args[1], exc_info=True)
+        return False
+    finally:
+        # Pool threads open their own database connections.
+        connection.close()
+
+
+def warm_city_caches(city_name: str, now: datetime | None = None) -> dict[str, int]:
+    """
+    Warm the response and travel-time caches of a city's hottest cells for
+    its current or next duty shift.
+
+    Returns how many cells were considered and warmed, and how many Distance
+    Matrix elements were spent.
+    """
+    now = now or timezone.now()
+    result = {"cells": 0, "warmed": 0, "elements": 0}
+
+    when = get_next_duty_time(city_name, now)
+    if when is None:
+        logger.info("No upcoming duty shift in %s; nothing to warm.", city_name)
+        return result
+
+    city = City.objects.get(name=city_name)
+    city_status = city.get_city_status(when)
+    if city_status == PharmacyStatus.OPEN:
+        return result
+
+    cells = get_hot_origin_cells(city_name, settings.CACHE_WARMING_TOP_CELLS)
+    budget = QuotaBudget(settings.CACHE_WARMING_MAX_ELEMENTS)
+    with ThreadPoolExecutor(
+        max_workers=settings.CACHE_WARMING_CONCURRENCY,
+        thread_name_prefix="cache-warming",
+    ) as pool:
+        warmed = list(
+            pool.map(
+                lambda cell: _warm_origin_cell_in_thread(
+                    city_name, cell, when, city_status, city.roster_version, budget
+                ),
+                cells,
+            )
+        )
+
+    result.update(
+        cells=len(cells),
+        warmed=sum(warmed),
+        elements=settings.CACHE_WARMING_MAX_ELEMENTS - budget.remaining,
+    )
+    logger.info("Warmed caches for %s: %s", city_name, result)
+    return result
@@ -0,0 +1,131 @@
+"""
+Process-wide registry of cities, their working schedules and scraper configs.
+
+The ``City``, ``WorkingSchedule`` and ``ScraperConfig`` tables hold a handful
+of rows that change only when a city is added, its schedule or scraper config
+is edited, or a scrape bumps its roster version. Each worker loads the three
+tables in one query and answers city lookups, open/closed status and the next
+interval scrape from memory.
+
+Changes are announced through a generation token in the shared cache: the
+signal handlers and the scraper call ``invalidate_city_registry``, which drops
+this process's copy and replaces the token. Other workers check at most every
+``CITY_REGISTRY_CHECK_INTERVAL`` seconds and reload when the token differs.
+
+The token is only a fast path. The cache may be per process (no Redis) or drop
+writes silently, so each check also re-reads every city's ``roster_version``,
+one small query, and reloads when a version differs. Roster changes therefore
+reach every worker even if the token never does.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Final
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+
+from pharmacies.models import City
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS: Final = "default"
+GENERATION_KEY: Final = "city_registry:generation"
+
+
+@dataclass
+class _Registry:
+    cities: dict[str, City]
+    generation: Any
+    checked_at: float
+
+
+_registry: _Registry | None = None
+_lock = threading.Lock()
+
+
+def _load_cities() -> dict[str, City]:
+    cities = City.objects.select_related("working_schedule", "scraperconfig").defer(
+        "boundary"
+    )
+    return {city.name: city for city in cities}
+
+
+def _roster_versions() -> dict[str, int]:
+    return dict(City.objects.values_list("name", "roster_version"))
+
+
+def _loaded_versions(cities: dict[str, City]) -> dict[str, int]:
+    return {name: city.roster_version for name, city in cities.items()}
+
+
+def _get_cities() -> dict[str, City]:
+    global _registry
+
+    registry = _registry
+    now = time.monotonic()
+    if (
+        registry is not None
+        and now - registry.checked_at < settings.CITY_REGISTRY_CHECK_INTERVAL
+    ):
+        return registry.cities
+
+    # Read the token before loading, so a change made during the load is
+    # picked up by the next check.
+    generation = caches[CACHE_ALIAS].get(GENERATION_KEY)
+    if (
+        registry is not None
+        and registry.generation == generation
+        and _roster_versions() == _loaded_versions(registry.cities)
+    ):
+        registry.checked_at = now
+        return registry.cities
+
+    with _lock:
+        cities = _load_cities()
+        _registry = _Registry(cities, generation, now)
+    logger.info("Loaded city registry (%d cities).", len(cities))
+    return cities
+
+
+def get_city(city_name: str) -> City:
+    """
+    Return the registered city with its working schedule and scraper config.
+
+    The instance is shared by every caller in the process and must be treated
+    as read-only. Raises ``City.DoesNotExist`` for unknown cities.
+    """
+    city = _get_cities().get(city_name)
+    if city is None:
+        raise City.DoesNotExist(f"City matching name={city_name!r} does not exist.")
+    return city
+
+
+def get_city_names() -> list[str]:
+    """Return the names of all registered cities."""
+    return list(_get_cities())
+
+
+def invalidate_city_registry() -> None:
+    """Drop this process's registry and tell other workers to reload theirs."""
+    reset_city_registry()
+    caches[CACHE_ALIAS].set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def preload_city_registry() -> None:
+    """Load the registry when a worker starts; failures retry on first use."""
+    try:
+        _get_cities()
+    except DatabaseError:
+        logger.warning("Could not preload the city registry.", exc_info=True)
+
+
+def reset_city_registry() -> None:
+    """Drop this process's registry; used after local changes and by tests."""
+    global _registry
+
+    with _lock:
+        _registry = None
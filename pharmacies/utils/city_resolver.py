@@ -0,0 +1,276 @@
+"""
+Offline city resolution from stored city boundaries.
+
+Coordinates are matched against ``City.boundary`` polygons held in an
+in-memory shapely STRtree, so resolving a city needs neither the database
+nor the Google Geocoding API. Points the index misses are checked against
+PostGIS with ``ST_Contains``, which covers boundaries loaded by another
+process since the index was built.
+
+A coarser service-area bitmap answers in constant time whether a coordinate
+can belong to any supported city at all, so requests from elsewhere are
+rejected before any upstream call.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, cast
+
+import numpy as np
+import shapely
+from django.conf import settings
+from django.contrib.gis.db.models import Extent
+from django.contrib.gis.geos import Point
+from shapely import STRtree
+
+from pharmacies.models import City
+from pharmacies.utils.travel_estimator import EARTH_RADIUS_M
+
+logger = logging.getLogger(__name__)
+
+
+class CityBoundaryIndex:
+    """Immutable STRtree over the boundaries of every city that has one."""
+
+    def __init__(self, boundaries: list[tuple[str, bytes]]) -> None:
+        self.built_at = time.monotonic()
+        self.city_names = [name for name, _ in boundaries]
+        self.geometries = [shapely.from_wkb(wkb) for _, wkb in boundaries]
+        self.tree = STRtree(self.geometries) if self.geometries else None
+
+    def __len__(self) -> int:
+        return len(self.city_names)
+
+    def lookup(self, lat: float, lng: float) -> str | None:
+        """Return the name of the city whose boundary contains the point."""
+        if self.tree is None:
+            return None
+
+        matches = self.tree.query(shapely.Point(lng, lat), predicate="intersects")
+        if len(matches) == 0:
+            return None
+        return self.city_names[int(min(matches))]
+
+
+# (min lng, min lat, max lng, max lat)
+Envelope = tuple[float, float, float, float]
+
+
+class ServiceAreaIndex:
+    """
+    Grid bitmap of the cells that touch a supported city.
+
+    Cells are ``cell_size`` degrees wide and marked when they intersect a city
+    boundary or envelope, so a point inside a city is never rejected. The grid
+    only spans the bounding box of all areas. With ``unbounded`` set (a city
+    has neither boundary nor envelope) every point is accepted.
+    """
+
+    def __init__(
+        self,
+        boundaries: list[bytes],
+        envelopes: list[Envelope],
+        cell_size: float,
+        unbounded: bool = False,
+    ) -> None:
+        self.cell_size = cell_size
+        self.unbounded = unbounded
+        self.built_at = time.monotonic()
+
+        geometries = [shapely.from_wkb(wkb) for wkb in boundaries]
+        bounds = [tuple(g.bounds) for g in geometries] + list(envelopes)
+
+        self.mask: np.ndarray | None = None
+        if not bounds:
+            return
+
+        self.min_lng = math.floor(min(b[0] for b in bounds) / cell_size) * cell_size
+        self.min_lat = math.floor(min(b[1] for b in bounds) / cell_size) * cell_size
+        rows, cols = self._cell(max(b[3] for b in bounds), max(b[2] for b in bounds))
+        self.mask = np.zeros((rows + 1, cols + 1), dtype=bool)
+
+        for min_lng, min_lat, max_lng, max_lat in envelopes:
+            row_start, col_start = self._cell(min_lat, min_lng)
+            row_end, col_end = self._cell(max_lat, max_lng)
+            self.mask[row_start : row_end + 1, col_start : col_end + 1] = True
+
+        for geometry in geometries:
+            min_lng, min_lat, max_lng, max_lat = geometry.bounds
+            row_start, col_start = self._cell(min_lat, min_lng)
+            row_end, col_end = self._cell(max_lat, max_lng)
+            lat_edges = self.min_lat + np.arange(row_start, row_end + 1) * cell_size
+            lng_edges = self.min_lng + np.arange(col_start, col_end + 1) * cell_size
+            lng_grid, lat_grid = np.meshgrid(lng_edges, lat_edges)
+            boxes = shapely.box(
+                lng_grid, lat_grid, lng_grid + cell_size, lat_grid + cell_size
+            )
+            self.mask[row_start : row_end + 1, col_start : col_end + 1] |= (
+                shapely.intersects(boxes, geometry)
+            )
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return (
+            math.floor((lat - self.min_lat) / self.cell_size),
+            math.floor((lng - self.min_lng) / self.cell_size),
+        )
+
+    def contains(self, lat: float, lng: float) -> bool:
+        """Whether the point may belong to a supported city."""
+        if self.unbounded:
+            return True
+        if self.mask is None:
+            return False
+
+        row, col = self._cell(lat, lng)
+        if not (0 <= row < self.mask.shape[0] and 0 <= col < self.mask.shape[1]):
+            return False
+        return bool(self.mask[row, col])
+
+
+_index: CityBoundaryIndex | None = None
+_index_lock = threading.Lock()
+_service_area_index: ServiceAreaIndex | None = None
+
+
+def _load_boundaries() -> list[tuple[str, bytes]]:
+    """Load ``(city name, boundary WKB)`` pairs for cities with a boundary."""
+    rows: Any = (
+        City.objects.exclude(boundary__isnull=True)
+        .order_by("pk")
+        .values_list("name", "boundary")
+    )
+    return [(name, bytes(boundary.wkb)) for name, boundary in rows]
+
+
+def _is_fresh(index: CityBoundaryIndex | ServiceAreaIndex | None) -> bool:
+    return (
+        index is not None
+        and time.monotonic() - index.built_at < settings.SERVICE_AREA_REFRESH_INTERVAL
+    )
+
+
+def get_city_boundary_index() -> CityBoundaryIndex:
+    """
+    Return the process-wide boundary index.
+
+    Like the service-area index, it is rebuilt on first use, after a ``City``
+    change in this process and every ``SERVICE_AREA_REFRESH_INTERVAL``
+    seconds, which picks up boundaries loaded by other processes.
+    """
+    global _index
+
+    index = _index
+    if index is not None and _is_fresh(index):
+        return index
+
+    with _index_lock:
+        if not _is_fresh(_index):
+            _index = CityBoundaryIndex(_load_boundaries())
+            logger.info("Loaded %d city boundaries into the STRtree.", len(_index))
+        return cast(CityBoundaryIndex, _index)
+
+
+def _load_service_areas() -> ServiceAreaIndex:
+    """
+    Build the service-area index from city boundaries, or for cities without
+    one, from the extent of their pharmacies padded by
+    ``SERVICE_AREA_ENVELOPE_MARGIN`` meters.
+    """
+    margin = math.degrees(settings.SERVICE_AREA_ENVELOPE_MARGIN / EARTH_RADIUS_M)
+    boundaries: list[bytes] = []
+    envelopes: list[Envelope] = []
+    unbounded = False
+
+    cities = City.objects.order_by("pk").annotate(extent=Extent("pharmacies__location"))
+    for city in cities:
+        if city.boundary is not None:
+            boundaries.append(bytes(city.boundary.wkb))
+        elif city.extent is not None:
+            min_lng, min_lat, max_lng, max_lat = city.extent
+            # A degree of longitude shrinks away from the equator.
+            lng_margin = margin / math.cos(
+                math.radians(max(abs(min_lat), abs(max_lat)))
+            )
+            envelopes.append(
+                (
+                    min_lng - lng_margin,
+                    min_lat - margin,
+                    max_lng + lng_margin,
+                    max_lat + margin,
+                )
+            )
+        else:
+            logger.info(
+                "City %s has no boundary or pharmacies; service area is unbounded.",
+                city.name,
+            )
+            unbounded = True
+
+    return ServiceAreaIndex(
+        boundaries, envelopes, settings.SERVICE_AREA_CELL_SIZE, unbounded=unbounded
+    )
+
+
+def get_service_area_index() -> ServiceAreaIndex:
+    """
+    Return the process-wide service-area index.
+
+    The index is rebuilt on first use, after a ``City`` change in this process
+    and every ``SERVICE_AREA_REFRESH_INTERVAL`` seconds, which picks up cities
+    added through other processes.
+    """
+    global _service_area_index
+
+    index = _service_area_index
+    if index is not None and _is_fresh(index):
+        return index
+
+    with _index_lock:
+        if not _is_fresh(_service_area_index):
+            _service_area_index = _load_service_areas()
+        return cast(ServiceAreaIndex, _service_area_index)
+
+
+def is_in_service_area(lat: float, lng: float) -> bool:
+    """
+    Whether a coordinate may belong to a supported city.
+
+    ``False`` means no supported city can contain the point, so no upstream
+    lookup is needed to reject it.
+    """
+    if not settings.SERVICE_AREA_PREFILTER_ENABLED:
+        return True
+    return get_service_area_index().contains(lat, lng)
+
+
+def reset_city_boundary_index() -> None:
+    """
+    Drop the cached boundary and service-area indexes so the next lookup
+    rebuilds them.
+    """
+    global _index, _service_area_index
+
+    with _index_lock:
+        _index = None
+        _service_area_index = None
+
+
+def resolve_city_from_boundaries(lat: float, lng: float) -> str | None:
+    """
+    Resolve the city containing a coordinate without any external call.
+
+    Returns ``None`` when the point falls outside every stored boundary.
+    """
+    city_name = get_city_boundary_index().lookup(lat, lng)
+    if city_name is not None:
+        return city_name
+
+    point = Point(float(lng), float(lat), srid=4326)
+    return (
+        City.objects.filter(boundary__contains=point)
+        .order_by("pk")
+        .values_list("name", flat=True)
+        .first()
+    )
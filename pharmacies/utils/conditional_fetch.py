@@ -0,0 +1,201 @@
+"""
+Conditional fetching of scraper sources.
+
+Scraper pages rarely change between hourly runs. A ``ConditionalFetcher``
+keeps, per city and source (a URL or an Istanbul district), the upstream
+``ETag``/``Last-Modified`` and a SHA-256 of the body in ``ScrapeSource``. It
+sends ``If-None-Match``/``If-Modified-Since`` and reports a source unchanged
+when the upstream answers 304 or the body hashes to the stored value.
+Scrapers skip unchanged sources, and ``run_scraper`` skips parsing and the
+database transaction when every source of a city is unchanged.
+
+Validators are scoped: scrapers that derive duty times from the clock pass
+the duty window as ``scope``, so an unchanged page still gets persisted for a
+new shift. New validators are only written by ``commit``, inside the
+transaction that persists the scrape, so a failed run never hides a change.
+"""
+
+import hashlib
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import requests
+from django.db.models import F
+from django.utils import timezone
+
+from pharmacies.models import City, ScrapeSource
+
+
+@dataclass
+class ConditionalFetchStats:
+    """How scraper sources were fetched (per process)."""
+
+    changed: int = 0
+    not_modified: int = 0
+    same_hash: int = 0
+    skipped_runs: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dictionary."""
+        return asdict(self)
+
+
+_stats = ConditionalFetchStats()
+_stats_lock = threading.Lock()
+
+Send = Callable[[dict[str, str]], requests.Response]
+
+
+class ConditionalFetcher:
+    """
+    Fetch a city's sources conditionally during one scraper run.
+
+    ``fetch`` is thread-safe. Scrapers that fetch on worker threads call
+    ``load`` first, so the stored validators are read on the calling thread.
+    """
+
+    def __init__(self, city_name: str) -> None:
+        self.city_name = city_name
+        self.changed: set[str] = set()
+        self.unchanged: set[str] = set()
+        self._known: dict[str, ScrapeSource] | None = None
+        self._seen: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def all_unchanged(self) -> bool:
+        """Whether sources were fetched and none of them changed."""
+        return bool(self.unchanged) and not self.changed
+
+    def load(self) -> dict[str, ScrapeSource]:
+        """Read the stored validators of the city once."""
+        with self._lock:
+            if self._known is None:
+                self._known = {
+                    source.key: source
+                    for source in ScrapeSource.objects.filter(city__name=self.city_name)
+                }
+            return self._known
+
+    def fetch(self, key: str, send: Send, scope: str = "") -> requests.Response | None:
+        """
+        Send a request for the source ``key`` with conditional headers.
+
+        ``send`` performs the request with the given extra headers. Returns
+        the response, or ``None`` when the source is unchanged. Error
+        responses are returned for the caller to raise.
+        """
+        known = self.load().get(key)
+        if known is not None and known.scope != scope:
+            known = None
+
+        headers: dict[str, str] = {}
+        if known is not None and known.etag:
+            headers["If-None-Match"] = known.etag
+        if known is not None and known.last_modified:
+            headers["If-Modified-Since"] = known.last_modified
+
+        response = send(headers)
+        if known is not None and response.status_code == 304:
+            self._record(key, changed=False, counter="not_modified")
+            return None
+        if not response.ok:
+            return response
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        with self._lock:
+            self._seen[key] = {
+                "scope": scope,
+                "etag": response.headers.get("ETag", ""),
+                "last_modified": response.headers.get("Last-Modified", ""),
+                "content_hash": content_hash,
+            }
+        if known is not None and known.content_hash == content_hash:
+            self._record(key, changed=False, counter="same_hash")
+            return None
+        self._record(key, changed=True, counter="changed")
+        return response
+
+    def _record(self, key: str, changed: bool, counter: str) -> None:
+        with self._lock:
+            (self.changed if changed else self.unchanged).add(key)
+        with _stats_lock:
+            setattr(_stats, counter, getattr(_stats, counter) + 1)
+
+    def commit(self) -> None:
+        """
+        Store the validators seen by this run.
+
+        Call it once the scraped data has been persisted, in the same
+        transaction.
+        """
+        now = timezone.now()
+        if self._seen:
+            city = City.objects.get(name=self.city_name)
+            for keys, update_fields in (
+                (
+                    self.changed,
+                    [
+                        "scope",
+                        "etag",
+                        "last_modified",
+                        "content_hash",
+                        "checked_at",
+                        "changed_at",
+                    ],
+                ),
+                # A new ETag for the same bytes enables a 304 next time.
+                (self.unchanged, ["etag", "last_modified", "checked_at"]),
+            ):
+                sources = [
+                    ScrapeSource(
+                        city=city,
+                        key=key,
+                        checked_at=now,
+                        changed_at=now,
+                        **self._seen[key],
+                    )
+                    for key in sorted(keys & self._seen.keys())
+                ]
+                if sources:
+                    ScrapeSource.objects.bulk_create(
+                        sources,
+                        update_conflicts=True,
+                        unique_fields=["city", "key"],
+                        update_fields=update_fields,
+                    )
+        if self.unchanged:
+            ScrapeSource.objects.filter(
+                city__name=self.city_name, key__in=self.unchanged
+            ).update(checked_at=now, unchanged_runs=F("unchanged_runs") + 1)
+
+
+def fetch_source(
+    fetcher: ConditionalFetcher | None, key: str, send: Send, scope: str = ""
+) -> requests.Response | None:
+    """Fetch through ``fetcher``, or unconditionally without one."""
+    if fetcher is None:
+        return send({})
+    return fetcher.fetch(key, send, scope)
+
+
+def record_skipped_run() -> None:
+    """Count a scraper run skipped because no source changed."""
+    with _stats_lock:
+        _stats.skipped_runs += 1
+
+
+def get_conditional_fetch_stats() -> dict[str, int]:
+    """Return how this process fetched scraper sources."""
+    with _stats_lock:
+        return _stats.as_dict()
+
+
+def reset_conditional_fetch_stats() -> None:
+    """Reset the counters; used by tests."""
+    global _stats
+
+    with _stats_lock:
+        _stats = ConditionalFetchStats()
@@ -0,0 +1,123 @@
+"""
+Precomputed GeoJSON of each city's duty roster.
+
+The document lists every pharmacy that is on duty now or later, with its duty
+window, so a client can draw the whole roster from one cacheable GET. It only
+changes when a scrape bumps ``City.roster_version``: the worker that persists
+a scrape builds it once and stores it gzip-compressed in the
+``duty_geojson`` cache namespace under the city and version. Web workers
+serve the stored bytes as-is, and build them on a miss (e.g. after an admin
+edit).
+
+The ETag is a hash of the uncompressed document, so it is a valid strong
+validator no matter which process built it.
+"""
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from pharmacies.cache import get_cache
+from pharmacies.models import City, Pharmacy
+from pharmacies.singleflight import single_flight
+from pharmacies.utils.city_registry import get_city
+
+
+@dataclass(frozen=True)
+class DutyGeoJSON:
+    """A serialized duty roster and its validators."""
+
+    city_name: str
+    version: int
+    etag: str
+    gzipped: bytes
+
+    @property
+    def body(self) -> bytes:
+        """The uncompressed document."""
+        return gzip.decompress(self.gzipped)
+
+
+def build_duty_geojson(
+    city_name: str, version: int, now: datetime | None = None
+) -> DutyGeoJSON:
+    """Serialize the city's current and upcoming duty shifts."""
+    now = now or timezone.now()
+    rows: Any = (
+        Pharmacy.objects.filter(city__name=city_name, duty_end__gte=now)
+        .order_by("duty_start", "pk")
+        .values_list(
+            "pk",
+            "name",
+            "address",
+            "phone",
+            "district",
+            "location",
+            "duty_start",
+            "duty_end",
+        )
+    )
+    features = [
+        {
+            "type": "Feature",
+            "id": pk,
+            "geometry": {"type": "Point", "coordinates": [location.x, location.y]},
+            "properties": {
+                "name": name,
+                "address": address,
+                "phone": phone,
+                "district": district,
+                "duty_start": duty_start,
+                "duty_end": duty_end,
+            },
+        }
+        for pk, name, address, phone, district, location, duty_start, duty_end in rows
+    ]
+    body = json.dumps(
+        {
+            "type": "FeatureCollection",
+            "city": city_name,
+            "roster_version": version,
+            "features": features,
+        },
+        cls=DjangoJSONEncoder,
+        separators=(",", ":"),
+    ).encode()
+
+    return DutyGeoJSON(
+        city_name=city_name,
+        version=version,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        # A fixed mtime keeps the compressed bytes identical across builds.
+        gzipped=gzip.compress(body, mtime=0),
+    )
+
+
+def get_duty_geojson(city_name: str) -> DutyGeoJSON:
+    """
+    Return the GeoJSON of the city's current roster version.
+
+    Raises ``City.DoesNotExist`` for unknown cities.
+    """
+    version = get_city(city_name).roster_version
+    key = f"{city_name}:{version}"
+    return get_cache("duty_geojson").get_or_set(
+        key,
+        lambda: single_flight(
+            f"duty_geojson:{key}", lambda: build_duty_geojson(city_name, version)
+        ),
+    )
+
+
+def refresh_duty_geojson(city_name: str) -> DutyGeoJSON:
+    """Build and store the GeoJSON right after a scrape was persisted."""
+    version = City.objects.values_list("roster_version", flat=True).get(name=city_name)
+    geojson = build_duty_geojson(city_name, version)
+    get_cache("duty_geojson").set(f"{city_name}:{version}", geojson)
+    return geojson
@@ -4,12 +4,14 @@ Scraper for Eskişehir Eczacı Odası (EEO).
 Fetches duty pharmacy data from the official Eskişehir Chamber of Pharmacists website.
 """
 
+from collections.abc import Iterator
 from datetime import datetime
 from typing import Any
 
-import requests
-from bs4 import BeautifulSoup
-from bs4.element import Tag
+from pharmacies import http_client
+from pharmacies.utils.conditional_fetch import ConditionalFetcher, fetch_source
+from pharmacies.utils.html_parser import parse_blocks
+from pharmacies.utils.scraper_registry import get_scraper
 
 
 def _get_district_from_name(pharmacy_name: str) -> str:
@@ -29,62 +31,65 @@ def _get_duty_dates(operation_times: str) -> tuple[datetime, datetime]:
     return start_date, end_date
 
 
-def get_eskisehir_data() -> list[dict[str, Any]]:
+def get_eskisehir_data(
+    fetcher: ConditionalFetcher | None = None,
+) -> Iterator[dict[str, Any]]:
     """
     Scrape pharmacy data from the Eskişehir Eczacı Odası website.
 
-    Extracts name, address, district, phone, coordinates, and duty times.
+    Yields name, address, district, phone, coordinates, and duty times per
+    pharmacy. Yields nothing when ``fetcher`` finds the page unchanged; the
+    duty times come from the page itself.
     """
     from pharmacies.utils.utils import get_coordinates_from_google_maps_url
 
     url = "https://www.eskisehireo.org.tr/eskisehir-nobetci-eczaneler"
-    response = requests.get(url, timeout=60)
-    soup = BeautifulSoup(response.text, "html.parser")
-    pharmacies = soup.find_all("div", class_="nobetci")
-
-    data: list[dict[str, Any]] = []  # To store extracted data
+    endpoint = get_scraper("eskisehir").endpoint
+    response = fetch_source(
+        fetcher,
+        url,
+        lambda headers: http_client.get(url, endpoint=endpoint, headers=headers),
+    )
+    if response is None:
+        return
+    pharmacies = parse_blocks(response.text, "div.nobetci")
 
     for pharmacy in pharmacies:
         # Extract name
-        h4_tag: Tag | None = pharmacy.find("h4", class_="text-danger")
+        h4_tag = pharmacy.select_one("h4.text-danger")
 
         if h4_tag is None:
             continue
 
-        name = h4_tag.text.strip()
+        name = h4_tag.text().strip()
 
         district = _get_district_from_name(name) if name else None
 
         name = name.split("-")[0].strip()
 
         # Address
-        address_tag = pharmacy.find("i", class_="fa-home")
+        address_tag = pharmacy.select_one("i.fa-home")
         address: str | None = None
         if address_tag:
-            next_sibling = address_tag.next_sibling
-            if next_sibling:
-                address = str(next_sibling).strip()  # The text after the <i> icon
+            # The text after the <i> icon
+            address = address_tag.tail().strip()
 
         # Phone
-        phone_tag = pharmacy.find(
-            "a", href=lambda href: href and href.startswith("tel:")
-        )
-        phone = phone_tag.text.strip() if phone_tag else None
+        phone_tag = pharmacy.select_one('a[href^="tel:"]')
+        phone = phone_tag.text().strip() if phone_tag else None
 
         # Google Maps Location
-        map_tag = pharmacy.find(
-            "a", href=lambda href: href and "google.com/maps" in href
-        )
-        google_maps = map_tag["href"] if map_tag else None
+        map_tag = pharmacy.select_one('a[href*="google.com/maps"]')
+        google_maps = map_tag.attr("href") if map_tag else None
 
         coordinates: dict[str, float] | None = None
-        if google_maps and isinstance(google_maps, str):
+        if google_maps:
             coordinates = get_coordinates_from_google_maps_url(google_maps)
 
         # Operation Times
-        operation_time_tag = pharmacy.find("span", class_="text-danger")
+        operation_time_tag = pharmacy.select_one("span.text-danger")
         operation_times = (
-            operation_time_tag.text.strip() if operation_time_tag else None
+            operation_time_tag.text().strip() if operation_time_tag else None
         )
 
         start_date: datetime | None = None
@@ -93,20 +98,15 @@ def get_eskisehir_data() -> list[dict[str, Any]]:
         if operation_times:
             start_date, end_date = _get_duty_dates(operation_times)
 
-        # Append to the data list
-        data.append(
-            {
-                "name": name,
-                "address": address,
-                "district": district,
-                "phone": phone,
-                "coordinates": coordinates,
-                "duty_start": start_date,
-                "duty_end": end_date,
-            }
-        )
-
-    return data
+        yield {
+            "name": name,
+            "address": address,
+            "district": district,
+            "phone": phone,
+            "coordinates": coordinates,
+            "duty_start": start_date,
+            "duty_end": end_date,
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+"""
+Streaming per-city counts of where pharmacy point requests come from.
+
+Every request's quantized origin cell is added to a fixed-size count-min
+sketch for its city, and a small top-k table tracks the cells with the highest
+estimates. Memory per city is bounded by ``HOT_CELLS_SKETCH_WIDTH *
+HOT_CELLS_SKETCH_DEPTH`` counters regardless of traffic, and recording a
+request is a hash and a handful of array updates.
+
+Every ``HOT_CELLS_FLUSH_INTERVAL`` seconds a background thread adds the top-k
+counts of the finished window to ``OriginCellTraffic`` and starts a new window.
+The persisted totals rank cells for cache warming and are listed by the
+``hot_cells`` management command.
+"""
+
+import hashlib
+import heapq
+import logging
+import threading
+import time
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from pharmacies.models import City, OriginCellTraffic
+from pharmacies.utils.travel_times import quantize_origin
+
+logger = logging.getLogger(__name__)
+
+
+class CountMinSketch:
+    """
+    Approximate frequency counter with a fixed memory footprint.
+
+    Estimates never undercount; they overcount by at most ``e / width`` of
+    the total with probability ``1 - exp(-depth)``.
+    """
+
+    def __init__(self, width: int, depth: int) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        # A stable hash, so sketches from different processes are comparable.
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint32) % self.width
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and return its new estimate."""
+        columns = self._columns(key)
+        self.table[self._rows, columns] += count
+        return int(self.table[self._rows, columns].min())
+
+    def estimate(self, key: str) -> int:
+        """Return the estimated count of ``key``."""
+        return int(self.table[self._rows, self._columns(key)].min())
+
+
+class HotCellCounter:
+    """Count-min sketch plus a top-k min-heap of a city's origin cells."""
+
+    def __init__(self, width: int, depth: int, top_k: int) -> None:
+        self.sketch = CountMinSketch(width, depth)
+        self.top_k = top_k
+        self.total = 0
+        # Min-heap of [estimate, cell]; entries are updated in place.
+        self._heap: list[list[Any]] = []
+        self._entries: dict[str, list[Any]] = {}
+
+    def add(self, cell: str) -> None:
+        """Count one request from ``cell``."""
+        self.total += 1
+        estimate = self.sketch.add(cell)
+
+        entry = self._entries.get(cell)
+        if entry is not None:
+            entry[0] = estimate
+            heapq.heapify(self._heap)
+        elif len(self._heap) < self.top_k:
+            entry = self._entries[cell] = [estimate, cell]
+            heapq.heappush(self._heap, entry)
+        elif estimate > self._heap[0][0]:
+            entry = self._entries[cell] = [estimate, cell]
+            evicted = heapq.heapreplace(self._heap, entry)
+            del self._entries[evicted[1]]
+
+    def most_common(self, limit: int | None = None) -> list[tuple[str, int]]:
+        """Return ``(cell, estimated requests)`` pairs, hottest first."""
+        ranked = sorted(
+            ((cell, count) for count, cell in self._heap),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:limit]
+
+
+_counters: dict[str, HotCellCounter] = {}
+_lock = threading.Lock()
+# Monotonic deadline of the current window; 0 until the first request.
+_next_flush = 0.0
+_flushing = threading.Event()
+
+
+def _new_counter() -> HotCellCounter:
+    return HotCellCounter(
+        settings.HOT_CELLS_SKETCH_WIDTH,
+        settings.HOT_CELLS_SKETCH_DEPTH,
+        settings.HOT_CELLS_TOP_K,
+    )
+
+
+def record_request(city_name: str, lat: float, lng: float) -> None:
+    """Count a pharmacy point request and flush finished windows."""
+    global _next_flush
+
+    if not settings.HOT_CELLS_ENABLED:
+        return
+
+    cell = quantize_origin(lat, lng)
+    now = time.monotonic()
+    with _lock:
+        if not _next_flush:
+            _next_flush = now + settings.HOT_CELLS_FLUSH_INTERVAL
+        counter = _counters.get(city_name)
+        if counter is None:
+            counter = _counters[city_name] = _new_counter()
+        counter.add(cell)
+
+    if now >= _next_flush and not _flushing.is_set():
+        _flushing.set()
+        threading.Thread(
+            target=_flush_in_background, name="hot-cells-flush", daemon=True
+        ).start()
+
+
+def get_local_hot_cells(city_name: str, limit: int = 10) -> list[tuple[str, int]]:
+    """Return the hottest cells counted by this process in the current window."""
+    with _lock:
+        counter = _counters.get(city_name)
+        return counter.most_common(limit) if counter is not None else []
+
+
+def flush_hot_cells() -> int:
+    """
+    Add the current window's top-k counts to ``OriginCellTraffic`` and start
+    a new window. Returns the number of cells written.
+    """
+    global _next_flush, _counters
+
+    with _lock:
+        counters, _counters = _counters, {}
+        _next_flush = time.monotonic() + settings.HOT_CELLS_FLUSH_INTERVAL
+
+    city_ids = dict(City.objects.filter(name__in=counters).values_list("name", "pk"))
+    now = timezone.now()
+    # Sorted so that workers flushing the same cells lock rows in one order.
+    rows = sorted(
+        (city_ids[city_name], cell, count, now)
+        for city_name, counter in counters.items()
+        if city_name in city_ids
+        for cell, count in counter.most_common()
+    )
+    if rows:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(_upsert_sql(), rows)
+    return len(rows)
+
+
+def _upsert_sql() -> str:
+    """
+    Insert a cell's count, or add it to the existing row in the same statement.
+
+    Workers flushing the same new cell therefore cannot race between an update
+    and an insert.
+    """
+    meta = OriginCellTraffic._meta
+    table = connection.ops.quote_name(meta.db_table)
+    city, cell, requests, updated_at = (
+        connection.ops.quote_name(meta.get_field(name).column)
+        for name in ("city", "origin_cell", "requests", "updated_at")
+    )
+    return (
+        f"INSERT INTO {table} ({city}, {cell}, {requests}, {updated_at}) "
+        "VALUES (%s, %s, %s, %s) "
+        f"ON CONFLICT ({city}, {cell}) DO UPDATE SET "
+        f"{requests} = {table}.{requests} + EXCLUDED.{requests}, "
+        f"{updated_at} = EXCLUDED.{updated_at}"
+    )
+
+
+def _flush_in_background() -> None:
+    try:
+        flush_hot_cells()
+    except Exception:
+        logger.exception("Could not flush hot cell counts.")
+    finally:
+        connection.close()
+        _flushing.clear()
+
+
+def reset_hot_cells() -> None:
+    """Drop all in-memory counts; used by tests."""
+    global _next_flush
+
+    with _lock:
+        _counters.clear()
+        _next_flush = 0.0
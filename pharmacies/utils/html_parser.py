@@ -0,0 +1,149 @@
+"""
+HTML parsing backends for the scrapers.
+
+Scrapers only read a few fields inside repeated blocks (``.card`` for
+Istanbul, ``div.nobetci`` for Eskişehir), so they call ``parse_blocks`` and
+query the returned ``HtmlNode`` objects with CSS selectors. The backend is
+chosen with ``SCRAPER_HTML_PARSER``:
+
+- ``html.parser``: BeautifulSoup on the standard library parser.
+- ``lxml``: BeautifulSoup on the lxml tree builder.
+- ``selectolax``: selectolax's lexbor engine, an order of magnitude faster.
+
+The BeautifulSoup backends use a ``SoupStrainer`` so that only the blocks, not
+the whole page, are built into a tree.
+"""
+
+from typing import Any, Final, Protocol
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Comment, NavigableString, Tag
+from django.conf import settings
+from selectolax.lexbor import LexborHTMLParser
+
+BACKENDS: Final = ("html.parser", "lxml", "selectolax")
+
+
+class HtmlNode(Protocol):
+    """An element of a parsed page, independent of the backend."""
+
+    def select(self, selector: str) -> list["HtmlNode"]:
+        """Return the descendants matching a CSS selector."""
+        ...
+
+    def select_one(self, selector: str) -> "HtmlNode | None":
+        """Return the first descendant matching a CSS selector."""
+        ...
+
+    def find_next(self, tag: str) -> "HtmlNode | None":
+        """Return the next element with the given tag name, in document order."""
+        ...
+
+    def text(self) -> str:
+        """Return the text of the element and its descendants."""
+        ...
+
+    def tail(self) -> str:
+        """Return the text right after the element, or ``""``."""
+        ...
+
+    def attr(self, name: str) -> str | None:
+        """Return an attribute value."""
+        ...
+
+
+class _SoupNode:
+    def __init__(self, tag: Tag) -> None:
+        self.tag = tag
+
+    def select(self, selector: str) -> list[HtmlNode]:
+        return [_SoupNode(tag) for tag in self.tag.select(selector)]
+
+    def select_one(self, selector: str) -> HtmlNode | None:
+        tag = self.tag.select_one(selector)
+        return _SoupNode(tag) if tag is not None else None
+
+    def find_next(self, tag: str) -> HtmlNode | None:
+        found = self.tag.find_next(tag)
+        return _SoupNode(found) if isinstance(found, Tag) else None
+
+    def text(self) -> str:
+        return self.tag.get_text()
+
+    def tail(self) -> str:
+        sibling = self.tag.next_sibling
+        if isinstance(sibling, NavigableString) and not isinstance(sibling, Comment):
+            return str(sibling)
+        return ""
+
+    def attr(self, name: str) -> str | None:
+        value = self.tag.get(name)
+        if isinstance(value, list):
+            return " ".join(value)
+        return value
+
+
+class _LexborNode:
+    def __init__(self, node: Any) -> None:
+        self.node = node
+
+    def select(self, selector: str) -> list[HtmlNode]:
+        return [_LexborNode(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector: str) -> HtmlNode | None:
+        node = self.node.css_first(selector)
+        return _LexborNode(node) if node is not None else None
+
+    def find_next(self, tag: str) -> HtmlNode | None:
+        # Walk the descendants, then what follows, like BeautifulSoup.
+        node = self.node
+        while True:
+            if node.child is not None:
+                node = node.child
+            else:
+                while node.next is None:
+                    node = node.parent
+                    if node is None:
+                        return None
+                node = node.next
+            if node.tag == tag:
+                return _LexborNode(node)
+
+    def text(self) -> str:
+        return str(self.node.text(deep=True))
+
+    def tail(self) -> str:
+        sibling = self.node.next
+        if sibling is not None and sibling.is_text_node:
+            return str(sibling.text())
+        return ""
+
+    def attr(self, name: str) -> str | None:
+        value = self.node.attributes.get(name)
+        return str(value) if value is not None else None
+
+
+def parse_blocks(
+    html: str, selector: str, backend: str | None = None
+) -> list[HtmlNode]:
+    """
+    Parse ``html`` and return the elements matching ``selector``.
+
+    ``selector`` is ``tag.class`` or ``.class``; it doubles as the strainer
+    of the BeautifulSoup backends. ``backend`` defaults to
+    ``SCRAPER_HTML_PARSER``.
+    """
+    backend = backend or settings.SCRAPER_HTML_PARSER
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {backend}")
+
+    if backend == "selectolax":
+        return [_LexborNode(node) for node in LexborHTMLParser(html).css(selector)]
+
+    name, _, class_ = selector.partition(".")
+    # The strainer sees the raw attribute, e.g. "card border-primary".
+    strainer = SoupStrainer(
+        name or None, class_=lambda value: value is not None and class_ in value.split()
+    )
+    soup = BeautifulSoup(html, backend, parse_only=strainer)
+    return [_SoupNode(tag) for tag in soup.select(selector)]
@@ -5,14 +5,26 @@ Fetches duty pharmacy data for all districts in Istanbul.
 """
 
 import csv
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any
 from urllib.parse import parse_qs, urlparse
 
-import requests
-from bs4 import BeautifulSoup
-from bs4.element import Tag
+from django.conf import settings
 from django.utils import timezone
+from requests.exceptions import RequestException
+
+from pharmacies import http_client
+from pharmacies.utils.conditional_fetch import ConditionalFetcher, fetch_source
+from pharmacies.utils.html_parser import parse_blocks
+from pharmacies.utils.scraper_registry import get_scraper
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://nobetcieczane.istanbulsaglik.gov.tr:88/"
 API_ENDPOINT = f"{BASE_URL}Home/GetEczaneler"
@@ -113,82 +125,169 @@ def _get_duty_times() -> tuple[datetime, datetime]:
     return duty_start, duty_end
 
 
-def get_istanbul_data() -> list[dict[str, Any]]:
+class _Throttle:
+    """Space out request starts to the same host by a minimum interval."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _fetch_district(
+    district_name: str,
+    throttle: _Throttle,
+    endpoint: str,
+    fetcher: ConditionalFetcher | None = None,
+    scope: str = "",
+) -> str | None:
+    """
+    Return the HTML listing a district's duty pharmacies, or ``None`` if it
+    has not changed since the last persisted scrape.
+
+    ``endpoint`` is the HTTP client endpoint of the registered scraper.
+    """
+    throttle.wait()
+    response = fetch_source(
+        fetcher,
+        district_name,
+        lambda headers: http_client.post(
+            API_ENDPOINT,
+            endpoint=endpoint,
+            params={"ilce": district_name},
+            headers=headers,
+        ),
+        scope,
+    )
+    if response is None:
+        return None
+    response.raise_for_status()
+    return response.text
+
+
+def _parse_district(
+    district_name: str, html_content: str, duty_start: datetime, duty_end: datetime
+) -> list[dict[str, Any]]:
+    """Extract pharmacy details, including coordinates from the map link."""
+    pharmacies: list[dict[str, Any]] = []
+    for card in parse_blocks(html_content, ".card"):
+        pharmacy: dict[str, Any] = {"district": district_name}
+
+        # Extract name
+        name_divs = card.select("div.card-header")
+        if len(name_divs) > 1:
+            name_tag = name_divs[1].select_one("b")
+            pharmacy["name"] = name_tag.text().strip() if name_tag else "N/A"
+        else:
+            pharmacy["name"] = "N/A"
+
+        # Extract phone
+        labels = card.select("label")
+        if len(labels) > 1:
+            phone_tag = labels[1].select_one("a")
+            pharmacy["phone"] = (
+                phone_tag.text().strip().replace(" ", "") if phone_tag else "N/A"
+            )
+        else:
+            pharmacy["phone"] = "N/A"
+
+        # Extract address
+        address_label_tag = card.select_one("i.la.la-home")
+        address_tag = (
+            address_label_tag.find_next("label") if address_label_tag else None
+        )
+        pharmacy["address"] = address_tag.text().strip() if address_tag else "N/A"
+
+        # Extract coordinates
+        directions_tag = card.select_one("a.btn.btn-primary.btn-block")
+        href = directions_tag.attr("href") if directions_tag else None
+        directions_url = href or "N/A"
+
+        coordinates = _get_coordinates_from_sehirharitasi_url(directions_url)
+        if coordinates is None:
+            print(f"Warning: Unable to get coordinates for {pharmacy['name']}")
+            continue
+
+        pharmacy["coordinates"] = coordinates
+
+        # Set duty times
+        pharmacy["duty_start"], pharmacy["duty_end"] = duty_start, duty_end
+        pharmacies.append(pharmacy)
+
+    return pharmacies
+
+
+def get_istanbul_data(
+    fetcher: ConditionalFetcher | None = None,
+) -> Iterator[dict[str, Any]]:
     """
     Scrape pharmacy data for all Istanbul districts.
 
-    Iterates through all districts, posts to the endpoint, parses the HTML response,
-    and extracts pharmacy details including coordinates from the map link.
+    Districts are fetched concurrently, at most the registered scraper
+    ``concurrency`` (``ISTANBUL_SCRAPER_CONCURRENCY``) at a time and with
+    request starts spaced by ``ISTANBUL_SCRAPER_REQUEST_INTERVAL`` seconds,
+    since they all hit the same host. Pharmacies are yielded district by
+    district in ``DISTRICTS`` order as soon as each district is parsed, so
+    the result is the same as fetching them one by one. A district that
+    cannot be fetched is logged and skipped; its pharmacies keep their
+    previous duty times. The first error is raised only if every district
+    failed.
+
+    With a ``fetcher``, districts unchanged within the current duty window are
+    skipped as well.
     """
-    all_pharmacies: list[dict[str, Any]] = []
-
-    for district_name in DISTRICTS:
-        payload = {"ilce": district_name}
-        response = requests.post(API_ENDPOINT, params=payload, timeout=10)
-        response.raise_for_status()
-
-        html_content = response.text
-        soup = BeautifulSoup(html_content, "html.parser")
-        pharmacy_cards = soup.select(".card")
-        for card in pharmacy_cards:
-            pharmacy: dict[str, Any] = {"district": district_name}
-
-            # Extract name
-            name_divs = card.find_all(name="div", class_="card-header")
-            if len(name_divs) > 1:
-                name_tag = name_divs[1].select_one("b")
-                pharmacy["name"] = name_tag.text.strip() if name_tag else "N/A"
-            else:
-                pharmacy["name"] = "N/A"
-
-            # Extract phone
-            labels = card.find_all(name="label")
-            if len(labels) > 1:
-                tel_tag = labels[1]
-                if isinstance(tel_tag, Tag):
-                    phone_tag = tel_tag.select_one("a")
-                    pharmacy["phone"] = (
-                        phone_tag.text.strip().replace(" ", "") if phone_tag else "N/A"
-                    )
-                else:
-                    pharmacy["phone"] = "N/A"
-            else:
-                pharmacy["phone"] = "N/A"
-
-            # Extract address
-            address_label_tag = card.find(name="i", class_="la la-home")
-            if isinstance(address_label_tag, Tag):
-                address_tag = address_label_tag.find_next("label")
-                if address_tag:
-                    pharmacy["address"] = address_tag.text.strip()
-                else:
-                    pharmacy["address"] = "N/A"
-            else:
-                pharmacy["address"] = "N/A"
-
-            # Extract coordinates
-            directions_tag = card.find(name="a", class_="btn btn-primary btn-block")
-            directions_url: str = "N/A"
-
-            if isinstance(directions_tag, Tag):
-                url_val = directions_tag.get("href", "N/A")
-                if isinstance(url_val, list):
-                    directions_url = str(url_val[0])
-                elif url_val is not None:
-                    directions_url = str(url_val)
-
-            coordinates = _get_coordinates_from_sehirharitasi_url(directions_url)
-            if coordinates is None:
-                print(f"Warning: Unable to get coordinates for {pharmacy['name']}")
+    duty_start, duty_end = _get_duty_times()
+    throttle = _Throttle(settings.ISTANBUL_SCRAPER_REQUEST_INTERVAL)
+    if fetcher is not None:
+        fetcher.load()
+
+    spec = get_scraper("istanbul")
+    failures: list[RequestException] = []
+    with ThreadPoolExecutor(
+        max_workers=min(spec.concurrency, len(DISTRICTS)),
+        thread_name_prefix="istanbul-scraper",
+    ) as executor:
+        pending = deque(
+            (
+                district_name,
+                executor.submit(
+                    _fetch_district,
+                    district_name,
+                    throttle,
+                    spec.endpoint,
+                    fetcher,
+                    duty_start.isoformat(),
+                ),
+            )
+            for district_name in DISTRICTS
+        )
+        while pending:
+            # Drop each future once consumed, so its page can be freed.
+            district_name, future = pending.popleft()
+            try:
+                html_content = future.result()
+            except RequestException as exc:
+                logger.warning(
+                    "Failed to fetch Istanbul district %s: %s", district_name, exc
+                )
+                failures.append(exc)
                 continue
+            if html_content is None:
+                continue
+            yield from _parse_district(
+                district_name, html_content, duty_start, duty_end
+            )
 
-            pharmacy["coordinates"] = coordinates
-
-            # Set duty times
-            pharmacy["duty_start"], pharmacy["duty_end"] = _get_duty_times()
-            all_pharmacies.append(pharmacy)
-
-    return all_pharmacies
+    if failures and len(failures) == len(DISTRICTS):
+        raise failures[0]
 
 
 def save_to_csv(data: list[dict[str, Any]], filename: str = "pharmacies.csv") -> None:
@@ -201,6 +300,6 @@ def save_to_csv(data: list[dict[str, Any]], filename: str = "pharmacies.csv") ->
 
 
 if __name__ == "__main__":
-    pharmacies = get_istanbul_data()
+    pharmacies = list(get_istanbul_data())
     save_to_csv(pharmacies)
     print(f"Collected {len(pharmacies)} pharmacy records")
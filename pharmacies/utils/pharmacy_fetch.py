@@ -2,30 +2,55 @@
 Module for fetching pharmacy data from external APIs (Google Places).
 """
 
-from functools import lru_cache
 from typing import Any, cast
 
-import requests
 from django.conf import settings
 from requests.exceptions import HTTPError
 
+from pharmacies import http_client
+from pharmacies.cache import get_cache
+from pharmacies.singleflight import single_flight
 
-@lru_cache(maxsize=1024)
-def _fetch_pharmacy_data(lat: float, lng: float, keyword: str) -> list[dict[str, Any]]:
-    """
-    Perform the actual HTTP request to Google Places API.
+PLACES_NEARBY_SEARCH_URL = (
+    "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+)
 
-    Cached to prevent redundant API calls for the same coordinates.
-    """
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    params = {
+
+def get_places_params(lat: float, lng: float, keyword: str) -> dict[str, str]:
+    """Build the Places Nearby Search query parameters."""
+    return {
         "location": f"{lat},{lng}",
         "rankby": "distance",
         "keyword": keyword,
         "key": settings.GOOGLE_MAPS_API_KEY,
     }
 
-    response = requests.get(url, params=params, timeout=10)
+
+def _fetch_pharmacy_data(lat: float, lng: float, keyword: str) -> list[dict[str, Any]]:
+    """
+    Return Google Places results for a coordinate.
+
+    Results are kept in the shared ``places`` cache to prevent redundant API
+    calls for the same coordinates, and concurrent misses are coalesced into a
+    single request.
+    """
+    key = f"{lat},{lng}:{keyword}"
+    return get_cache("places").get_or_set(
+        key,
+        lambda: single_flight(
+            f"places:{key}", lambda: _request_pharmacy_data(lat, lng, keyword)
+        ),
+    )
+
+
+def _request_pharmacy_data(
+    lat: float, lng: float, keyword: str
+) -> list[dict[str, Any]]:
+    response = http_client.get(
+        PLACES_NEARBY_SEARCH_URL,
+        endpoint="google_places",
+        params=get_places_params(lat, lng, keyword),
+    )
     if response.status_code != 200:
         raise HTTPError(f"API Error: {response.status_code} - {response.text}")
     data = response.json()
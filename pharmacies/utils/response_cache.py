@@ -0,0 +1,63 @@
+"""
+Versioned cache of serialized ``get_pharmacy_points`` responses.
+
+A response only depends on where the user is, whether the city is open or on
+duty, and which duty roster is loaded. Keys therefore combine the quantized
+coordinates, the city status, ``City.roster_version`` (bumped by every
+persisted scrape) and the local date. A scrape or an opening/closing
+transition moves lookups to new keys, so entries never need a short TTL to
+stay correct. Bodies are stored already encoded and written to the response
+as-is.
+"""
+
+import json
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from pharmacies.cache import get_cache
+from pharmacies.models import PharmacyStatus
+from pharmacies.utils.travel_times import quantize_origin
+
+# Number of pharmacies returned by get_pharmacy_points.
+SHOWN_PHARMACIES = 5
+
+
+def get_points_cache_key(
+    lat: float,
+    lng: float,
+    city_name: str,
+    city_status: PharmacyStatus,
+    roster_version: int,
+    query_time: datetime,
+) -> str:
+    """Build the cache key of a pharmacy points response."""
+    cell = quantize_origin(lat, lng, settings.PHARMACY_POINTS_CACHE_PRECISION)
+    # The date separates tonight's duty roster from tomorrow's should a scrape
+    # be missed and the version stay the same.
+    day = timezone.localtime(query_time).date().isoformat()
+    return f"{city_name}:{roster_version}:{city_status}:{day}:{cell}"
+
+
+def get_cached_points(key: str) -> bytes | None:
+    """Return a cached response body, or ``None`` on a miss or when disabled."""
+    if not settings.PHARMACY_POINTS_CACHE_ENABLED:
+        return None
+    body: bytes | None = get_cache("pharmacy_points").get(key)
+    return body
+
+
+def encode_points(points: list[dict[str, Any]]) -> bytes:
+    """Serialize pharmacy points the same way ``JsonResponse`` does."""
+    return json.dumps({"points": points}, cls=DjangoJSONEncoder).encode()
+
+
+def cache_points(key: str, points: list[dict[str, Any]]) -> bytes:
+    """Serialize ``points``, store the body under ``key`` and return it."""
+    body = encode_points(points)
+    if settings.PHARMACY_POINTS_CACHE_ENABLED:
+        get_cache("pharmacy_points").set(key, body)
+    return body
@@ -0,0 +1,204 @@
+"""
+In-memory snapshot of each city's duty roster for nearest-k search.
+
+A city's roster only changes when a scrape is persisted, so the pharmacies that
+are on duty now or later are loaded once into NumPy arrays. Nearest-k lookups
+are then a single vectorized haversine pass without a database round trip.
+Each snapshot records ``City.roster_version``; the version is re-read at most
+every ``ROSTER_SNAPSHOT_VERSION_CHECK_INTERVAL`` seconds and a changed version
+triggers a rebuild. Built snapshots are shared through the ``roster`` cache
+namespace, so after a scrape only one worker loads the roster from the
+database and the others fetch the compressed arrays.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from pharmacies.cache import get_cache
+from pharmacies.models import City, Pharmacy
+from pharmacies.utils.travel_estimator import EARTH_RADIUS_M
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RosterEntry:
+    """Compact metadata for a pharmacy in a roster snapshot."""
+
+    pharmacy_id: int
+    name: str
+    address: str
+
+
+@dataclass(frozen=True, eq=False)
+class RosterSnapshot:
+    """Immutable per-city roster held as parallel arrays."""
+
+    city_name: str
+    version: int
+    built_at: datetime
+    lat: np.ndarray
+    lng: np.ndarray
+    duty_start: np.ndarray
+    duty_end: np.ndarray
+    entries: tuple[RosterEntry, ...]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def covers(self, when: datetime) -> bool:
+        """Whether the snapshot holds every pharmacy on duty at ``when``."""
+        return when >= self.built_at
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        when: datetime,
+        limit: int,
+        radius: float = math.inf,
+    ) -> list[tuple[RosterEntry, float, float, float]]:
+        """
+        Return up to ``limit`` on-duty pharmacies within ``radius`` meters,
+        ordered by distance.
+
+        Each item is ``(entry, pharmacy lat, pharmacy lng, distance in meters)``.
+        """
+        timestamp = when.timestamp()
+        (on_duty,) = np.nonzero(
+            (self.duty_start <= timestamp) & (self.duty_end >= timestamp)
+        )
+        if on_duty.size == 0:
+            return []
+
+        lat_rad = np.radians(self.lat[on_duty])
+        lng_rad = np.radians(self.lng[on_duty])
+        origin_lat = np.radians(lat)
+        a = (
+            np.sin((lat_rad - origin_lat) / 2) ** 2
+            + np.cos(origin_lat)
+            * np.cos(lat_rad)
+            * np.sin((lng_rad - np.radians(lng)) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+        (within,) = np.nonzero(distances <= radius)
+        on_duty, distances = on_duty[within], distances[within]
+        if on_duty.size == 0:
+            return []
+
+        if limit < distances.size:
+            candidates = np.argpartition(distances, limit)[:limit]
+        else:
+            candidates = np.arange(distances.size)
+        ordered = candidates[np.argsort(distances[candidates], kind="stable")]
+
+        return [
+            (
+                self.entries[on_duty[i]],
+                float(self.lat[on_duty[i]]),
+                float(self.lng[on_duty[i]]),
+                float(distances[i]),
+            )
+            for i in ordered
+        ]
+
+
+def build_roster_snapshot(
+    city_name: str, version: int, now: datetime | None = None
+) -> RosterSnapshot:
+    """Load every pharmacy that is on duty now or later into a snapshot."""
+    now = now or timezone.now()
+    rows: Any = (
+        Pharmacy.objects.filter(city__name=city_name, duty_end__gte=now)
+        .order_by("pk")
+        .values_list("pk", "name", "address", "location", "duty_start", "duty_end")
+    )
+    rows = list(rows)
+
+    return RosterSnapshot(
+        city_name=city_name,
+        version=version,
+        built_at=now,
+        lat=np.array([row[3].y for row in rows], dtype=np.float64),
+        lng=np.array([row[3].x for row in rows], dtype=np.float64),
+        duty_start=np.array([row[4].timestamp() for row in rows], dtype=np.float64),
+        duty_end=np.array([row[5].timestamp() for row in rows], dtype=np.float64),
+        entries=tuple(
+            RosterEntry(pharmacy_id=pk, name=name, address=address)
+            for pk, name, address, *_ in rows
+        ),
+    )
+
+
+# city name -> (snapshot, monotonic time of the last version check)
+_snapshots: dict[str, tuple[RosterSnapshot, float]] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _get_roster_version(city_name: str) -> int:
+    return City.objects.values_list("roster_version", flat=True).get(name=city_name)
+
+
+def get_roster_snapshot(city_name: str) -> RosterSnapshot:
+    """
+    Return the current roster snapshot for a city.
+
+    Raises ``City.DoesNotExist`` for unknown cities.
+    """
+    cached = _snapshots.get(city_name)
+    now = time.monotonic()
+    if (
+        cached is not None
+        and now - cached[1] < settings.ROSTER_SNAPSHOT_VERSION_CHECK_INTERVAL
+    ):
+        return cached[0]
+
+    version = _get_roster_version(city_name)
+    if cached is not None and cached[0].version == version:
+        with _snapshots_lock:
+            _snapshots[city_name] = (cached[0], now)
+        return cached[0]
+
+    return rebuild_roster_snapshot(city_name, version=version)
+
+
+def rebuild_roster_snapshot(
+    city_name: str, version: int | None = None
+) -> RosterSnapshot:
+    """
+    Load and store a city's snapshot for ``version``, e.g. right after a scrape.
+
+    The snapshot is taken from the shared ``roster`` cache when another worker
+    has already built it.
+    """
+    loaded_version = _get_roster_version(city_name) if version is None else version
+
+    snapshot = get_cache("roster").get_or_set(
+        f"{city_name}:{loaded_version}",
+        lambda: build_roster_snapshot(city_name, loaded_version),
+    )
+    with _snapshots_lock:
+        _snapshots[city_name] = (snapshot, time.monotonic())
+    logger.info(
+        "Loaded roster snapshot for %s (version %d, %d pharmacies).",
+        city_name,
+        loaded_version,
+        len(snapshot),
+    )
+    return snapshot
+
+
+def reset_roster_snapshots() -> None:
+    """Drop every cached snapshot so the next lookup rebuilds it."""
+    with _snapshots_lock:
+        _snapshots.clear()
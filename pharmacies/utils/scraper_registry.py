@@ -0,0 +1,106 @@
+"""
+Registry of the city scrapers.
+
+Each city maps to a ``ScraperSpec``: the dotted path of its scraper function
+and metadata about the source it reads. Cities come from two places, later
+ones overriding earlier ones:
+
+1. Installed distributions that declare a ``pharmacies.scrapers`` entry point
+   named after the city, e.g. in ``pyproject.toml``::
+
+       [project.entry-points."pharmacies.scrapers"]
+       izmir = "izmir_scraper:get_izmir_data"
+
+2. The ``PHARMACY_SCRAPERS`` setting, keyed by city. An entry may omit
+   ``scraper`` to only change the metadata of an entry point.
+
+Specs only hold import paths: a scraper module, and the parser libraries it
+uses, is imported the first time that city is scraped. Web workers never
+import them.
+
+A scraper is called as ``scraper(fetcher)`` with an optional
+``ConditionalFetcher`` and yields the scraped pharmacies.
+"""
+
+import functools
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, fields
+from importlib.metadata import EntryPoint, entry_points
+from typing import TYPE_CHECKING, Any, Final
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+if TYPE_CHECKING:
+    from pharmacies.utils.conditional_fetch import ConditionalFetcher
+
+ENTRY_POINT_GROUP: Final = "pharmacies.scrapers"
+
+Scraper = Callable[["ConditionalFetcher | None"], Iterable[dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class ScraperSpec:
+    """
+    A city's scraper and what it reads.
+
+    ``scraper`` is a dotted path, or ``module:attr`` as in an entry point.
+    The scraper sends its requests as the http_client ``endpoint``, which
+    selects their timeout.
+    """
+
+    city: str
+    scraper: str
+    endpoint: str = "default"
+    source: str = ""
+    concurrency: int = 1
+
+    def load(self) -> Scraper:
+        """Import and return the scraper function."""
+        if ":" in self.scraper:
+            scraper: Scraper = EntryPoint(
+                self.city, self.scraper, ENTRY_POINT_GROUP
+            ).load()
+        else:
+            scraper = import_string(self.scraper)
+        return scraper
+
+
+@functools.cache
+def _entry_point_specs() -> dict[str, ScraperSpec]:
+    # EntryPoint.value is read without importing the module.
+    return {
+        entry_point.name: ScraperSpec(city=entry_point.name, scraper=entry_point.value)
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP)
+    }
+
+
+def get_scrapers() -> dict[str, ScraperSpec]:
+    """Return the registered scrapers by city name."""
+    specs = dict(_entry_point_specs())
+    allowed = {field.name for field in fields(ScraperSpec)} - {"city"}
+    for city, options in settings.PHARMACY_SCRAPERS.items():
+        unknown = options.keys() - allowed
+        if unknown:
+            raise ValueError(
+                f"Unknown PHARMACY_SCRAPERS options for {city}: {sorted(unknown)}"
+            )
+        base = specs.get(city)
+        if base is None and "scraper" not in options:
+            raise ValueError(f"PHARMACY_SCRAPERS entry for {city} has no scraper")
+        base_options = {} if base is None else vars(base)
+        specs[city] = ScraperSpec(**{**base_options, **options, "city": city})
+    return specs
+
+
+def get_scraper(city_name: str) -> ScraperSpec:
+    """Return the spec of a city's scraper; raises ``ValueError`` if none."""
+    spec = get_scrapers().get(city_name)
+    if spec is None:
+        raise ValueError("Unknown city")
+    return spec
+
+
+def reset_scraper_registry() -> None:
+    """Forget the discovered entry points; used by tests."""
+    _entry_point_specs.cache_clear()
@@ -0,0 +1,212 @@
+"""
+Local travel-time estimator calibrated from stored Distance Matrix results.
+
+The estimator scales the straight-line distance by a detour factor and divides
+the result by an average speed. Both parameters are fitted per city and per
+time-of-day bucket from Distance Matrix responses we already stored (the
+``TravelTime`` table or recorded API snapshots), so travel metrics can be
+produced in microseconds without calling Google.
+"""
+
+import math
+import statistics
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Final, NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from pharmacies.cache import get_cache
+from pharmacies.models import City, TravelTime, TravelTimeCalibration
+
+EARTH_RADIUS_M: Final = 6_371_008.8
+
+# (first local hour, bucket name) pairs, in ascending order.
+TIME_BUCKETS: Final[tuple[tuple[int, str], ...]] = (
+    (0, "night"),
+    (7, "morning_peak"),
+    (10, "daytime"),
+    (17, "evening_peak"),
+    (20, "evening"),
+)
+
+# Pairs closer than this are dominated by geocoding noise and skipped.
+MIN_STRAIGHT_DISTANCE_M: Final = 50.0
+
+
+class TravelSample(NamedTuple):
+    """A single observed trip used to fit the estimator."""
+
+    city: str
+    time_bucket: str
+    straight_distance: float
+    road_distance: float
+    duration: float
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """Fitted estimator parameters for a city and time bucket."""
+
+    detour_factor: float
+    speed: float
+    sample_count: int
+
+
+def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Return the great-circle distance between two coordinates in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def get_time_bucket(when: datetime) -> str:
+    """Return the time-of-day bucket for ``when`` in local time."""
+    hour = timezone.localtime(when).hour if timezone.is_aware(when) else when.hour
+    bucket = TIME_BUCKETS[0][1]
+    for start_hour, name in TIME_BUCKETS:
+        if hour >= start_hour:
+            bucket = name
+    return bucket
+
+
+def _fit(samples: list[TravelSample]) -> Calibration:
+    detour_factor = statistics.median(
+        s.road_distance / s.straight_distance for s in samples
+    )
+    speed = sum(s.road_distance for s in samples) / sum(s.duration for s in samples)
+    return Calibration(
+        detour_factor=max(detour_factor, 1.0), speed=speed, sample_count=len(samples)
+    )
+
+
+def fit_calibrations(
+    samples: Iterable[TravelSample],
+) -> dict[tuple[str, str], Calibration]:
+    """
+    Fit detour factors and speeds per ``(city, time_bucket)``.
+
+    Every sample also contributes to its city's all-day fit (``time_bucket``
+    ``""``), which is used when a bucket has no data.
+    """
+    groups: dict[tuple[str, str], list[TravelSample]] = defaultdict(list)
+    for sample in samples:
+        if (
+            sample.straight_distance < MIN_STRAIGHT_DISTANCE_M
+            or sample.road_distance <= 0
+            or sample.duration <= 0
+        ):
+            continue
+        groups[(sample.city, "")].append(sample)
+        if sample.time_bucket:
+            groups[(sample.city, sample.time_bucket)].append(sample)
+
+    return {key: _fit(group) for key, group in groups.items()}
+
+
+def collect_travel_time_samples() -> Iterator[TravelSample]:
+    """Yield samples from the durable ``TravelTime`` cache table."""
+    rows = TravelTime.objects.values_list(
+        "origin_cell",
+        "pharmacy__location",
+        "pharmacy__city__name",
+        "distance",
+        "duration",
+        "updated_at",
+    )
+    for (
+        origin_cell,
+        location,
+        city_name,
+        distance,
+        duration,
+        updated_at,
+    ) in rows.iterator():
+        origin_lat, origin_lng = (float(value) for value in origin_cell.split(","))
+        yield TravelSample(
+            city=city_name,
+            time_bucket=get_time_bucket(updated_at),
+            straight_distance=haversine_distance(
+                origin_lat, origin_lng, location.y, location.x
+            ),
+            road_distance=distance,
+            duration=duration,
+        )
+
+
+def save_calibrations(calibrations: dict[tuple[str, str], Calibration]) -> int:
+    """Persist fitted calibrations, replacing earlier fits. Returns rows saved."""
+    cities = {city.name: city for city in City.objects.all()}
+    saved = 0
+
+    with transaction.atomic():
+        for (city_name, time_bucket), calibration in calibrations.items():
+            city = cities.get(city_name)
+            if city is None:
+                continue
+            TravelTimeCalibration.objects.update_or_create(
+                city=city,
+                time_bucket=time_bucket,
+                defaults={
+                    "detour_factor": calibration.detour_factor,
+                    "speed": calibration.speed,
+                    "sample_count": calibration.sample_count,
+                },
+            )
+            saved += 1
+
+    get_cache("travel_estimator").set("calibrations", _load_calibrations())
+    return saved
+
+
+def _load_calibrations() -> dict[tuple[str, str], tuple[float, float]]:
+    rows: Any = TravelTimeCalibration.objects.values_list(
+        "city__name", "time_bucket", "detour_factor", "speed"
+    )
+    return {
+        (city_name, time_bucket): (detour_factor, speed)
+        for city_name, time_bucket, detour_factor, speed in rows
+    }
+
+
+def _get_parameters(city: str | None, time_bucket: str) -> tuple[float, float]:
+    if city is not None:
+        calibrations = get_cache("travel_estimator").get_or_set(
+            "calibrations", _load_calibrations
+        )
+        for key in ((city, time_bucket), (city, "")):
+            if key in calibrations:
+                return calibrations[key]
+
+    return (
+        settings.TRAVEL_ESTIMATOR_DEFAULT_DETOUR_FACTOR,
+        settings.TRAVEL_ESTIMATOR_DEFAULT_SPEED,
+    )
+
+
+def estimate_travel(
+    origin_lat: float,
+    origin_lng: float,
+    destination_lat: float,
+    destination_lng: float,
+    city: str | None = None,
+    when: datetime | None = None,
+) -> tuple[int, int]:
+    """Estimate ``(road distance in meters, duration in seconds)`` for a trip."""
+    detour_factor, speed = _get_parameters(
+        city, get_time_bucket(when or timezone.now())
+    )
+    road_distance = (
+        haversine_distance(origin_lat, origin_lng, destination_lat, destination_lng)
+        * detour_factor
+    )
+    return round(road_distance), round(road_distance / speed)
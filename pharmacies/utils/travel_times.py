@@ -0,0 +1,69 @@
+"""
+Durable cache of travel metrics between origin cells and pharmacies.
+
+Distance Matrix results are stored per (quantized origin cell, pharmacy) pair
+in the ``TravelTime`` table, so they survive restarts and are reused when a
+user moves a few meters or only part of the duty roster changes.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from pharmacies.models import TravelTime
+
+
+def quantize_origin(lat: float, lng: float, precision: int | None = None) -> str:
+    """
+    Map a coordinate onto its origin cell key.
+
+    ``precision`` defaults to ``TRAVEL_TIME_CELL_PRECISION``; 3 decimal places
+    give cells of roughly 110 m x 85 m at Turkish latitudes.
+    """
+    if precision is None:
+        precision = settings.TRAVEL_TIME_CELL_PRECISION
+    return (
+        f"{round(lat, precision):.{precision}f},{round(lng, precision):.{precision}f}"
+    )
+
+
+def get_cached_travel_times(
+    origin_cell: str, pharmacy_ids: list[int]
+) -> dict[int, tuple[int, int]]:
+    """Return fresh ``{pharmacy_id: (distance, duration)}`` pairs for a cell."""
+    if not pharmacy_ids:
+        return {}
+
+    fresh_after = timezone.now() - timedelta(seconds=settings.TRAVEL_TIME_CACHE_TTL)
+    rows = TravelTime.objects.filter(
+        origin_cell=origin_cell,
+        pharmacy_id__in=pharmacy_ids,
+        updated_at__gte=fresh_after,
+    ).values_list("pharmacy_id", "distance", "duration")
+    return {
+        pharmacy_id: (distance, duration) for pharmacy_id, distance, duration in rows
+    }
+
+
+def store_travel_times(
+    origin_cell: str, travel_times: dict[int, tuple[int, int]]
+) -> None:
+    """Insert or refresh travel metrics for a cell in a single query."""
+    if not travel_times:
+        return
+
+    TravelTime.objects.bulk_create(
+        [
+            TravelTime(
+                origin_cell=origin_cell,
+                pharmacy_id=pharmacy_id,
+                distance=distance,
+                duration=duration,
+            )
+            for pharmacy_id, (distance, duration) in travel_times.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["origin_cell", "pharmacy"],
+        update_fields=["distance", "duration", "updated_at"],
+    )
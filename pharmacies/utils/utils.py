@@ -5,20 +5,54 @@ This module provides helpers for scraping, geospatial calculations,
 and interacting with the Google Maps API.
 """
 
+import logging
+import math
+from collections.abc import Iterable
 from datetime import datetime, timedelta
 from enum import Enum
-from functools import lru_cache
+from itertools import batched
 from typing import Any, cast
 
 import requests
 from django.conf import settings
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.db import transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
 from django.utils import timezone
 
+from pharmacies import http_client
+from pharmacies.cache import get_cache
 from pharmacies.models import City, Pharmacy
-from pharmacies.utils import get_ankara_data, get_eskisehir_data, get_istanbul_data
+from pharmacies.singleflight import single_flight
+from pharmacies.utils.city_registry import get_city_names, invalidate_city_registry
+from pharmacies.utils.city_resolver import (
+    is_in_service_area,
+    reset_city_boundary_index,
+    resolve_city_from_boundaries,
+)
+from pharmacies.utils.conditional_fetch import ConditionalFetcher
 from pharmacies.utils.pharmacy_fetch import fetch_nearest_pharmacies
+from pharmacies.utils.roster_snapshot import (
+    RosterEntry,
+    get_roster_snapshot,
+    reset_roster_snapshots,
+)
+from pharmacies.utils.scraper_registry import get_scraper
+from pharmacies.utils.travel_estimator import estimate_travel
+from pharmacies.utils.travel_times import (
+    get_cached_travel_times,
+    quantize_origin,
+    store_travel_times,
+)
+
+logger = logging.getLogger(__name__)
+
+# Meters; duty pharmacies further away than this are never suggested.
+DEFAULT_DUTY_SEARCH_RADIUS = 100_000
+METERS_PER_DEGREE = 111_320
 
 
 def get_nearest_pharmacies_open(
@@ -42,7 +76,7 @@ def get_nearest_pharmacies_on_duty(
     lat: float | None = None,
     lng: float | None = None,
     city: str | None = None,
-    radius: int = 100_000,
+    radius: int = DEFAULT_DUTY_SEARCH_RADIUS,
     limit: int = 5,
     time: datetime | None = None,
 ) -> list[dict[str, Any]]:
@@ -50,7 +84,8 @@ def get_nearest_pharmacies_on_duty(
     Get nearest duty pharmacies (Nöbetçi Eczane) for a given location and time.
 
     1. Checks if the city and coordinates are valid.
-    2. Filters pharmacies in the database that are on duty at the specified time.
+    2. Filters pharmacies that are on duty at the specified time, using the
+       city's in-memory roster snapshot when enabled and the database otherwise.
     3. Sorts by distance and calculates travel metrics using Google Maps.
     """
     if city is None:
@@ -62,31 +97,87 @@ def get_nearest_pharmacies_on_duty(
     if time is None:
         time = timezone.now()
 
-    city_object = City.objects.get(name=city)
+    pharmacy_data = find_pharmacies_on_duty(lat, lng, city, time, limit, radius)
+    add_travel_distances_to_pharmacy_data(
+        lat=lat, lng=lng, pharmacy_data=pharmacy_data, city=city, when=time
+    )
+    order_data_by_distance(pharmacy_data)
 
-    if city_object is None:
-        raise ValueError("City not found")
+    return pharmacy_data[:limit]
 
-    user_location = Point(float(lng), float(lat), srid=4326)
 
-    near_pharmacies_on_duty = Pharmacy.objects.filter(city=city_object)
-    near_pharmacies_on_duty = near_pharmacies_on_duty.filter(
-        duty_start__lte=time, duty_end__gte=time
-    )
-    near_pharmacies_on_duty = near_pharmacies_on_duty.annotate(
-        distance=Distance("location", user_location)
-    )
-    near_pharmacies_on_duty = near_pharmacies_on_duty.order_by("distance")
-    near_pharmacies_on_duty = near_pharmacies_on_duty[: limit * 2]
+def find_pharmacies_on_duty(
+    lat: float,
+    lng: float,
+    city: str,
+    time: datetime,
+    limit: int,
+    radius: float = DEFAULT_DUTY_SEARCH_RADIUS,
+) -> list[dict[str, Any]]:
+    """
+    Return map points for up to ``limit * 2`` duty pharmacies nearest to a point.
+
+    Travel metrics are not added; callers re-rank by travel distance.
+    """
+    snapshot = get_roster_snapshot(city) if settings.ROSTER_SNAPSHOT_ENABLED else None
+    if snapshot is not None and snapshot.covers(time):
+        pharmacy_data = get_map_points_from_roster_snapshot(
+            snapshot.nearest(float(lat), float(lng), time, limit * 2, radius)
+        )
+    else:
+        pharmacy_data = _query_nearest_pharmacies_on_duty(
+            lat, lng, city, time, limit, radius
+        )
 
-    if near_pharmacies_on_duty.count() == 0:
+    if not pharmacy_data:
         raise ValueError("No pharmacies are on duty at this time.")
 
-    pharmacy_data = get_map_points_from_pharmacies(near_pharmacies_on_duty)
-    add_travel_distances_to_pharmacy_data(lat=lat, lng=lng, pharmacy_data=pharmacy_data)
-    order_data_by_distance(pharmacy_data)
+    return pharmacy_data
 
-    return pharmacy_data[:limit]
+
+def _radius_in_degrees(lat: float, radius: float) -> float:
+    """
+    Convert a radius in meters into a degree distance that covers it.
+
+    A degree of longitude shrinks with latitude, so the longitude scale gives
+    the larger (safe) value. Used as an index-assisted prefilter only.
+    """
+    meters_per_degree = METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+    return radius / meters_per_degree * 1.01
+
+
+def _query_nearest_pharmacies_on_duty(
+    lat: float, lng: float, city: str, time: datetime, limit: int, radius: float
+) -> list[dict[str, Any]]:
+    """
+    Find the nearest duty pharmacies with a single PostGIS query.
+
+    ``ST_DWithin`` on the GiST-indexed geometry narrows the candidates, the
+    exact spheroid distance enforces ``radius`` in meters, and the ``<->``
+    KNN operator orders the rows through the index. KNN orders by planar
+    degree distance, so the few returned rows are re-sorted by meters.
+    """
+    user_location = Point(float(lng), float(lat), srid=4326)
+    knn_order = RawSQL(
+        f'"{Pharmacy._meta.db_table}"."location" '
+        "<-> ST_SetSRID(ST_MakePoint(%s, %s), 4326)",
+        (float(lng), float(lat)),
+    )
+
+    near_pharmacies_on_duty = list(
+        Pharmacy.objects.filter(
+            city__name=city,
+            duty_start__lte=time,
+            duty_end__gte=time,
+            location__dwithin=(user_location, _radius_in_degrees(float(lat), radius)),
+            location__distance_lte=(user_location, D(m=radius)),
+        )
+        .annotate(distance=Distance("location", user_location))
+        .order_by(knn_order)[: limit * 2]
+    )
+    near_pharmacies_on_duty.sort(key=lambda pharmacy: pharmacy.distance.m)
+
+    return get_map_points_from_pharmacies(near_pharmacies_on_duty)
 
 
 def get_coordinates_from_google_maps_url(url: str) -> dict[str, float]:
@@ -133,6 +224,7 @@ def get_map_points_from_pharmacies(pharmacies: Any) -> list[dict[str, Any]]:
                 "lat": pharmacy.location.coords[1],
                 "lng": pharmacy.location.coords[0],
             },
+            "pharmacy_id": pharmacy.pk,
             "title": pharmacy.name,
             "address": pharmacy.address,
             "status": "Nöbetçi",
@@ -143,6 +235,23 @@ def get_map_points_from_pharmacies(pharmacies: Any) -> list[dict[str, Any]]:
     return points
 
 
+def get_map_points_from_roster_snapshot(
+    nearest: list[tuple[RosterEntry, float, float, float]],
+) -> list[dict[str, Any]]:
+    """Convert roster snapshot matches into the same map points as the DB path."""
+    return [
+        {
+            "position": {"lat": pharmacy_lat, "lng": pharmacy_lng},
+            "pharmacy_id": entry.pharmacy_id,
+            "title": entry.name,
+            "address": entry.address,
+            "status": "Nöbetçi",
+            "distance": round(distance),
+        }
+        for entry, pharmacy_lat, pharmacy_lng, distance in nearest
+    ]
+
+
 class ScrapedDataStatus(Enum):
     """Enum for the status of scraped data (New or Old)."""
 
@@ -182,39 +291,34 @@ def check_scraped_data_age(
     return ScrapedDataStatus.OLD
 
 
-def get_city_data(city_name: str) -> list[dict[str, Any]]:
+def get_city_data(
+    city_name: str, fetcher: ConditionalFetcher | None = None
+) -> Iterable[dict[str, Any]]:
     """
-    Dispatcher function to call the appropriate scraper for a given city.
-    """
-    if city_name == "eskisehir":
-        return get_eskisehir_data()
-
-    if city_name == "istanbul":
-        return get_istanbul_data()
+    Dispatcher function to call the registered scraper for a given city.
 
-    if city_name == "ankara":
-        return get_ankara_data()
-
-    raise ValueError("Unknown city")
-
-
-def add_scraped_data_to_db(scraped_data: list[dict[str, Any]], city_name: str) -> None:
+    The scraper module is imported on first use (see
+    ``pharmacies.utils.scraper_registry``). Scrapers yield their records, so
+    nothing is fetched until the result is iterated. With a ``fetcher``,
+    sources that have not changed since the last persisted scrape are skipped.
     """
-    Save scraped pharmacy data to the database.
+    return get_scraper(city_name).load()(fetcher)
 
-    Updates existing pharmacies or creates new ones. Optimized using bulk operations.
-    """
-    city: City = City.objects.get(name=city_name)
-    if not city:
-        raise ValueError("City not found")
 
-    existing_pharmacies = Pharmacy.objects.filter(city=city)
-    pharmacy_map = {(p.name, p.phone): p for p in existing_pharmacies}
+def save_pharmacy_chunk(city: City, chunk: tuple[dict[str, Any], ...]) -> int:
+    """Create or update the pharmacies of one chunk; return how many were new."""
+    names = {item["name"] for item in chunk}
+    pharmacy_map = {
+        (p.name, p.phone): p
+        for p in Pharmacy.objects.filter(city=city, name__in=names).only(
+            "pk", "name", "phone"
+        )
+    }
 
     pharmacies_to_create = []
     pharmacies_to_update = []
 
-    for item in scraped_data:
+    for item in chunk:
         key = (item["name"], item["phone"])
         existing_pharmacy = pharmacy_map.get(key)
 
@@ -240,9 +344,62 @@ def add_scraped_data_to_db(scraped_data: list[dict[str, Any]], city_name: str) -
 
     Pharmacy.objects.bulk_create(pharmacies_to_create, ignore_conflicts=True)
     Pharmacy.objects.bulk_update(pharmacies_to_update, ["duty_start", "duty_end"])
+    return len(pharmacies_to_create)
+
+
+def add_scraped_data_to_db(
+    scraped_data: Iterable[dict[str, Any]],
+    city_name: str,
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Save scraped pharmacy data to the database.
+
+    Updates existing pharmacies or creates new ones. Records are consumed in
+    chunks of ``chunk_size`` (default ``SCRAPER_PERSIST_CHUNK_SIZE``), so a
+    scraper can yield them as it goes: each chunk looks up only its own
+    pharmacies and is written with one bulk create and one bulk update, and
+    memory is bounded by the chunk rather than the city. Call it inside a
+    transaction to make a whole scrape atomic.
+
+    Returns the number of records saved; the roster version is only bumped
+    when there was at least one.
+    """
+    city: City = City.objects.get(name=city_name)
+    if not city:
+        raise ValueError("City not found")
+
+    saved = created = 0
+    for chunk in batched(
+        scraped_data, chunk_size or settings.SCRAPER_PERSIST_CHUNK_SIZE
+    ):
+        created += save_pharmacy_chunk(city, chunk)
+        saved += len(chunk)
+    if not saved:
+        return 0
+
+    publish_roster_update(city, created=bool(created))
+    return saved
 
 
-def _parse_location_identifier(data: dict[str, Any]) -> str:
+def publish_roster_update(city: City, created: bool) -> None:
+    """
+    Bump the city's roster version after its pharmacies were saved, and reset
+    the in-process caches that depend on it once the transaction commits.
+
+    ``created`` tells whether new pharmacies were added.
+    """
+    City.objects.filter(pk=city.pk).update(roster_version=F("roster_version") + 1)
+    # Announce the new roster only once it is visible to other connections;
+    # a worker reloading earlier would cache the old version as current.
+    transaction.on_commit(reset_roster_snapshots)
+    transaction.on_commit(invalidate_city_registry)
+    if created:
+        # New pharmacies can widen the service area of cities without a boundary.
+        transaction.on_commit(reset_city_boundary_index)
+
+
+def parse_location_identifier(data: dict[str, Any]) -> str:
     """Extract a location identifier (compound code or admin area) from Geocoding results."""
     if data["status"] != "OK" or not data["results"]:
         raise ValueError("Unable to parse_location_identifier: status is not OK")
@@ -258,33 +415,81 @@ def _parse_location_identifier(data: dict[str, Any]) -> str:
     raise ValueError("Unable to parse_location_identifier")
 
 
-@lru_cache(maxsize=1024)
-def get_city_name_from_location(lat: float, lng: float) -> str:
-    """Retrieve city name using Google Maps Geocoding API"""
+def _geocode_location_identifier(lat: float, lng: float) -> str:
+    """Fetch the location identifier for a coordinate from the Geocoding API."""
     url = f"https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lng}&key={settings.GOOGLE_MAPS_API_KEY}"
 
-    response = requests.get(url, timeout=10)
+    response = http_client.get(url, endpoint="google_geocode")
     response.raise_for_status()
-    data = response.json()
+    return _check_geocode_response(response.json())
 
+
+def _check_geocode_response(data: dict[str, Any]) -> str:
+    """Validate a Geocoding API response and return its location identifier."""
     if data["status"] != "OK" or not data["results"]:
         raise ValueError("Unable to retrieve city name: status is not OK")
 
-    city_data = _parse_location_identifier(data)
-    normalized_data = normalize_string(city_data)
+    return parse_location_identifier(data)
+
 
-    known_cities = list(City.objects.values_list("name", flat=True))
+def match_city_name(location_identifier: str) -> str:
+    """Return the known city whose name appears in a geocoded identifier."""
+    normalized_data = normalize_string(location_identifier)
 
-    for city_slug in known_cities:
+    for city_slug in get_city_names():
         if normalize_string(city_slug) in normalized_data:
             return city_slug
 
-    raise ValueError(f"Unknown city: {city_data}")
+    raise ValueError(f"Unknown city: {location_identifier}")
+
+
+def get_city_name_from_location(lat: float, lng: float) -> str:
+    """
+    Retrieve the city slug for a coordinate.
+
+    Points outside the service area of every supported city are rejected
+    without any external call. Cities with a stored boundary are resolved
+    locally first. Points outside every boundary fall back to the Google Maps
+    Geocoding API when ``CITY_RESOLVER_GOOGLE_FALLBACK`` is enabled.
+
+    The geocoded location identifier is stored in the shared ``geocode`` cache,
+    so the Geocoding API is only called when no worker has resolved the
+    coordinate before. Matching against known cities happens on every call,
+    which lets newly added cities resolve without flushing the cache.
+    """
+    if not is_in_service_area(lat, lng):
+        raise ValueError(f"Unknown city: {lat},{lng}")
+
+    city_name = resolve_city_from_boundaries(lat, lng)
+    if city_name is not None:
+        return city_name
+
+    if not settings.CITY_RESOLVER_GOOGLE_FALLBACK:
+        raise ValueError(f"Unknown city: {lat},{lng}")
+
+    key = f"{lat},{lng}"
+    city_data = get_cache("geocode").get_or_set(
+        key,
+        lambda: single_flight(
+            f"geocode:{key}", lambda: _geocode_location_identifier(lat, lng)
+        ),
+    )
+    return match_city_name(city_data)
 
 
-@lru_cache(maxsize=1024)
 def _get_distance_matrix_data(origins: str, destinations: str) -> dict[str, Any]:
     """Fetch distance matrix data from Google Maps API (Cached)."""
+    key = f"{origins}:{destinations}"
+    return get_cache("distance_matrix").get_or_set(
+        key,
+        lambda: single_flight(
+            f"distance_matrix:{key}",
+            lambda: _request_distance_matrix_data(origins, destinations),
+        ),
+    )
+
+
+def _request_distance_matrix_data(origins: str, destinations: str) -> dict[str, Any]:
     url = (
         "https://maps.googleapis.com/maps/api/distancematrix/json"
         f"?origins={origins}"
@@ -292,43 +497,164 @@ def _get_distance_matrix_data(origins: str, destinations: str) -> dict[str, Any]
         f"&key={settings.GOOGLE_MAPS_API_KEY}"
     )
 
-    response = requests.get(url, timeout=10)
+    response = http_client.get(url, endpoint="google_distance_matrix")
     response.raise_for_status()
-    received_data = response.json()
+    return _check_distance_matrix_response(response.json())
 
+
+def _check_distance_matrix_response(received_data: Any) -> dict[str, Any]:
+    """Raise ``ValueError`` unless a Distance Matrix response is OK."""
     if received_data["status"] != "OK":
         raise ValueError(f"Distance Matrix API error: {received_data['status']}")
 
     return cast(dict[str, Any], received_data)
 
 
-def add_travel_distances_to_pharmacy_data(
-    lat: float, lng: float, pharmacy_data: list[dict[str, Any]]
+def _add_estimated_travel(
+    lat: float,
+    lng: float,
+    pharmacy_item: dict[str, Any],
+    city: str | None,
+    when: datetime | None,
 ) -> None:
+    """Fill travel metrics for one point from the local estimator."""
+    pharmacy_item["travel_distance"], pharmacy_item["travel_duration"] = (
+        estimate_travel(
+            lat,
+            lng,
+            pharmacy_item["position"]["lat"],
+            pharmacy_item["position"]["lng"],
+            city=city,
+            when=when,
+        )
+    )
+
+
+def add_estimated_travel_distances(
+    lat: float,
+    lng: float,
+    pharmacy_data: list[dict[str, Any]],
+    city: str | None = None,
+    when: datetime | None = None,
+) -> None:
+    """Fill travel metrics for every point from the local estimator."""
+    for pharmacy_item in pharmacy_data:
+        _add_estimated_travel(lat, lng, pharmacy_item, city, when)
+
+
+def fill_cached_travel_distances(
+    lat: float, lng: float, pharmacy_data: list[dict[str, Any]]
+) -> tuple[str, list[dict[str, Any]]]:
     """
-    Get travel distances from origin to multiple destinations
-    using Google Maps Distance Matrix API. And add them to data list.
+    Fill travel metrics from the durable travel-time cache.
+
+    Returns the origin cell and the points that still need a Distance Matrix
+    lookup.
     """
+    origin_cell = quantize_origin(lat, lng)
+    pharmacy_ids = [d["pharmacy_id"] for d in pharmacy_data if d.get("pharmacy_id")]
+    cached_travel_times = get_cached_travel_times(origin_cell, pharmacy_ids)
+
+    missing_data = []
+    for pharmacy_item in pharmacy_data:
+        pharmacy_id = pharmacy_item.get("pharmacy_id")
+        cached = cached_travel_times.get(pharmacy_id) if pharmacy_id else None
+        if cached is None:
+            missing_data.append(pharmacy_item)
+        else:
+            pharmacy_item["travel_distance"], pharmacy_item["travel_duration"] = cached
 
-    if not pharmacy_data:
-        raise ValueError("Cannot retrieve travel distances. Pharmacy data is empty!")
+    return origin_cell, missing_data
 
+
+def format_distance_matrix_query(
+    lat: float, lng: float, pharmacy_data: list[dict[str, Any]]
+) -> tuple[str, str]:
+    """Return the ``(origins, destinations)`` parameters for a Distance Matrix call."""
     destinations_str = "|".join(
         f"{d['position']['lat']},{d['position']['lng']}" for d in pharmacy_data
     )
-    origin_str = f"{lat},{lng}"
+    return f"{lat},{lng}", destinations_str
 
-    received_data = _get_distance_matrix_data(
-        origins=origin_str, destinations=destinations_str
-    )
 
+def apply_distance_matrix_data(
+    lat: float,
+    lng: float,
+    origin_cell: str,
+    pharmacy_data: list[dict[str, Any]],
+    received_data: dict[str, Any],
+    city: str | None = None,
+    when: datetime | None = None,
+) -> None:
+    """
+    Copy Distance Matrix elements onto the points and store them in the
+    durable cache. Elements Google could not route are estimated locally.
+    """
+    fetched_travel_times: dict[int, tuple[int, int]] = {}
     for pharmacy_item, row in zip(pharmacy_data, received_data["rows"][0]["elements"]):
         if row["status"] == "OK":
             pharmacy_item["travel_distance"] = row["distance"]["value"]
             pharmacy_item["travel_duration"] = row["duration"]["value"]
+            if pharmacy_item.get("pharmacy_id"):
+                fetched_travel_times[pharmacy_item["pharmacy_id"]] = (
+                    row["distance"]["value"],
+                    row["duration"]["value"],
+                )
         else:
-            pharmacy_item["travel_distance"] = pharmacy_item["distance"]
-            pharmacy_item["travel_duration"] = (pharmacy_item["distance"] / 1000) * 60
+            _add_estimated_travel(lat, lng, pharmacy_item, city, when)
+
+    store_travel_times(origin_cell, fetched_travel_times)
+
+
+def add_travel_distances_to_pharmacy_data(
+    lat: float,
+    lng: float,
+    pharmacy_data: list[dict[str, Any]],
+    city: str | None = None,
+    when: datetime | None = None,
+) -> None:
+    """
+    Get travel distances from origin to multiple destinations
+    using Google Maps Distance Matrix API. And add them to data list.
+
+    Points that carry a ``pharmacy_id`` are looked up in the durable
+    travel-time cache for the origin's cell first; only the missing
+    destinations are sent to the Distance Matrix API, and their results are
+    stored for later requests.
+
+    With ``TRAVEL_TIME_MODE = "local"`` every point is estimated locally. In
+    ``"google"`` mode the calibrated estimator fills in elements that Google
+    could not route and covers a failed or timed-out Distance Matrix call.
+    """
+
+    if not pharmacy_data:
+        raise ValueError("Cannot retrieve travel distances. Pharmacy data is empty!")
+
+    if settings.TRAVEL_TIME_MODE == "local":
+        add_estimated_travel_distances(lat, lng, pharmacy_data, city, when)
+        return
+
+    origin_cell, missing_data = fill_cached_travel_distances(lat, lng, pharmacy_data)
+    if not missing_data:
+        return
+
+    origin_str, destinations_str = format_distance_matrix_query(lat, lng, missing_data)
+
+    try:
+        received_data = _get_distance_matrix_data(
+            origins=origin_str, destinations=destinations_str
+        )
+    except (requests.RequestException, ValueError):
+        logger.warning(
+            "Distance Matrix lookup failed; using local travel estimates.",
+            exc_info=True,
+        )
+        add_estimated_travel_distances(lat, lng, missing_data, city, when)
+        return
+
+    apply_distance_matrix_data(
+        lat, lng, origin_cell, missing_data, received_data, city, when
+    )
 
 
 def order_data_by_distance(pharmacy_data: list[dict[str, Any]]) -> None:
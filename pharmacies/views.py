@@ -7,38 +7,61 @@ This module handles the HTTP requests for pharmacy data, including:
 - Proxying requests to the Google Maps API.
 """
 
+import hashlib
 import logging
-from datetime import timedelta
-from json import JSONDecodeError, loads
+import re
+from datetime import datetime, timedelta
+from json import JSONDecodeError, dumps, loads
+from typing import Any
 
+import httpx
 import requests
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
+from django.utils.cache import (
+    add_never_cache_headers,
+    get_conditional_response,
+    patch_cache_control,
+    patch_response_headers,
+    patch_vary_headers,
+)
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_safe
 
-from pharmacies.models import City, PharmacyStatus
+from pharmacies import http_client
+from pharmacies.models import City, PharmacyStatus, ScraperConfig
 from pharmacies.utils import (
+    async_pipeline,
     get_city_name_from_location,
     get_nearest_pharmacies_on_duty,
     get_nearest_pharmacies_open,
     round_lat_lng,
 )
+from pharmacies.utils.batch_points import get_batch_pharmacy_points
+from pharmacies.utils.city_registry import get_city
+from pharmacies.utils.duty_geojson import get_duty_geojson
+from pharmacies.utils.hot_cells import record_request
+from pharmacies.utils.response_cache import (
+    SHOWN_PHARMACIES,
+    cache_points,
+    get_cached_points,
+    get_points_cache_key,
+)
 
 logger = logging.getLogger(__name__)
 
 TEST_TIME = timezone.now() + timedelta(hours=10)
-SHOWN_PHARMACIES = 5
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
 
 
-def get_pharmacy_points(request: HttpRequest) -> JsonResponse:
+def _parse_location_payload(request: HttpRequest) -> tuple[float, float] | JsonResponse:
     """
-    Handle POST requests to retrieve the nearest pharmacies based on user location.
+    Validate a pharmacy points request body.
 
-    This view calculates the user's city from coordinates, checks the city's
-    working status (Open/Closed), and returns either open pharmacies or
-    pharmacies on duty accordingly.
+    Returns the rounded ``(lat, lng)`` pair, or the error response to send.
     """
     if request.method != "POST":
         return HttpResponseNotAllowed(["POST"])  # type: ignore
@@ -48,77 +71,286 @@ def get_pharmacy_points(request: HttpRequest) -> JsonResponse:
     except JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON payload."}, status=400)
 
+    location = _parse_location(data)
+    if isinstance(location, str):
+        return JsonResponse({"error": location}, status=400)
+    return location
+
+
+def _parse_location(data: Any) -> tuple[float, float] | str:
+    """
+    Validate one ``{"lat": ..., "lng": ...}`` object.
+
+    Returns the rounded ``(lat, lng)`` pair, or the error message to send.
+    """
     if not isinstance(data, dict):
-        return JsonResponse({"error": "Invalid JSON payload."}, status=400)
+        return "Invalid JSON payload."
 
     missing_fields = sorted({"lat", "lng"} - data.keys())
     if missing_fields:
-        fields = ", ".join(missing_fields)
-        return JsonResponse(
-            {"error": f"Missing required fields: {fields}."}, status=400
-        )
+        return f"Missing required fields: {', '.join(missing_fields)}."
 
     try:
         user_latitude = float(data["lat"])
         user_longitude = float(data["lng"])
     except (TypeError, ValueError):
-        return JsonResponse({"error": "Invalid coordinates."}, status=400)
+        return "Invalid coordinates."
 
     if not (-90 <= user_latitude <= 90) or not (-180 <= user_longitude <= 180):
-        return JsonResponse({"error": "Invalid coordinates."}, status=400)
-
-    try:
-        # First round lat and lng to exclude little variations
-        lat, lng = round_lat_lng(user_latitude, user_longitude, precision=4)
+        return "Invalid coordinates."
 
-        # decide the city from the user location
-        city_name = get_city_name_from_location(lat, lng)
-        city = City.objects.get(name=city_name)
+    # First round lat and lng to exclude little variations
+    return round_lat_lng(user_latitude, user_longitude, precision=4)
 
-        query_time = TEST_TIME if settings.DEBUG else timezone.now()
-        city_status = city.get_city_status(query_time)
-        logger.info("City status for %s: %s", city_name, city_status)
 
-        if city_status == PharmacyStatus.OPEN:
-            points = get_nearest_pharmacies_open(lat, lng, limit=SHOWN_PHARMACIES)
-        else:
-            points = get_nearest_pharmacies_on_duty(
-                lat, lng, city=city_name, time=query_time, limit=SHOWN_PHARMACIES
-            )
+def _pharmacy_points_error_response(exc: Exception) -> JsonResponse:
+    """Map an exception raised while looking up pharmacy points to a response."""
+    message, status = _pharmacy_points_error(exc)
+    return JsonResponse({"error": message}, status=status)
 
-        return JsonResponse({"points": points})
 
-    except City.DoesNotExist:
-        return JsonResponse(
-            {"error": "No city found for the provided location."}, status=400
-        )
-    except ValueError as exc:
+def _pharmacy_points_error(exc: Exception) -> tuple[str, int]:
+    """Return the client-facing message and HTTP status for an exception."""
+    if isinstance(exc, City.DoesNotExist):
+        return "No city found for the provided location.", 400
+    if isinstance(exc, ValueError):
         # Domain / client-facing ValueErrors from city lookup and duty search.
         # Upstream geocoding / Distance Matrix failures also raise ValueError and
         # are mapped to 502 below.
         message = str(exc)
         if message.startswith("Unknown city"):
-            return JsonResponse(
-                {"error": "No city found for the provided location."}, status=400
-            )
+            return "No city found for the provided location.", 400
         if message == "No pharmacies are on duty at this time.":
-            return JsonResponse({"error": message}, status=400)
+            return message, 400
         if message == "Unable to retrieve city status.":
-            return JsonResponse({"error": message}, status=400)
-        logger.exception("Upstream location/pharmacy lookup failed.")
-        return JsonResponse(
-            {"error": "Location lookup temporarily unavailable."},
-            status=502,
+            return message, 400
+        logger.error("Upstream location/pharmacy lookup failed.", exc_info=exc)
+        return "Location lookup temporarily unavailable.", 502
+    if isinstance(exc, requests.RequestException | httpx.HTTPError):
+        logger.error("Upstream location/pharmacy lookup failed.", exc_info=exc)
+        return "Location lookup temporarily unavailable.", 502
+    logger.error("Unexpected error in get_pharmacy_points.", exc_info=exc)
+    return "An internal server error occurred.", 500
+
+
+def _points_response(body: bytes) -> HttpResponse:
+    """Wrap an encoded pharmacy points body in a JSON response."""
+    return HttpResponse(body, content_type="application/json")
+
+
+def _get_points(lat: float, lng: float, query_time: datetime) -> tuple[bytes, City]:
+    """
+    Return the response body for a location and the city it falls in.
+
+    Bodies are cached per coordinate cell until the city's status or roster
+    version changes.
+    """
+    # decide the city from the user location
+    city_name = get_city_name_from_location(lat, lng)
+    city = get_city(city_name)
+    record_request(city_name, lat, lng)
+
+    city_status = city.get_city_status(query_time)
+    logger.info("City status for %s: %s", city_name, city_status)
+
+    cache_key = get_points_cache_key(
+        lat, lng, city_name, city_status, city.roster_version, query_time
+    )
+    cached = get_cached_points(cache_key)
+    if cached is not None:
+        return cached, city
+
+    if city_status == PharmacyStatus.OPEN:
+        points = get_nearest_pharmacies_open(lat, lng, limit=SHOWN_PHARMACIES)
+    else:
+        points = get_nearest_pharmacies_on_duty(
+            lat, lng, city=city_name, time=query_time, limit=SHOWN_PHARMACIES
+        )
+    return cache_points(cache_key, points), city
+
+
+def get_pharmacy_points(request: HttpRequest) -> HttpResponse:
+    """
+    Handle POST requests to retrieve the nearest pharmacies based on user location.
+
+    This view calculates the user's city from coordinates, checks the city's
+    working status (Open/Closed), and returns either open pharmacies or
+    pharmacies on duty accordingly. Responses are cached per coordinate cell
+    until the city's status or roster version changes.
+    """
+    location = _parse_location_payload(request)
+    if isinstance(location, HttpResponse):
+        return location
+    lat, lng = location
+
+    try:
+        query_time = TEST_TIME if settings.DEBUG else timezone.now()
+        body, _ = _get_points(lat, lng, query_time)
+        return _points_response(body)
+    except Exception as exc:
+        return _pharmacy_points_error_response(exc)
+
+
+def _next_scrape(city: City, query_time: datetime) -> datetime | None:
+    """
+    Return when the city's interval scrape is next due, or ``None``.
+
+    ``city`` comes from the city registry, which loads its scraper config with
+    it, so no query is made.
+    """
+    try:
+        config = city.scraperconfig
+    except ScraperConfig.DoesNotExist:
+        return None
+    return config.next_run(query_time)
+
+
+@require_safe
+def pharmacy_points(request: HttpRequest) -> HttpResponse:
+    """
+    Cacheable GET form of ``get_pharmacy_points``.
+
+    Takes ``lat`` and ``lng`` query parameters, quantized to the response
+    cache cell, so every request from the same cell shares one URL and one
+    body. Responses may be reused until the city next opens or closes or its
+    interval scrape is next due, both of which can change the roster, capped
+    at ``PHARMACY_POINTS_GET_MAX_AGE``. A strong ETag lets clients and proxies
+    revalidate with ``If-None-Match``.
+    """
+    location = _parse_location(request.GET.dict())
+    if isinstance(location, str):
+        return JsonResponse({"error": location}, status=400)
+    lat, lng = round_lat_lng(
+        *location, precision=settings.PHARMACY_POINTS_CACHE_PRECISION
+    )
+
+    try:
+        query_time = TEST_TIME if settings.DEBUG else timezone.now()
+        body, city = _get_points(lat, lng, query_time)
+        expires = city.working_schedule.next_status_change(query_time)
+        next_scrape = _next_scrape(city, query_time)
+        if next_scrape is not None:
+            expires = min(expires, next_scrape)
+    except Exception as exc:
+        response = _pharmacy_points_error_response(exc)
+        add_never_cache_headers(response)
+        return response
+
+    max_age = min(
+        max(int((expires - query_time).total_seconds()), 0),
+        settings.PHARMACY_POINTS_GET_MAX_AGE,
+    )
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    response = _points_response(body)
+    response["ETag"] = etag
+    patch_response_headers(response, cache_timeout=max_age)
+    patch_cache_control(response, public=True)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+async def aget_pharmacy_points(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of ``get_pharmacy_points`` for ASGI workers.
+
+    Upstream Google calls are awaited instead of blocking a thread, so one
+    worker can hold many in-flight requests. Enabled with
+    ``PHARMACY_POINTS_ASYNC``.
+    """
+    location = _parse_location_payload(request)
+    if isinstance(location, HttpResponse):
+        return location
+    lat, lng = location
+
+    try:
+        query_time = TEST_TIME if settings.DEBUG else timezone.now()
+        body = await async_pipeline.aget_pharmacy_points(
+            lat, lng, query_time, limit=SHOWN_PHARMACIES
         )
-    except requests.RequestException:
-        logger.exception("Upstream location/pharmacy lookup failed.")
+        return _points_response(body)
+    except Exception as exc:
+        return _pharmacy_points_error_response(exc)
+
+
+def get_pharmacy_points_batch(request: HttpRequest) -> HttpResponse:
+    """
+    Handle POST requests for the nearest pharmacies of many locations.
+
+    The body is ``{"locations": [{"lat": ..., "lng": ...}, ...]}``. Results
+    come back in request order as ``{"results": [...]}``, each either the body
+    ``get_pharmacy_points`` would return for that location or an ``error``.
+    Locations are grouped by city so duty candidates and Distance Matrix
+    requests are shared between them.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = loads(request.body)
+    except JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON payload."}, status=400)
+
+    locations = data.get("locations") if isinstance(data, dict) else None
+    if not isinstance(locations, list) or not locations:
+        return JsonResponse({"error": "Expected a list of locations."}, status=400)
+    max_locations = settings.PHARMACY_POINTS_BATCH_MAX_LOCATIONS
+    if len(locations) > max_locations:
         return JsonResponse(
-            {"error": "Location lookup temporarily unavailable."},
-            status=502,
+            {"error": f"At most {max_locations} locations per request."}, status=400
+        )
+
+    parsed = [_parse_location(location) for location in locations]
+    valid = [location for location in parsed if not isinstance(location, str)]
+    query_time = TEST_TIME if settings.DEBUG else timezone.now()
+    try:
+        computed = iter(
+            get_batch_pharmacy_points(valid, query_time, limit=SHOWN_PHARMACIES)
         )
-    except Exception:
-        logger.exception("Unexpected error in get_pharmacy_points.")
-        return JsonResponse({"error": "An internal server error occurred."}, status=500)
+    except Exception as exc:
+        return _pharmacy_points_error_response(exc)
+
+    results = []
+    for location in parsed:
+        result = location if isinstance(location, str) else next(computed)
+        if isinstance(result, bytes):
+            results.append(result)
+            continue
+        message = (
+            result if isinstance(result, str) else _pharmacy_points_error(result)[0]
+        )
+        results.append(dumps({"error": message}).encode())
+
+    # Per-location bodies are already encoded JSON objects.
+    return _points_response(b'{"results": [' + b", ".join(results) + b"]}")
+
+
+@require_safe
+def duty_pharmacies_geojson(request: HttpRequest, city_name: str) -> HttpResponse:
+    """
+    Serve the city's current duty roster as GeoJSON.
+
+    The document is built once per roster version and stored gzipped. It is
+    served compressed to clients that accept gzip, with a strong ETag per
+    encoding, so browsers and proxies revalidate with ``If-None-Match`` and
+    get a 304 until the next scrape.
+    """
+    try:
+        geojson = get_duty_geojson(city_name)
+    except City.DoesNotExist:
+        return JsonResponse({"error": "No city found with this name."}, status=404)
+
+    if ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")):
+        response = HttpResponse(geojson.gzipped, content_type="application/geo+json")
+        response["Content-Encoding"] = "gzip"
+        etag = f'{geojson.etag[:-1]}-gzip"'
+    else:
+        response = HttpResponse(geojson.body, content_type="application/geo+json")
+        etag = geojson.etag
+
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.DUTY_GEOJSON_MAX_AGE)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return get_conditional_response(request, etag=etag, response=response)
 
 
 def is_allowed_referer(request: HttpRequest) -> bool:
@@ -145,7 +377,7 @@ def google_maps_proxy(request: HttpRequest) -> HttpResponse | JsonResponse:
     if not is_allowed_referer(request):
         return HttpResponse("Forbidden", status=403)
 
-    endpoint = "https://maps.googleapis.com/maps/api/js"
+    url = "https://maps.googleapis.com/maps/api/js"
     # "marker" → AdvancedMarkerElement; "routes" → Route.computeRoutes.
     params = {
         "key": settings.GOOGLE_MAPS_API_KEY,
@@ -154,7 +386,7 @@ def google_maps_proxy(request: HttpRequest) -> HttpResponse | JsonResponse:
     }
 
     try:
-        response = requests.get(endpoint, params=params, timeout=10)
+        response = http_client.get(url, endpoint="google_maps_js", params=params)
         return HttpResponse(response.text, content_type="text/javascript")
     except requests.exceptions.RequestException as e:
         logger.error("Failed to proxy Google Maps request: %s", e)
@@ -168,5 +400,8 @@ def pharmacies_list(request: HttpRequest) -> HttpResponse:
     return render(
         request,
         "pharmacies.html",
-        {"google_maps_map_id": settings.GOOGLE_MAPS_MAP_ID},
+        {
+            "google_maps_map_id": settings.GOOGLE_MAPS_MAP_ID,
+            "points_cell_precision": settings.PHARMACY_POINTS_CACHE_PRECISION,
+        },
     )
@@ -5,7 +5,6 @@ from datetime import timedelta
 from typing import Any
 
 import django
-import requests
 from django.conf import settings
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
@@ -19,11 +18,12 @@ django.setup()
 def record() -> None:
     from django.core.management import call_command
 
+    from pharmacies import http_client
     from pharmacies.models import City, Pharmacy
     from pharmacies.utils.utils import (
-        _parse_location_identifier,
         add_scraped_data_to_db,
         normalize_string,
+        parse_location_identifier,
     )
 
     call_command("seed_cities")
@@ -72,7 +72,7 @@ def record() -> None:
         geo_url = f"https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lng}&key={settings.GOOGLE_MAPS_API_KEY}"
 
         try:
-            geo_resp = requests.get(geo_url, timeout=10)
+            geo_resp = http_client.get(geo_url, endpoint="google_geocode")
             geo_data = geo_resp.json()
             api_snapshots[geo_key] = geo_data
         except Exception as e:
@@ -83,7 +83,7 @@ def record() -> None:
         city_identifier = ""
         if geo_data["status"] == "OK" and geo_data["results"]:
             try:
-                city_identifier = _parse_location_identifier(geo_data)
+                city_identifier = parse_location_identifier(geo_data)
                 normalized_id = normalize_string(city_identifier)
 
                 for c in cities:
@@ -135,9 +135,14 @@ def record() -> None:
                         f"&key={settings.GOOGLE_MAPS_API_KEY}"
                     )
 
-                    dm_resp = requests.get(dm_url, timeout=10)
+                    dm_resp = http_client.get(dm_url, endpoint="google_distance_matrix")
                     dm_data = dm_resp.json()
                     api_snapshots[dm_key] = dm_data
+                    # calibrate_travel_times pairs the elements with these.
+                    api_snapshots[f"destinations:{lat},{lng}"] = [
+                        {"name": p.name, **d["position"]}
+                        for p, d in zip(candidates, pharmacy_data)
+                    ]
                     print(
                         f"  -> Recorded distance matrix for {len(pharmacy_data)} destinations."
                     )
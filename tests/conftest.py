@@ -17,7 +17,7 @@ def google_snapshots() -> dict[str, Any]:
 @pytest.fixture
 def mock_google_maps(google_snapshots: dict[str, Any]) -> Generator[Any]:
     def side_effect(
-        url: str, params: dict[str, Any] | None = None, timeout: float | None = None
+        url: str, params: dict[str, Any] | None = None, **kwargs: Any
     ) -> Any:
         params = params or {}
 
@@ -58,5 +58,5 @@ def mock_google_maps(google_snapshots: dict[str, Any]) -> Generator[Any]:
             {"status": "REQUEST_DENIED", "error_message": "No snapshot found"}, 200
         )
 
-    with patch("requests.get", side_effect=side_effect) as mock_get:
+    with patch("pharmacies.http_client.get", side_effect=side_effect) as mock_get:
         yield mock_get
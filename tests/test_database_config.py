@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 from PharmacyOnDuty.database_config import (
     get_database_connection_kwargs,
+    get_database_connection_settings,
     get_database_settings,
 )
 
@@ -144,3 +145,50 @@ class TestDatabaseConfig(unittest.TestCase):
                     "port": "6432",
                 },
             )
+
+    def test_connections_persist_with_health_checks_by_default(self) -> None:
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(
+                get_database_connection_settings(),
+                {
+                    "CONN_MAX_AGE": 60,
+                    "CONN_HEALTH_CHECKS": True,
+                    "DISABLE_SERVER_SIDE_CURSORS": False,
+                    "OPTIONS": {},
+                },
+            )
+
+    def test_pool_is_sized_for_the_process_role(self) -> None:
+        with patch.dict(
+            os.environ,
+            {
+                "DB_POOL_ENABLED": "true",
+                "DB_ROLE": "worker",
+                "DB_POOL_MAX_SIZE_WORKER": "8",
+            },
+            clear=True,
+        ):
+            connection_settings = get_database_connection_settings()
+
+        self.assertEqual(connection_settings["CONN_MAX_AGE"], 0)
+        self.assertEqual(
+            connection_settings["OPTIONS"]["pool"],
+            {
+                "name": "pharmacyonduty-worker",
+                "min_size": 1,
+                "max_size": 8,
+                "timeout": 10,
+            },
+        )
+
+    def test_pgbouncer_disables_server_side_state(self) -> None:
+        with patch.dict(os.environ, {"DB_PGBOUNCER": "True"}, clear=True):
+            connection_settings = get_database_connection_settings()
+
+        self.assertTrue(connection_settings["DISABLE_SERVER_SIDE_CURSORS"])
+        self.assertEqual(connection_settings["OPTIONS"], {"prepare_threshold": None})
+
+    def test_unknown_role_is_rejected(self) -> None:
+        with patch.dict(os.environ, {"DB_ROLE": "beat"}, clear=True):
+            with self.assertRaises(ValueError):
+                get_database_connection_settings()
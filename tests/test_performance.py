@@ -79,3 +79,65 @@ class TestPerformance:
         # Assertion: Average under 200ms, Max under 500ms
         assert avg_duration < 200, f"Average response too slow: {avg_duration:.2f}ms"
         assert max_duration < 500, f"Max response too slow: {max_duration:.2f}ms"
+
+
+@pytest.mark.django_db
+class TestDutyQueryBenchmark:
+    """Duty lookup time against roster size, for both lookup paths."""
+
+    @pytest.mark.parametrize("roster_size", [100, 1000, 5000])
+    def test_duty_lookup_scales_with_roster_size(self, roster_size: int) -> None:
+        from datetime import timedelta
+
+        from django.contrib.gis.geos import Point
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+
+        from pharmacies.models import City, Pharmacy
+        from pharmacies.utils.roster_snapshot import rebuild_roster_snapshot
+        from pharmacies.utils.utils import _query_nearest_pharmacies_on_duty
+
+        city = City.objects.create(name="istanbul")
+        now = timezone.now()
+        Pharmacy.objects.bulk_create(
+            Pharmacy(
+                name=item["name"],
+                address=item["address"],
+                phone=item["phone"],
+                district=item["district"],
+                city=city,
+                location=Point(item["coordinates"]["lng"], item["coordinates"]["lat"]),
+                duty_start=now - timedelta(hours=1),
+                duty_end=now + timedelta(hours=8),
+            )
+            for item in generate_synthetic_pharmacies(count=roster_size * 3)
+            if item["city"] == "istanbul"
+        )
+        lat, lng = 41.0082, 28.9784
+        iterations = 20
+
+        with CaptureQueriesContext(connection) as ctx:
+            _query_nearest_pharmacies_on_duty(lat, lng, "istanbul", now, 5, 100_000)
+        assert len(ctx.captured_queries) == 1
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            points = _query_nearest_pharmacies_on_duty(
+                lat, lng, "istanbul", now, 5, 100_000
+            )
+        query_ms = (time.perf_counter() - start_time) * 1000 / iterations
+
+        snapshot = rebuild_roster_snapshot("istanbul")
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            nearest = snapshot.nearest(lat, lng, now, 10, 100_000)
+        snapshot_ms = (time.perf_counter() - start_time) * 1000 / iterations
+
+        print(
+            f"\nRoster {roster_size}: KNN query {query_ms:.2f}ms, "
+            f"snapshot {snapshot_ms:.3f}ms"
+        )
+        assert len(points) == 10
+        assert points[0]["pharmacy_id"] == nearest[0][0].pharmacy_id
+        assert query_ms < 50, f"KNN duty query too slow: {query_ms:.2f}ms"